@@ -0,0 +1,111 @@
+#api/async_crud.py
+"""Async facade over crud.py for the FastAPI endpoints.
+
+boto3 is blocking, so every storage call is handed to a dedicated, bounded
+thread pool instead of running on the event loop. A per-loop semaphore caps
+the number of calls in flight; anything above the cap waits on the loop
+without tying up a thread.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from . import crud
+
+# Max storage calls in flight per worker process
+STORAGE_CONCURRENCY = int(os.environ.get('NOTES_STORAGE_CONCURRENCY', '32'))
+
+_executor = None
+_executor_lock = threading.Lock()
+_limits = weakref.WeakKeyDictionary()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=STORAGE_CONCURRENCY, thread_name_prefix='storage')
+    return _executor
+
+
+def _get_limit(loop) -> asyncio.Semaphore:
+    limit = _limits.get(loop)
+    if limit is None:
+        limit = _limits[loop] = asyncio.Semaphore(STORAGE_CONCURRENCY)
+    return limit
+
+
+async def run(func, *args, **kwargs):
+    """Run a blocking storage call on the storage pool and await its result"""
+    loop = asyncio.get_running_loop()
+    async with _get_limit(loop):
+        return await loop.run_in_executor(_get_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown(wait: bool = True):
+    """Stop the storage pool; a new one is created on the next call"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def create_note(note):
+    return await run(crud.create_note, note)
+
+
+async def get_note(note_id: str):
+    return await run(crud.get_note, note_id)
+
+
+async def get_note_row(note_id: str):
+    return await run(crud.get_note_row, note_id)
+
+
+async def get_note_item(note_id: str):
+    return await run(crud.get_note_item, note_id)
+
+
+async def open_note_body(item: dict, start: int = 0, end=None):
+    return await run(crud.open_note_body, item, start, end)
+
+
+async def get_all_note_rows(total_segments=None, fields: str = 'full', order=None):
+    return await run(crud.get_all_note_rows, total_segments, fields, order)
+
+
+async def list_notes_page(limit: int = crud.DEFAULT_PAGE_LIMIT, cursor=None, fields: str = 'full', order=None):
+    return await run(crud.list_notes_page, limit, cursor, fields, order)
+
+
+async def update_note(note_id: str, note_data: dict, expected_versions=None):
+    return await run(crud.update_note, note_id, note_data, expected_versions)
+
+
+async def delete_note(note_id: str, expected_versions=None):
+    return await run(crud.delete_note, note_id, expected_versions)
+
+
+async def batch_create_notes(notes):
+    return await run(crud.batch_create_notes, notes)
+
+
+async def batch_get_notes(note_ids):
+    return await run(crud.batch_get_notes, note_ids)
+
+
+async def batch_delete_notes(note_ids):
+    return await run(crud.batch_delete_notes, note_ids)
+
+
+async def get_changes(since=None, limit: int = crud.DEFAULT_PAGE_LIMIT, cursor=None):
+    return await run(crud.get_changes, since, limit, cursor)
+
+
+async def search_notes(query: str, limit: int = 20):
+    return await run(crud.search_notes, query, limit)
@@ -0,0 +1,170 @@
+#api/blobstore.py
+"""Overflow storage for note bodies too large to keep inline in DynamoDB.
+
+Bodies above NOTES_BODY_INLINE_LIMIT bytes are written here and the note
+item keeps only a `body_ref` key. NOTES_BLOB_URL picks the backend:
+
+    file:///var/lib/noted/blobs   local directory (development and tests)
+    s3://bucket/prefix            S3 (boto3 is imported on first use)
+
+Every blob is immutable: a rewritten body gets a new key, so a reader
+streaming the old version is never handed a mix of both.
+"""
+import os
+import re
+import tempfile
+import threading
+import uuid
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+
+BLOB_URL = os.environ.get('NOTES_BLOB_URL') or 'file://' + os.path.join(tempfile.gettempdir(), 'noted-blobs')
+CHUNK_SIZE = 64 * 1024
+# Lifetime in seconds of presigned S3 URLs for bodies too large to send inline
+URL_EXPIRES = int(os.environ.get('NOTES_BLOB_URL_EXPIRES', '300'))
+
+_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_-]+(/[A-Za-z0-9_-]+)*$')
+
+
+class BlobNotFound(KeyError):
+    pass
+
+
+def new_blob_key(note_id: str) -> str:
+    """A fresh key under the note's prefix; one per body version"""
+    return f"{note_id}/{uuid.uuid4().hex}"
+
+
+def _check_key(key: str):
+    if not isinstance(key, str) or not _KEY_PATTERN.match(key):
+        raise ValueError(f"Invalid blob key: {key!r}")
+
+
+class LocalBlobStore:
+    """Blobs as files under `root`, written atomically via rename"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        _check_key(key)
+        return os.path.join(self.root, *key.split('/'))
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def open_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Chunks of bytes [start, end] (inclusive). The file is opened before
+        this returns, so a concurrent delete can't cut the stream short."""
+        try:
+            handle = open(self._path(key), 'rb')
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+        handle.seek(start)
+        return _iter_file(handle, None if end is None else end - start + 1)
+
+    def read(self, key: str) -> bytes:
+        return b''.join(self.open_range(key))
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+def _iter_file(handle, remaining: Optional[int]) -> Iterator[bytes]:
+    with handle:
+        while remaining is None or remaining > 0:
+            chunk = handle.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+class S3BlobStore:
+    """Blobs as S3 objects under `prefix`; ranges are served with ranged GETs"""
+
+    def __init__(self, bucket: str, prefix: str = ''):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3  # Deferred off the import path like the DynamoDB resource
+                    self._client = boto3.client('s3')
+        return self._client
+
+    def _object_key(self, key: str) -> str:
+        _check_key(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data,
+                               ContentType='text/plain; charset=utf-8')
+
+    def open_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        kwargs = {'Bucket': self.bucket, 'Key': self._object_key(key)}
+        if start or end is not None:
+            kwargs['Range'] = f"bytes={start}-{'' if end is None else end}"
+        try:
+            response = self.client.get_object(**kwargs)
+        except self.client.exceptions.NoSuchKey:
+            raise BlobNotFound(key)
+        return response['Body'].iter_chunks(CHUNK_SIZE)
+
+    def read(self, key: str) -> bytes:
+        return b''.join(self.open_range(key))
+
+    def presigned_url(self, key: str, expires: int = URL_EXPIRES) -> str:
+        """A GET URL for the blob that needs no credentials until it expires"""
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._object_key(key)}, ExpiresIn=expires)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+
+def from_url(url: str):
+    parts = urlsplit(url)
+    if parts.scheme == 'file':
+        return LocalBlobStore(parts.netloc + parts.path)
+    if parts.scheme == 's3':
+        return S3BlobStore(parts.netloc, parts.path)
+    raise ValueError(f"Unsupported NOTES_BLOB_URL scheme: {parts.scheme!r}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = from_url(BLOB_URL)
+    return _store
+
+
+def set_blob_store(store):
+    """Use `store` (e.g. a LocalBlobStore in a temp dir) instead of NOTES_BLOB_URL"""
+    global _store
+    with _store_lock:
+        _store = store
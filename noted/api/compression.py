@@ -0,0 +1,224 @@
+#api/compression.py
+"""Body compression at rest and negotiated response compression.
+
+At rest: note bodies can be stored zlib-compressed as binary, tagged with a
+`body_codec` attribute; rows without the tag are plain text, so old and new
+rows read the same way.
+
+On the wire: gzip, or brotli when the optional `brotli` package is
+installed, chosen from the client's Accept-Encoding. Used by the ASGI
+middleware for the FastAPI app and by the BaseHTTPRequestHandler modules.
+"""
+import gzip
+import os
+import zlib
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+# At-rest codec for new writes: 'zlib' or 'none'. Readers understand every
+# codec regardless, so enable it only once all instances run this code.
+BODY_CODEC = os.environ.get('NOTES_BODY_CODEC', 'none')
+BODY_COMPRESS_MIN = int(os.environ.get('NOTES_BODY_COMPRESS_MIN', '1024'))
+
+# Responses smaller than this aren't worth the CPU or the extra headers
+RESPONSE_COMPRESS_MIN = int(os.environ.get('NOTES_RESPONSE_COMPRESS_MIN', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def compress_body(text: str) -> Tuple[object, Optional[str]]:
+    """(stored value, codec) for a body; plain text when compression doesn't pay"""
+    data = text.encode('utf-8')
+    if BODY_CODEC != 'zlib' or len(data) < BODY_COMPRESS_MIN:
+        return text, None
+    packed = zlib.compress(data, 6)
+    if len(packed) >= len(data):
+        return text, None
+    return packed, 'zlib'
+
+
+def decompress_body(value, codec: Optional[str]) -> str:
+    if codec is None:
+        return value
+    if codec == 'zlib':
+        # boto3 returns binary attributes wrapped in boto3.dynamodb.types.Binary
+        return zlib.decompress(getattr(value, 'value', value)).decode('utf-8')
+    raise ValueError(f"Unknown body codec: {codec!r}")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content-coding for an Accept-Encoding header, or None"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+    wildcard = weights.get('*', 0.0)
+    choices = [coding for coding in ('br', 'gzip') if coding != 'br' or brotli is not None]
+    best = max(choices, key=lambda coding: weights.get(coding, wildcard))
+    return best if weights.get(best, wildcard) > 0 else None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(data: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """(payload, content-coding or None) for a whole response body"""
+    encoding = negotiate(accept_encoding)
+    if encoding is None or len(data) < RESPONSE_COMPRESS_MIN:
+        return data, None
+    return compress(data, encoding), encoding
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._flush = self._compressor.finish
+        else:
+            # wbits 31: gzip container
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._flush = self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        if hasattr(self._compressor, 'process'):
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._flush()
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """A distinct validator per encoding, e.g. "abc" -> "abc-gzip" """
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def not_modified_etag(etag: str, encoding: str, if_none_match: Optional[str]) -> str:
+    """The ETag a 304 repeats: the encoded one only if that is what the client holds.
+
+    A 200 under RESPONSE_COMPRESS_MIN went out unencoded with the plain ETag,
+    so the 304 can't just assume the encoded form.
+    """
+    encoded = encoded_etag(etag, encoding)
+    candidates = {tag.strip().removeprefix('W/') for tag in (if_none_match or '').split(',')}
+    return encoded if encoded.removeprefix('W/') in candidates else etag
+
+
+def strip_encoding(etag: str) -> str:
+    """Undo encoded_etag so conditional requests compare the underlying version"""
+    for encoding in ('gzip', 'br'):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware: gzip/brotli responses the client says it accepts.
+
+    Whole bodies are compressed in one go; streamed bodies (more_body) are
+    compressed chunk by chunk without buffering. Partial content, event
+    streams and bodies that are already encoded pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = RESPONSE_COMPRESS_MIN):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope['headers'], b'accept-encoding')
+        encoding = negotiate(accept.decode('latin-1') if accept else None)
+        if_none_match = _header(scope['headers'], b'if-none-match')
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+
+        async def compressing_send(message):
+            nonlocal start_message, compressor
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = list(start.get('headers', []))
+                body = message.get('body', b'')
+                more_body = message.get('more_body', False)
+                if start['status'] == 304:
+                    # Same validator the client's cached 200 carried
+                    etag = _header(headers, b'etag')
+                    if etag is not None:
+                        headers = [(k, v) for k, v in headers if k.lower() != b'etag']
+                        etag = not_modified_etag(etag.decode('latin-1'), encoding,
+                                                 if_none_match.decode('latin-1') if if_none_match else None)
+                        headers.append((b'etag', etag.encode('latin-1')))
+                    await send({**start, 'headers': headers + [(b'vary', b'Accept-Encoding')]})
+                    await send(message)
+                    compressor = False
+                    return
+                content_type = _header(headers, b'content-type') or b''
+                if (start['status'] in (204, 206) or _header(headers, b'content-encoding') is not None
+                        or content_type.startswith(b'text/event-stream')
+                        or (not more_body and len(body) < self.minimum_size)):
+                    await send(start)
+                    await send(message)
+                    compressor = False
+                    return
+
+                headers = [(k, v) for k, v in headers if k.lower() not in (b'content-length', b'etag')]
+                etag = _header(start.get('headers', []), b'etag')
+                if etag is not None:
+                    headers.append((b'etag', encoded_etag(etag.decode('latin-1'), encoding).encode('latin-1')))
+                headers.append((b'content-encoding', encoding.encode('latin-1')))
+                headers.append((b'vary', b'Accept-Encoding'))
+                if not more_body:
+                    data = compress(body, encoding)
+                    headers.append((b'content-length', str(len(data)).encode('latin-1')))
+                    await send({**start, 'headers': headers})
+                    await send({'type': 'http.response.body', 'body': data})
+                    compressor = False
+                    return
+                compressor = _StreamCompressor(encoding)
+                await send({**start, 'headers': headers})
+
+            if not compressor:
+                await send(message)
+                return
+            data = compressor.compress(message.get('body', b''))
+            if not message.get('more_body', False):
+                data += compressor.finish()
+            await send({'type': 'http.response.body', 'body': data, 'more_body': message.get('more_body', False)})
+
+        await self.app(scope, receive, compressing_send)
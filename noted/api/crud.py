@@ -1,74 +1,323 @@
 #crud.py 
-import boto3
 from botocore.exceptions import ClientError
-from fastapi import HTTPException
-from pydantic import BaseModel
+# FastAPI handles starlette's HTTPException (its own is a subclass); importing
+# it from starlette keeps FastAPI off the import path of the Lambda/Vercel handlers
+from starlette.exceptions import HTTPException
+from dataclasses import dataclass
 from typing import List, Optional
-from datetime import datetime , timezone
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 
+import base64
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
 import uuid
 
+from .blobstore import BlobNotFound, get_blob_store, new_blob_key
+from .cache import TTLCache
+from .compression import compress_body, decompress_body
+from .dynamo import THROTTLE_RETRY_AFTER, StorageThrottled, dynamodb, table
+from .events import bus as note_events
+from .logs import get_logger
+from .metrics import registry
+from .search import SearchIndex
+from .singleflight import SingleFlight
+from .writebehind import WriteBehind, writebehind_bypassed
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb', region_name='ap-southeast-2') 
-table = dynamodb.Table('Notes_Table')
+
+# Length of the precomputed body excerpt stored on every note for summary listings
+SNIPPET_LENGTH = int(os.environ.get('NOTES_SNIPPET_LENGTH', '160'))
+
+# Bodies larger than this (UTF-8 bytes) go to the blob store and the item keeps
+# a body_ref pointer; DynamoDB rejects items over 400 KB and every scan/get
+# pays for inline bodies. Bodies over MAX_BODY_BYTES are rejected with 413.
+BODY_INLINE_LIMIT = int(os.environ.get('NOTES_BODY_INLINE_LIMIT', str(32 * 1024)))
+MAX_BODY_BYTES = int(os.environ.get('NOTES_MAX_BODY_BYTES', str(16 * 1024 * 1024)))
+
+# Write-behind for bursts of updates to the same note (0 = off): updates are
+# parked for this many milliseconds and only the newest one is written
+WRITE_BEHIND_MS = int(os.environ.get('NOTES_WRITE_BEHIND_MS', '0'))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('NOTES_WRITE_BEHIND_MAX_PENDING', '1000'))
+
+# Page size bounds for the paginated listing endpoint
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 1000
+# Storage reads one listing page may take to skip past tombstones; a page
+# that is still short after this many comes back short, with a cursor
+LIST_MAX_READS = int(os.environ.get('NOTES_LIST_MAX_READS', '8'))
+
+# Number of parallel scan segments used for full-table reads (1 = sequential scan)
+SCAN_SEGMENTS = int(os.environ.get('NOTES_SCAN_SEGMENTS', '4'))
+
+# Delta sync: every live note and tombstone carries sync_bucket so it lands in
+# a GSI keyed on (sync_bucket, updated_at); deletes leave a tombstone that the
+# table's TTL on expires_at removes after TOMBSTONE_TTL_DAYS
+CHANGES_INDEX = os.environ.get('NOTES_CHANGES_INDEX', 'changes-by-updated_at')
+SYNC_BUCKET = 'notes'
+TOMBSTONE_TTL_DAYS = int(os.environ.get('NOTES_TOMBSTONE_TTL_DAYS', '30'))
+# Seconds the changes watermark stays behind now: updated_at is stamped before
+# the write lands and the index is eventually consistent, so a change stamped
+# earlier can become visible after a later one
+CHANGES_SAFETY_LAG = float(os.environ.get('NOTES_CHANGES_SAFETY_LAG', '5'))
+LIVE_NOTES = "attribute_not_exists(deleted_at)"
+
+# order=recent listings: live notes carry list_bucket, which lands them in a
+# GSI keyed on (list_bucket, created_at). Deletes remove it, so the index
+# holds no tombstones and a descending query with Limit=N returns exactly
+# the N newest notes without a filter.
+RECENT_INDEX = os.environ.get('NOTES_RECENT_INDEX', 'recent-by-created_at')
+LIST_BUCKET = 'notes'
+LIST_ORDERS = ('recent',)
+
+# DynamoDB batch API limits and retry policy for UnprocessedItems/Keys
+BATCH_WRITE_LIMIT = 25
+BATCH_GET_LIMIT = 100
+MAX_BATCH_SIZE = 1000
+BATCH_MAX_ATTEMPTS = int(os.environ.get('NOTES_BATCH_MAX_ATTEMPTS', '8'))
+BATCH_BACKOFF_BASE = 0.05
+BATCH_BACKOFF_CAP = 2.0
+
+# In-process read-through cache for get_note (size 0 disables it)
+note_cache = TTLCache(
+    maxsize=int(os.environ.get('NOTES_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('NOTES_CACHE_TTL', '30'))
+)
+
+# Concurrent identical reads (same note, same listing) share one storage call.
+# Flights started before a write are not joined by readers arriving after it.
+SINGLE_FLIGHT = os.environ.get('NOTES_SINGLE_FLIGHT', '1') != '0'
+note_reads = SingleFlight('note', generation=note_cache.begin, enabled=SINGLE_FLIGHT)
+list_reads = SingleFlight('list', generation=note_cache.begin, enabled=SINGLE_FLIGHT)
+
+# Full-text index over titles and bodies; built on first search from
+# NOTES_SEARCH_INDEX_PATH if that file exists, otherwise from a table scan
+SEARCH_INDEX_PATH = os.environ.get('NOTES_SEARCH_INDEX_PATH')
+MAX_SEARCH_LIMIT = 100
+search_index = SearchIndex()
+_search_build_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+write_behind = (
+    WriteBehind(lambda note_id, row: _flush_update(note_id, row), WRITE_BEHIND_MS / 1000.0,
+                max_pending=WRITE_BEHIND_MAX_PENDING, on_drop=lambda note_id, row: _revert_dropped(note_id))
+    if WRITE_BEHIND_MS > 0 else None
+)
+
+# Cache counters are read from note_cache.stats() at scrape time
+registry.callback('notes_cache_hits_total', 'Note cache hits', 'counter',
+                  lambda: [((), note_cache.stats()['hits'])])
+registry.callback('notes_cache_misses_total', 'Note cache misses', 'counter',
+                  lambda: [((), note_cache.stats()['misses'])])
+registry.callback('notes_cache_evictions_total', 'Note cache evictions', 'counter',
+                  lambda: [((), note_cache.stats()['evictions'])])
+registry.callback('notes_cache_entries', 'Notes currently cached', 'gauge',
+                  lambda: [((), note_cache.stats()['size'])])
 
 def generate_note_id():
     """Generate a unique ID using UUID4"""
     note_id = str(uuid.uuid4())  # Generate a valid UUID
     return note_id
 
-class Note(BaseModel):
-    id: Optional[str] = None
+# A plain dataclass: callers validate input (pydantic in main.py, router._note
+# for the handlers), so pydantic stays off the Lambda/Vercel import path
+@dataclass
+class Note:
     title: str
     body: str
+    id: Optional[str] = None
     created_at: Optional[str] = None
 
 
+# Fields returned to API clients; anything else on an item is storage bookkeeping
+PUBLIC_FIELDS = ('id', 'title', 'body', 'created_at', 'updated_at')
 
-def create_note(note: Note):
+
+# Summary listings read only these attributes (ProjectionExpression), so the
+# scan never transfers note bodies; the full body comes from GET /notes/{id}
+SUMMARY_FIELDS = ('id', 'title', 'snippet', 'created_at', 'updated_at')
+SUMMARY_PROJECTION = ', '.join(SUMMARY_FIELDS)
+LIST_FIELDS = ('full', 'summary')
+
+
+def to_public(item: dict) -> dict:
+    """Project a trusted storage row onto the response fields, without model validation"""
+    row = {field: item[field] for field in PUBLIC_FIELDS if field in item}
+    if 'body_codec' in item:
+        row['body'] = body_text(item)
+    if 'body_ref' in item:
+        # Offloaded bodies are not inlined; clients stream them from body_url
+        # and can show the snippet meanwhile
+        row['body_size'] = item['body_size']
+        row['body_url'] = f"/notes/{item['id']}/body"
+        if 'snippet' in item:
+            row['snippet'] = item['snippet']
+    return row
+
+
+def to_summary(item: dict) -> dict:
+    """Project a storage row onto the summary listing fields"""
+    row = {field: item[field] for field in SUMMARY_FIELDS if field in item}
+    if 'snippet' not in row and 'body' in item:
+        row['snippet'] = make_snippet(body_text(item))
+    return row
+
+
+def make_snippet(body: str) -> str:
+    """First SNIPPET_LENGTH characters of the body on one line, cut at a word boundary"""
+    text = ' '.join(body.split())
+    if len(text) <= SNIPPET_LENGTH:
+        return text
+    cut = text[:SNIPPET_LENGTH]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip() + '…'
+
+
+def _check_fields(fields: str):
+    if fields not in LIST_FIELDS:
+        raise HTTPException(status_code=400, detail=f"fields must be one of: {', '.join(LIST_FIELDS)}")
+
+
+def _check_order(order: Optional[str]):
+    if order is not None and order not in LIST_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of: {', '.join(LIST_ORDERS)}")
+
+
+def new_note_item(note: Note) -> dict:
+    """Build the DynamoDB item for a new note, raising 400 if title or body is blank"""
+    # Get the current timestamp for creation
+    created_at = datetime.now(timezone.utc).isoformat()
+
+    # Create the item with all required fields
+    item = {
+        'id': generate_note_id(),  # Partition key for DynamoDB
+        'title': note.title.strip(),  # Remove extra whitespace from title
+        'body': note.body.strip(),   # Remove extra whitespace from body
+        'created_at': created_at,
+        'updated_at': created_at,  # Set updated_at to match created_at initially
+        'snippet': make_snippet(note.body),  # Served by summary listings instead of the body
+        'sync_bucket': SYNC_BUCKET,  # Puts the note in the changes index
+        'list_bucket': LIST_BUCKET  # Puts the note in the recent index
+    }
+
+    # Validate that required fields are not empty
+    if not item['title'] or not item['body']:
+        logger.debug("validation failed: empty title or body")
+        raise HTTPException(status_code=400, detail="Title and body cannot be empty")
+
+    return item
+
+
+def restore_note_item(row: dict) -> dict:
+    """Build the item for an exported note, keeping its id and timestamps.
+
+    Used by bulk import; raises 400 like new_note_item for unusable rows and
+    413 for oversized bodies. The body is packed (offloaded or compressed).
+    """
+    title, body = row.get('title'), row.get('body')
+    if not isinstance(title, str) or not isinstance(body, str) or not title.strip() or not body.strip():
+        raise HTTPException(status_code=400, detail="Title and body cannot be empty")
+    note_id = row.get('id') or generate_note_id()
+    if not isinstance(note_id, str):
+        raise HTTPException(status_code=400, detail="Invalid note ID")
+    created_at = row.get('created_at') or datetime.now(timezone.utc).isoformat()
+    return pack_body({
+        'id': note_id,
+        'title': title,
+        'body': body,
+        'created_at': created_at,
+        'updated_at': row.get('updated_at') or created_at,
+        'snippet': make_snippet(body),
+        'sync_bucket': SYNC_BUCKET,
+        'list_bucket': LIST_BUCKET
+    })
+
+
+# Attributes that together hold a note's body in one of its stored forms
+BODY_ATTRIBUTES = ('body', 'body_ref', 'body_size', 'body_codec')
+
+
+def check_body_size(data: bytes):
+    """413 for a UTF-8 body over MAX_BODY_BYTES"""
+    if len(data) > MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"Note body exceeds {MAX_BODY_BYTES} bytes")
+
+
+def pack_body(item: dict) -> dict:
+    """Put a new item's plain-text body into its stored form (in place).
+
+    Large bodies move to the blob store, leaving a body_ref pointer; others
+    may be compressed per NOTES_BODY_CODEC, tagged with body_codec. Raises
+    413 for bodies over MAX_BODY_BYTES. Returns the item.
+    """
+    data = item['body'].encode('utf-8')
+    check_body_size(data)
+    if len(data) > BODY_INLINE_LIMIT:
+        key = new_blob_key(item['id'])
+        get_blob_store().put(key, data)
+        del item['body']
+        item['body_ref'] = key
+        item['body_size'] = len(data)
+        return item
+
+    item['body'], codec = compress_body(item['body'])
+    if codec:
+        item['body_codec'] = codec
+    return item
+
+
+def body_text(item: dict) -> str:
+    """An inline body as text, whatever codec it was stored with"""
+    return decompress_body(item['body'], item.get('body_codec'))
+
+
+def delete_body_blob(item: Optional[dict], keep: Optional[str] = None):
+    """Best-effort removal of an item's offloaded body once nothing points at it"""
+    key = (item or {}).get('body_ref')
+    if not key or key == keep:
+        return
     try:
-        # Generate a new unique ID for the note
-        note_id = generate_note_id()
-        print(f"Generated ID: {note_id}")  # Debug log
-
-        # Get the current timestamp for creation
-        created_at = datetime.now(timezone.utc).isoformat()
-
-        # Create the item with all required fields
-        item = {
-            'id': note_id,  # Partition key for DynamoDB
-            'title': note.title.strip(),  # Remove extra whitespace from title
-            'body': note.body.strip(),   # Remove extra whitespace from body
-            'created_at': created_at,
-            'updated_at': created_at  # Set updated_at to match created_at initially
-        }
+        get_blob_store().delete(key)
+    except Exception as e:
+        # An orphaned blob only costs storage; never fail the write for it
+        logger.warning("could not delete body blob", extra={'note_id': item.get('id'), 'error': str(e)})
 
-        print(f"Item to be inserted: {item}")  # Debug log
 
-        # Validate that required fields are not empty
-        if not item['title'] or not item['body']:
-            print("Validation failed: Title and body cannot be empty.")  # Debug log
-            raise HTTPException(status_code=400, detail="Title and body cannot be empty")
+def create_note(note: Note):
+    try:
+        item = new_note_item(note)
+        logger.debug("creating note", extra={'note_id': item['id']})
 
         # Ensure ID is present and valid (shouldn't happen, but extra safety)
         if not item['id']:
-            print("Validation failed: Failed to generate note ID.")  # Debug log
+            logger.error("failed to generate note id")
             raise HTTPException(status_code=500, detail="Failed to generate note ID")
 
+        pack_body(item)
+
         # Insert the note into DynamoDB
         try:
             response = table.put_item(Item=item)
-            print(f"DynamoDB response: {response}")  # Debug log
+            note_cache.invalidate(item['id'])
+            search_index.add(item['id'], item['title'], note.body.strip())
 
             # Check if the response indicates success (optional validation)
             if response['ResponseMetadata']['HTTPStatusCode'] != 200:
-                print("DynamoDB put_item failed.")  # Debug log
+                logger.error("put_item failed", extra={'note_id': item['id']})
                 raise HTTPException(status_code=500, detail="Failed to save note in database")
         
-        except ClientError as e:
+        except (ClientError, StorageThrottled) as e:
+            delete_body_blob(item)
+            if isinstance(e, StorageThrottled):
+                raise
             error_code = e.response['Error']['Code']
-            print(f"DynamoDB ClientError: {error_code} - {str(e)}")  # Debug log
+            logger.warning("put_item error", extra={'note_id': item['id'], 'error_code': error_code})
 
             if error_code == 'ConditionalCheckFailedException':
                 raise HTTPException(status_code=409, detail="Note with this ID already exists")
@@ -76,104 +325,988 @@ def create_note(note: Note):
             raise HTTPException(status_code=500, detail=f"Error creating note: {str(e)}")
 
         # Return the created item as a response
-        return {
-            'id': item['id'],
-            'title': item['title'],
-            'body': item['body'],
-            'created_at': item['created_at'],
-            'updated_at': item['updated_at']
-        }
+        note = to_public(item)
+        note_events.publish('created', note)
+        return note
     
     except HTTPException as http_exc:
-        print(f"HTTPException: {http_exc.detail}")  # Debug log
         raise http_exc
 
     except Exception as e:
-        print(f"Unexpected error in create_note: {str(e)}")  # Debug log
+        logger.exception("unexpected error in create_note")
         raise HTTPException(status_code=500, detail=f"Unexpected error creating note: {str(e)}")
 
-def get_note(note_id: str) -> Optional[Note]:
+def note_etag(item: dict) -> str:
+    """Strong ETag for one note: an opaque encoding of its updated_at.
+
+    Every write sets updated_at, so it doubles as the note's version, and an
+    If-Match value can be turned back into a write condition without a read.
+    """
+    version = item.get('updated_at') or item.get('created_at') or ''
+    return '"' + base64.urlsafe_b64encode(version.encode('utf-8')).decode('ascii').rstrip('=') + '"'
+
+
+def etag_version(etag: str) -> Optional[str]:
+    """The updated_at a strong ETag stands for, or None if it isn't one of ours"""
+    etag = etag.strip()
+    if not (len(etag) >= 2 and etag[0] == etag[-1] == '"'):
+        return None
+    try:
+        token = etag[1:-1]
+        return base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+    except (ValueError, UnicodeError):
+        return None
+
+
+def collection_etag(rows: List[dict], fields: str = 'full', order: Optional[str] = None) -> str:
+    """Weak ETag for a list of notes: changes whenever any note is added,
+    removed or rewritten, independent of the (unordered) scan order."""
+    combined, mask = 0, (1 << 64) - 1
+    for row in rows:
+        digest = hashlib.blake2b(f"{row.get('id')}|{row.get('updated_at')}".encode('utf-8'), digest_size=8).digest()
+        combined = (combined + int.from_bytes(digest, 'big')) & mask
+    # Summary and full listings are different representations of the same notes
+    prefix = ('s-' if fields == 'summary' else '') + ('r-' if order == 'recent' else '')
+    return f'W/"{prefix}{len(rows):x}-{combined:016x}"'
+
+
+def get_note_item(note_id: str) -> dict:
+    """Fetch one live note's storage item (read through the cache)"""
     if not note_id or not isinstance(note_id, str):
         raise HTTPException(status_code=400, detail="Invalid note ID")
 
+    item = note_cache.get(note_id)
+    if item is None:
+        item = note_reads.do(note_id, lambda: _read_note_item(note_id))
+
+    # Tombstones are cached too, so repeated reads of a deleted note stay cheap
+    if 'deleted_at' in item:
+        raise HTTPException(status_code=404, detail=f"No note found with ID: {note_id}")
+    return _with_pending(item)
+
+
+def _read_note_item(note_id: str) -> dict:
+    """One get_item, filling the cache; 404 if the id was never written"""
     try:
+        token = note_cache.begin()
         response = table.get_item(Key={'id': note_id})
-        
-        if 'Item' in response:
-            return Note(**response['Item'])
-         
-        else:
-            raise HTTPException(status_code=404, detail=f"No note found with ID: {note_id}")
     except ClientError as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving note: {e}")
 
+    if 'Item' not in response:
+        raise HTTPException(status_code=404, detail=f"No note found with ID: {note_id}")
+    note_cache.set(note_id, response['Item'], token)
+    return response['Item']
+
+
+def _with_pending(item: dict) -> dict:
+    """Overlay an update still parked in the write-behind buffer onto a stored item"""
+    pending = write_behind.pending(item['id']) if write_behind is not None else None
+    if pending is None:
+        return item
+    merged = {key: value for key, value in item.items() if key not in BODY_ATTRIBUTES}
+    merged.update(pending)
+    return merged
+
+
+def get_note_row(note_id: str) -> dict:
+    """Fetch one note as a plain dict (read through the cache)"""
+    return to_public(get_note_item(note_id))
+
+
+def get_note(note_id: str) -> Optional[Note]:
+    item = get_note_item(note_id)
+    row = to_public(item)
+    if 'body_ref' in item:
+        # The model needs the whole body, so an offloaded one is read back in
+        row['body'] = read_body(item)
+    return Note(row['title'], row['body'], row['id'], row.get('created_at'))
+
 
-def get_all_notes() -> List[Note]:
+def read_body(item: dict) -> str:
+    """A note's whole body as text, inline or offloaded"""
+    if 'body_ref' in item:
+        return b''.join(open_note_body(item)).decode('utf-8')
+    return body_text(item)
+
+
+def note_body_size(item: dict) -> int:
+    """Size in bytes of a note's UTF-8 body, inline or offloaded"""
+    if 'body_ref' in item:
+        return int(item['body_size'])
+    return len(body_text(item).encode('utf-8'))
+
+
+def open_note_body(item: dict, start: int = 0, end: Optional[int] = None):
+    """Iterate the bytes [start, end] (inclusive) of a note's body in chunks.
+
+    Offloaded bodies are streamed from the blob store without being loaded
+    whole; the source is opened before this returns.
+    """
+    if 'body_ref' not in item:
+        data = body_text(item).encode('utf-8')
+        return iter((data[start:None if end is None else end + 1],))
     try:
-        response = table.scan()
-        items = response.get('Items', [])
-        
-        if not items:
-            print("No notes found in the database.")
-            return []
+        return get_blob_store().open_range(item['body_ref'], start, end)
+    except BlobNotFound:
+        logger.error("body blob missing", extra={'note_id': item['id']})
+        raise HTTPException(status_code=500, detail="Note body is unavailable")
+
+
+def note_body_url(item: dict) -> Optional[str]:
+    """Presigned URL of an offloaded body, or None if the blob store can't make one"""
+    presign = getattr(get_blob_store(), 'presigned_url', None)
+    if 'body_ref' not in item or presign is None:
+        return None
+    return presign(item['body_ref'])
+
+
+def encode_cursor(last_key: Optional[dict]) -> Optional[str]:
+    """Turn a DynamoDB LastEvaluatedKey into an opaque continuation token"""
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    """Turn a continuation token back into an ExclusiveStartKey"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(key, dict) or 'id' not in key or not all(
+        isinstance(k, str) and isinstance(v, (str, int)) for k, v in key.items()
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def _listing_start_key(cursor: Optional[str], key_attributes: tuple) -> Optional[dict]:
+    """decode_cursor, rejecting tokens issued by a listing with a different key
+    (DynamoDB would otherwise fail the request with a ValidationException)"""
+    start_key = decode_cursor(cursor)
+    if start_key is not None and set(start_key) != set(key_attributes):
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this listing order")
+    return start_key
+
+
+def iter_note_pages(limit: Optional[int] = None, cursor: Optional[str] = None, projection: Optional[str] = None):
+    """Lazily yield (items, next_cursor) pages of the table, following LastEvaluatedKey"""
+    start_key = _listing_start_key(cursor, ('id',))
+
+    while True:
+        scan_kwargs = {'FilterExpression': LIVE_NOTES}
+        if projection:
+            scan_kwargs['ProjectionExpression'] = projection
+        if limit:
+            scan_kwargs['Limit'] = limit
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+
+        try:
+            response = table.scan(**scan_kwargs)
+        except ClientError as e:
+            logger.error("scan failed", extra={'error_code': e.response['Error']['Code']})
+            raise HTTPException(status_code=500, detail=f"Error retrieving notes: {e}")
+
+        start_key = response.get('LastEvaluatedKey')
+        yield response.get('Items', []), encode_cursor(start_key)
+
+        if not start_key:
+            return
+
+
+def iter_recent_pages(limit: Optional[int] = None, cursor: Optional[str] = None, projection: Optional[str] = None):
+    """Lazily yield (items, next_cursor) pages of live notes, newest created first.
+
+    Served by a descending Query on the recent index, so a page of N costs
+    one query reading N items however large the table is.
+    """
+    start_key = _listing_start_key(cursor, ('id', 'list_bucket', 'created_at'))
+
+    while True:
+        query_kwargs = {
+            'IndexName': RECENT_INDEX,
+            'KeyConditionExpression': "list_bucket = :bucket",
+            'ExpressionAttributeValues': {':bucket': LIST_BUCKET},
+            'ScanIndexForward': False
+        }
+        if projection:
+            query_kwargs['ProjectionExpression'] = projection
+        if limit:
+            query_kwargs['Limit'] = limit
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
+
+        try:
+            response = table.query(**query_kwargs)
+        except ClientError as e:
+            logger.error("recent query failed", extra={'error_code': e.response['Error']['Code']})
+            raise HTTPException(status_code=500, detail=f"Error retrieving notes: {e}")
+
+        start_key = response.get('LastEvaluatedKey')
+        yield response.get('Items', []), encode_cursor(start_key)
+
+        if not start_key:
+            return
+
+
+def list_notes_page(limit: int = DEFAULT_PAGE_LIMIT, cursor: Optional[str] = None, fields: str = 'full',
+                    order: Optional[str] = None) -> dict:
+    """Return a single bounded page of notes plus the token for the next one"""
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+    _check_fields(fields)
+    _check_order(order)
+    return list_reads.do(('page', limit, cursor, fields, order),
+                         lambda: _read_notes_page(limit, cursor, fields, order))
+
+
+def _read_notes_page(limit: int, cursor: Optional[str], fields: str, order: Optional[str]) -> dict:
+    pages = iter_recent_pages if order == 'recent' else iter_note_pages
+    projection = SUMMARY_PROJECTION if fields == 'summary' else None
+
+    # Limit counts the tombstones a scan filters out, so a page can come back
+    # short; keep reading (asking only for what is missing, so no page
+    # overshoots its cursor) until the page is full or LIST_MAX_READS is hit
+    items, next_cursor = [], cursor
+    for _ in range(LIST_MAX_READS):
+        page, next_cursor = next(pages(limit - len(items), next_cursor, projection))
+        items.extend(page)
+        if len(items) >= limit or next_cursor is None:
+            break
+
+    if fields == 'summary':
+        return {'notes': _summaries(items), 'next_cursor': next_cursor}
+    return {
+        'notes': [to_public(item) for item in items],
+        'next_cursor': next_cursor
+    }
+
+
+def iter_segment_pages(segment: int, total_segments: int, start_key: Optional[dict] = None,
+                       projection: Optional[str] = None, filter_expression: str = LIVE_NOTES):
+    """Lazily yield (items, last_key) pages for one segment of a parallel scan"""
+    while True:
+        scan_kwargs = {'Segment': segment, 'TotalSegments': total_segments, 'FilterExpression': filter_expression}
+        if projection:
+            scan_kwargs['ProjectionExpression'] = projection
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+
+        try:
+            response = table.scan(**scan_kwargs)
+        except ClientError as e:
+            logger.error("segment scan failed", extra={'segment': segment, 'total_segments': total_segments,
+                                                        'error_code': e.response['Error']['Code']})
+            raise HTTPException(status_code=500, detail=f"Error retrieving notes: {e}")
 
-        notes = [Note(**item) for item in items]
-        return notes
+        start_key = response.get('LastEvaluatedKey')
+        yield response.get('Items', []), start_key
+
+        if not start_key:
+            return
+
+
+# Items written before the changes and recent indexes existed; tombstones
+# never carry list_bucket
+MISSING_BUCKETS = f"attribute_not_exists(sync_bucket) OR (attribute_not_exists(list_bucket) AND {LIVE_NOTES})"
+
+
+def backfill_buckets(item: dict) -> bool:
+    """Add sync_bucket (and list_bucket for live notes) to an item from before them.
+
+    False if the item changed underneath: every write since sets them itself.
+    """
+    values = {':sb': SYNC_BUCKET}
+    if 'deleted_at' in item:
+        expression, condition = "set sync_bucket = :sb", "attribute_exists(id)"
+    else:
+        values[':lb'] = LIST_BUCKET
+        expression, condition = "set sync_bucket = :sb, list_bucket = :lb", f"attribute_exists(id) AND {LIVE_NOTES}"
+    try:
+        table.update_item(Key={'id': item['id']}, UpdateExpression=expression, ConditionExpression=condition,
+                          ExpressionAttributeValues=values)
     except ClientError as e:
-        print(f"Error retrieving notes: {e}")
-        raise HTTPException(status_code=500, detail=f"Error retrieving notes: {e}")
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise HTTPException(status_code=500, detail=f"Error backfilling note {item['id']}: {e}")
+    note_cache.invalidate(item['id'])
+    return True
+
+
+_SEGMENT_DONE = object()
+
+
+def parallel_scan(total_segments: Optional[int] = None, projection: Optional[str] = None):
+    """Yield every item in the table, scanning segments on a thread pool.
+
+    Pages are handed over through a bounded queue as soon as any segment
+    produces them, so memory stays flat and slow segments don't hold up the
+    others.
+    """
+    total_segments = total_segments or SCAN_SEGMENTS
+    if total_segments <= 1:
+        for items, _ in iter_note_pages(projection=projection):
+            yield from items
+        return
+
+    pages = queue.Queue(maxsize=total_segments * 2)
+    stop = threading.Event()
+
+    def put(value):
+        # Give up if the consumer went away instead of blocking forever
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment):
+        try:
+            for items, _ in iter_segment_pages(segment, total_segments, projection=projection):
+                if not put(items):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(_SEGMENT_DONE)
+
+    with ThreadPoolExecutor(max_workers=total_segments, thread_name_prefix='scan') as executor:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+
+        remaining = total_segments
+        try:
+            while remaining:
+                page = pages.get()
+                if page is _SEGMENT_DONE:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield from page
+        finally:
+            stop.set()
+
+
+def _iter_recent(projection: Optional[str] = None):
+    for items, _ in iter_recent_pages(projection=projection):
+        yield from items
+
+
+def get_all_note_rows(total_segments: Optional[int] = None, fields: str = 'full',
+                      order: Optional[str] = None) -> List[dict]:
+    """Every note as a plain dict; storage rows are trusted, so no model validation"""
+    _check_fields(fields)
+    _check_order(order)
+    return list_reads.do(('all', total_segments, fields, order),
+                         lambda: _read_all_note_rows(total_segments, fields, order))
+
+
+def _read_all_note_rows(total_segments: Optional[int], fields: str, order: Optional[str]) -> List[dict]:
+    projection = SUMMARY_PROJECTION if fields == 'summary' else None
+    if order == 'recent':
+        # One sequential walk of the index instead of a parallel scan
+        items = _iter_recent(projection)
+    else:
+        items = parallel_scan(total_segments, projection)
+    if fields == 'summary':
+        return _summaries(list(items))
+    return [to_public(item) for item in items]
+
+
+def _summaries(items: List[dict]) -> List[dict]:
+    """Summary rows for projected items.
+
+    Notes written before snippets were stored have none; their bodies are
+    fetched with batch reads (100 per call, however many are missing) and the
+    snippet is derived from them.
+    """
+    rows = [to_summary(item) for item in items]
+    missing = [row['id'] for row in rows if 'snippet' not in row]
+    if missing:
+        found, _ = _batch_get_items(missing)
+        for row in rows:
+            item = found.get(row['id'])
+            if 'snippet' not in row and item is not None and 'deleted_at' not in item:
+                row['snippet'] = make_snippet(read_body(item))
+    return rows
+
+
+def _version_condition(expected_versions: Optional[List[str]], condition: str, values: dict) -> str:
+    """Extend a write condition with an If-Match check on updated_at"""
+    if not expected_versions:
+        return condition
+    checks = []
+    for index, version in enumerate(expected_versions):
+        values[f':expected{index}'] = version
+        checks.append(f"updated_at = :expected{index}")
+    return f"{condition} AND ({' OR '.join(checks)})"
+
 
-def update_note(note_id: str, note_data: dict):
+def _raise_condition_failed(e: ClientError, note_id: str):
+    # With ReturnValuesOnConditionCheckFailure the error carries the current
+    # item, which tells a version mismatch (412) apart from a missing or
+    # deleted note (404)
+    item = e.response.get('Item')
+    if item and 'deleted_at' not in item:
+        raise HTTPException(status_code=412, detail="Note has been modified since it was read")
+    raise HTTPException(status_code=404, detail=f"No note found with ID: {note_id}")
+
+
+def update_note(note_id: str, note_data: dict, expected_versions: Optional[List[str]] = None):
+    """Update a note, through the write-behind buffer when it is enabled.
+
+    Returns {'Attributes': item} like update_item with ReturnValues ALL_NEW.
+    """
+    if write_behind is None:
+        return write_note_update(note_id, note_data, expected_versions)
+    if expected_versions:
+        # If-Match is checked against storage, so land any parked update first
+        write_behind.flush_note(note_id)
+        writebehind_bypassed.inc('conditional')
+        return write_note_update(note_id, note_data, expected_versions)
+
+    # A parked update is answered before it is written, so anything the write
+    # would reject for good has to be rejected now
+    check_body_size(note_data['body'].encode('utf-8'))
+    base = write_behind.pending(note_id)
+    if base is None:
+        # Missing and deleted notes 404 now, not when the write lands
+        base = to_public(get_note_item(note_id))
+    row = {
+        'id': note_id,
+        'title': note_data['title'],
+        'body': note_data['body'],
+        'created_at': base.get('created_at'),
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }
+    if not write_behind.submit(note_id, row):
+        # An older update to this note may be in flight; it must not land after this one
+        write_behind.flush_note(note_id)
+        return write_note_update(note_id, note_data, updated_at=row['updated_at'])
+    search_index.add(note_id, row['title'], row['body'])
+    # Subscribers see the update when readers do, not when it is flushed
+    note_events.publish('updated', row)
+    return {'Attributes': row}
+
+
+def _flush_update(note_id: str, row: dict):
+    write_note_update(note_id, row, updated_at=row['updated_at'], publish=False)
+
+
+def _revert_dropped(note_id: str):
+    """Put search and subscribers back on the stored note after a parked update was dropped"""
+    note_cache.invalidate(note_id)
     try:
+        item = get_note_item(note_id)
+    except HTTPException as e:
+        # A delete already removed it from the index and told subscribers
+        if e.status_code != 404:
+            logger.error("could not restore dropped update", extra={'note_id': note_id, 'error': e.detail})
+        return
+    search_index.add(note_id, item['title'], _search_text(item))
+    # Older than the update subscribers were sent, so not an `updated` they would ignore
+    note_events.publish('reverted', to_public(item))
+
+
+def write_note_update(note_id: str, note_data: dict, expected_versions: Optional[List[str]] = None,
+                      updated_at: Optional[str] = None, publish: bool = True):
+    """Write an update straight to storage (one conditional update_item)"""
+    changes = pack_body({
+        'id': note_id,
+        'title': note_data['title'],
+        'body': note_data['body'],
+        'snippet': make_snippet(note_data['body']),
+        'updated_at': updated_at or datetime.now(timezone.utc).isoformat(),
+        'sync_bucket': SYNC_BUCKET,
+        'list_bucket': LIST_BUCKET
+    })
+    try:
+        values = {
+            ':t': changes['title'],
+            ':u': changes['updated_at'],
+            ':sb': SYNC_BUCKET,
+            ':lb': LIST_BUCKET,
+            ':s': changes['snippet']
+        }
+        if 'body_ref' in changes:
+            values[':ref'], values[':size'] = changes['body_ref'], changes['body_size']
+            body_clause = "body_ref = :ref, body_size = :size remove body, body_codec"
+        elif 'body_codec' in changes:
+            values[':b'], values[':codec'] = changes['body'], changes['body_codec']
+            body_clause = "body = :b, body_codec = :codec remove body_ref, body_size"
+        else:
+            values[':b'] = changes['body']
+            body_clause = "body = :b remove body_ref, body_size, body_codec"
+        # The condition makes this a single round trip that 404s on missing notes
+        # instead of silently creating them (and 412s on a stale If-Match).
+        # ALL_OLD tells us which body blob (if any) the update replaced.
         response = table.update_item(
             Key={'id': note_id},
-            UpdateExpression="set title = :t, body = :b, updated_at = :u",
-            ExpressionAttributeValues={
-                ':t': note_data['title'],
-                ':b': note_data['body'],
-                ':u': datetime.now(timezone.utc).isoformat()
-            },
-            ReturnValues="ALL_NEW"
+            UpdateExpression=f"set title = :t, snippet = :s, updated_at = :u, sync_bucket = :sb, "
+                             f"list_bucket = :lb, {body_clause}",
+            ConditionExpression=_version_condition(expected_versions, f"attribute_exists(id) AND {LIVE_NOTES}", values),
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_OLD",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD"
         )
-        return response
-    except ClientError as e:
+    except (ClientError, StorageThrottled) as e:
+        note_cache.invalidate(note_id)
+        delete_body_blob(changes)
+        if isinstance(e, StorageThrottled):
+            raise
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            _raise_condition_failed(e, note_id)
         raise HTTPException(status_code=500, detail=f"Error updating note: {e}")
+
+    note_cache.invalidate(note_id)
+    search_index.add(note_id, note_data['title'], note_data['body'])
+    old = response.get('Attributes', {})
+    delete_body_blob(old, keep=changes.get('body_ref'))
+
+    # Same shape as ReturnValues="ALL_NEW", built locally from the old item
+    new = {key: value for key, value in old.items() if key not in BODY_ATTRIBUTES}
+    new.update(changes)
+    response['Attributes'] = new
+    if publish:
+        note_events.publish('updated', to_public(new))
+    return response
     
 
-def delete_note(note_id: str):
+def delete_note(note_id: str, expected_versions: Optional[List[str]] = None):
     try:
         # Validate note_id
         if not note_id or not isinstance(note_id, str):
             raise HTTPException(status_code=400, detail="Invalid note ID")
         
-        # First, check if the note exists
-        existing_note = get_note(note_id)
-        if not existing_note:
-            raise HTTPException(status_code=404, detail="Note not found")
-        
-        print(f"Attempting to delete note with ID: {note_id}")  # Debug log
+        logger.debug("deleting note", extra={'note_id': note_id})
+
+        if write_behind is not None:
+            if expected_versions:
+                # If-Match may name the version of a parked update
+                write_behind.flush_note(note_id)
+            else:
+                write_behind.discard(note_id)
         
-        # Delete the note from DynamoDB
-        response = table.delete_item(
+        # The note is replaced by a tombstone (id + timestamps) so delta-sync
+        # clients learn about the delete; the condition replaces a separate
+        # existence check, so a missing note costs one request and maps to 404
+        tombstone = tombstone_item(note_id)
+        values = {
+            ':now': tombstone['deleted_at'],
+            ':expires': tombstone['expires_at'],
+            ':sb': SYNC_BUCKET
+        }
+        response = table.update_item(
             Key={'id': note_id},
-            ReturnValues="ALL_OLD"  # Return the deleted item
+            UpdateExpression="set deleted_at = :now, updated_at = :now, expires_at = :expires, sync_bucket = :sb "
+                             "remove title, body, snippet, body_ref, body_size, body_codec, list_bucket",
+            ConditionExpression=_version_condition(expected_versions, f"attribute_exists(id) AND {LIVE_NOTES}", values),
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_OLD",  # Return the deleted item
+            ReturnValuesOnConditionCheckFailure="ALL_OLD"
         )
-        
-        print(f"Delete response: {response}")  # Debug log
+        note_cache.invalidate(note_id)
+        search_index.remove(note_id)
+        note_events.publish('deleted', {'id': note_id, 'deleted_at': tombstone['deleted_at']})
+        delete_body_blob(response.get('Attributes'))
         
         # Check if the deletion was successful (Attributes contains the deleted item)
         if 'Attributes' not in response:
             raise HTTPException(status_code=500, detail="Failed to delete note")
         
-        deleted_note = response['Attributes']
+        deleted_note = to_public(response['Attributes'])
         return {"message": "Note deleted successfully", "deleted_note": deleted_note}
         
     except ClientError as e:
+        note_cache.invalidate(note_id)
         error_code = e.response['Error']['Code']
-        print(f"DynamoDB error: {error_code} - {str(e)}")  # Debug log
+        if error_code == 'ConditionalCheckFailedException':
+            _raise_condition_failed(e, note_id)
+        logger.error("delete failed", extra={'note_id': note_id, 'error_code': error_code})
         raise HTTPException(status_code=500, detail=f"Error deleting note: {str(e)}")
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in delete_note: {str(e)}")  # Debug log
+        logger.exception("unexpected error in delete_note", extra={'note_id': note_id})
         raise HTTPException(status_code=500, detail=f"Unexpected error deleting note: {str(e)}")
+
+
+def _chunks(values: list, size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _backoff(attempt: int):
+    """Sleep with capped exponential backoff and full jitter"""
+    time.sleep(random.uniform(0, min(BATCH_BACKOFF_CAP, BATCH_BACKOFF_BASE * 2 ** attempt)))
+
+
+def _check_batch_size(values: list):
+    if not values:
+        raise HTTPException(status_code=400, detail="Batch must not be empty")
+    if len(values) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch cannot exceed {MAX_BATCH_SIZE} items")
+
+
+def _unique_ids(note_ids: List[str]) -> List[str]:
+    """Deduplicate ids preserving order; DynamoDB rejects duplicate keys in one batch"""
+    for note_id in note_ids:
+        if not note_id or not isinstance(note_id, str):
+            raise HTTPException(status_code=400, detail="Invalid note ID")
+    return list(dict.fromkeys(note_ids))
+
+
+def _batch_error_status(e: ClientError) -> int:
+    """Status for a batch call that failed outright; only throttles are worth a retry"""
+    return 400 if e.response['Error']['Code'] == 'ValidationException' else 500
+
+
+def batch_write_items(requests: List[dict]) -> dict:
+    """Send PutRequest/DeleteRequest entries in chunks of 25, retrying
+    UnprocessedItems with backoff. Returns {note_id: (status, error)} for
+    requests that still failed: 503 when throttled or unprocessed, 400 for a
+    rejected request and 500 for any other error."""
+    failed = {}
+    for chunk in _chunks(requests, BATCH_WRITE_LIMIT):
+        pending, status, error = chunk, 503, "Unprocessed after retries"
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            try:
+                response = dynamodb.batch_write_item(RequestItems={table.name: pending})
+            except StorageThrottled as e:
+                # Throttled even after botocore's retries (or shed locally): back off and retry
+                error = e.detail
+                logger.warning("batch request throttled")
+            except ClientError as e:
+                logger.warning("batch request failed", extra={'error_code': e.response['Error']['Code']})
+                if _batch_error_status(e) == 400 and len(pending) > 1:
+                    # One bad item (e.g. over the item size limit) fails the
+                    # whole call; write them one by one to find it
+                    for request in pending:
+                        failed.update(batch_write_items([request]))
+                    pending = []
+                else:
+                    status, error = _batch_error_status(e), f"Error writing batch: {e}"
+                break
+            else:
+                pending = response.get('UnprocessedItems', {}).get(table.name, [])
+                if not pending:
+                    break
+            if attempt + 1 < BATCH_MAX_ATTEMPTS:
+                _backoff(attempt)
+
+        for request in pending:
+            key = request['PutRequest']['Item'] if 'PutRequest' in request else request['DeleteRequest']['Key']
+            failed[key['id']] = (status, error)
+    return failed
+
+
+def batch_create_notes(notes: List[Note]) -> List[dict]:
+    """Create many notes with batch_write_item; results are reported per input position"""
+    _check_batch_size(notes)
+
+    results, items = [], {}
+    for index, note in enumerate(notes):
+        try:
+            item = pack_body(new_note_item(note))
+        except HTTPException as e:
+            results.append({'index': index, 'status': e.status_code, 'error': e.detail})
+            continue
+        items[item['id']] = item
+        results.append({'index': index, 'status': 200, 'note': to_public(item)})
+
+    failed = batch_write_items([{'PutRequest': {'Item': item}} for item in items.values()])
+    for result in results:
+        note = result.get('note')
+        if note is not None:
+            note_cache.invalidate(note['id'])
+            if note['id'] in failed:
+                delete_body_blob(items[note['id']])
+                status, error = failed[note['id']]
+                result.update(status=status, error=error)
+                del result['note']
+            else:
+                search_index.add(note['id'], note['title'], notes[result['index']].body.strip())
+                note_events.publish('created', note)
+    return results
+
+
+def _batch_get_items(note_ids: List[str], use_cache: bool = True):
+    """Read notes with batch_get_item in chunks of 100, retrying UnprocessedKeys.
+
+    No size limit. Returns ({note_id: item}, {note_id: (status, error)});
+    deleted notes come back as their tombstones and missing ones are in
+    neither. Errors are 503 when throttled or unprocessed, otherwise as in
+    batch_write_items.
+    """
+    found, errors, to_fetch = {}, {}, []
+    for note_id in note_ids:
+        item = note_cache.get(note_id) if use_cache else None
+        if item is not None:
+            found[note_id] = item
+        else:
+            to_fetch.append(note_id)
+
+    for chunk in _chunks(to_fetch, BATCH_GET_LIMIT):
+        pending, status, error = [{'id': note_id} for note_id in chunk], 503, "Unprocessed after retries"
+        token = note_cache.begin()
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            try:
+                response = dynamodb.batch_get_item(RequestItems={table.name: {'Keys': pending}})
+            except StorageThrottled as e:
+                # Throttled even after botocore's retries (or shed locally): back off and retry
+                error = e.detail
+                logger.warning("batch request throttled")
+            except ClientError as e:
+                status, error = _batch_error_status(e), f"Error retrieving batch: {e}"
+                logger.warning("batch request failed", extra={'error_code': e.response['Error']['Code']})
+                break
+            else:
+                for item in response.get('Responses', {}).get(table.name, []):
+                    found[item['id']] = item
+                    note_cache.set(item['id'], item, token)
+                pending = response.get('UnprocessedKeys', {}).get(table.name, {}).get('Keys', [])
+                if not pending:
+                    break
+            if attempt + 1 < BATCH_MAX_ATTEMPTS:
+                _backoff(attempt)
+
+        for key in pending:
+            errors[key['id']] = (status, error)
+    return found, errors
+
+
+def batch_get_notes(note_ids: List[str]) -> List[dict]:
+    """Fetch many notes with batch_get_item (cache first); results are reported per id"""
+    _check_batch_size(note_ids)
+    note_ids = _unique_ids(note_ids)
+    found, errors = _batch_get_items(note_ids)
+
+    results = []
+    for note_id in note_ids:
+        if note_id in found and 'deleted_at' not in found[note_id]:
+            results.append({'id': note_id, 'status': 200, 'note': to_public(found[note_id])})
+        elif note_id in errors:
+            status, error = errors[note_id]
+            results.append({'id': note_id, 'status': status, 'error': error})
+        else:
+            results.append({'id': note_id, 'status': 404, 'error': "Note not found"})
+    return results
+
+
+def tombstone_item(note_id: str, deleted_at: Optional[datetime] = None) -> dict:
+    """The item that replaces a deleted note until the table TTL expires it"""
+    deleted_at = deleted_at or datetime.now(timezone.utc)
+    return {
+        'id': note_id,
+        'deleted_at': deleted_at.isoformat(),
+        'updated_at': deleted_at.isoformat(),
+        'expires_at': int(deleted_at.timestamp()) + TOMBSTONE_TTL_DAYS * 86400,
+        'sync_bucket': SYNC_BUCKET
+    }
+
+
+def batch_delete_notes(note_ids: List[str]) -> List[dict]:
+    """Delete many notes with batch_write_item; results are reported per id.
+
+    Batch writes cannot carry conditions, so which notes exist is read first
+    (one batch_get_item per 100 ids, bypassing the cache). Missing and already
+    deleted notes are 404 like a single delete, and only live notes get a
+    tombstone.
+    """
+    _check_batch_size(note_ids)
+    note_ids = _unique_ids(note_ids)
+    if write_behind is not None:
+        for note_id in note_ids:
+            write_behind.discard(note_id)
+
+    found, errors = _batch_get_items(note_ids, use_cache=False)
+    live = [note_id for note_id in note_ids if note_id in found and 'deleted_at' not in found[note_id]]
+    deleted_at = datetime.now(timezone.utc)
+    failed = dict(errors)
+    failed.update(batch_write_items([
+        {'PutRequest': {'Item': tombstone_item(note_id, deleted_at)}} for note_id in live
+    ]))
+
+    results = []
+    for note_id in note_ids:
+        note_cache.invalidate(note_id)
+        if note_id in failed:
+            status, error = failed[note_id]
+            results.append({'id': note_id, 'status': status, 'error': error})
+        elif note_id not in live:
+            results.append({'id': note_id, 'status': 404, 'error': f"No note found with ID: {note_id}"})
+        else:
+            search_index.remove(note_id)
+            delete_body_blob(found[note_id])
+            note_events.publish('deleted', {'id': note_id, 'deleted_at': deleted_at.isoformat()})
+            results.append({'id': note_id, 'status': 200})
+    return results
+
+
+def _parse_watermark(since: Optional[str]) -> Optional[str]:
+    if since is None:
+        return None
+    # A '+' in an unencoded query string arrives as a space
+    since = since.strip().replace(' ', '+')
+    if since.endswith(('Z', 'z')):
+        # fromisoformat only accepts 'Z' from Python 3.11
+        since = since[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since must be an ISO 8601 timestamp")
+    # Stored timestamps are UTC isoformat() strings and compared as strings,
+    # so the watermark has to be rendered the same way
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def get_changes(since: Optional[str] = None, limit: int = DEFAULT_PAGE_LIMIT, cursor: Optional[str] = None) -> dict:
+    """Notes created, updated or deleted after the `since` watermark, oldest first.
+
+    Served by a Query on the changes index, so the cost is proportional to the
+    number of changes rather than the table size. Deleted notes come back as
+    {'id', 'deleted': True, 'updated_at'} tombstones. Pass the returned
+    watermark as `since` next time, or next_cursor to continue this page.
+
+    The watermark never passes now - CHANGES_SAFETY_LAG, nor the oldest
+    parked write-behind update, which keeps the updated_at it was accepted
+    with but lands up to a window later. Changes after it may be returned
+    again on the next call; clients dedupe by (id, updated_at).
+    """
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+    since = _parse_watermark(since)
+
+    values = {':bucket': SYNC_BUCKET}
+    key_condition = "sync_bucket = :bucket"
+    if since:
+        values[':since'] = since
+        key_condition += " AND updated_at > :since"
+
+    query_kwargs = {
+        'IndexName': CHANGES_INDEX,
+        'KeyConditionExpression': key_condition,
+        'ExpressionAttributeValues': values,
+        'ScanIndexForward': True,
+        'Limit': limit
+    }
+    start_key = _listing_start_key(cursor, ('id', 'sync_bucket', 'updated_at'))
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+
+    held = write_behind.oldest('updated_at') if write_behind is not None else None
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=CHANGES_SAFETY_LAG)).isoformat()
+    try:
+        response = table.query(**query_kwargs)
+    except ClientError as e:
+        logger.error("changes query failed", extra={'error_code': e.response['Error']['Code']})
+        raise HTTPException(status_code=500, detail=f"Error retrieving changes: {e}")
+    if write_behind is not None:
+        # Also hold for updates parked while the query ran
+        held = min((value for value in (held, write_behind.oldest('updated_at')) if value), default=None)
+    held = min(held, cutoff) if held is not None else cutoff
+
+    changes = []
+    for item in response.get('Items', []):
+        if 'deleted_at' in item:
+            changes.append({'id': item['id'], 'deleted': True, 'updated_at': item['updated_at']})
+        else:
+            changes.append(to_public(item))
+
+    watermark = changes[-1]['updated_at'] if changes else since
+    if watermark is not None and watermark >= held:
+        before = [change['updated_at'] for change in changes if change['updated_at'] < held]
+        watermark = before[-1] if before else since
+
+    return {
+        'changes': changes,
+        'watermark': watermark,
+        'next_cursor': encode_cursor(response.get('LastEvaluatedKey'))
+    }
+
+
+def _search_text(item: dict) -> str:
+    # Offloaded bodies aren't read back for a rebuild; their snippet is indexed instead
+    if 'body' not in item:
+        return item.get('snippet', '')
+    return body_text(item)
+
+
+def rebuild_search_index(total_segments: Optional[int] = None) -> SearchIndex:
+    """Rebuild the search index from a full table scan and save it if a path is configured"""
+    search_index.rebuild(dict(item, body=_search_text(item)) for item in parallel_scan(total_segments))
+    save_search_index()
+    return search_index
+
+
+def ensure_search_index() -> SearchIndex:
+    """Load the saved index or rebuild it from a scan, once per process"""
+    if search_index.ready:
+        return search_index
+
+    with _search_build_lock:
+        if search_index.ready:
+            return search_index
+        if SEARCH_INDEX_PATH and os.path.exists(SEARCH_INDEX_PATH):
+            try:
+                if search_index.load(SEARCH_INDEX_PATH):
+                    return search_index
+            except (OSError, ValueError) as e:
+                logger.warning("could not load search index", extra={'path': SEARCH_INDEX_PATH, 'error': str(e)})
+        return rebuild_search_index()
+
+
+def close_write_behind():
+    """Write every parked update and stop buffering (on shutdown)"""
+    if write_behind is not None:
+        write_behind.close()
+
+
+def save_search_index():
+    if SEARCH_INDEX_PATH and search_index.ready:
+        try:
+            search_index.save(SEARCH_INDEX_PATH)
+        except OSError as e:
+            logger.warning("could not save search index", extra={'path': SEARCH_INDEX_PATH, 'error': str(e)})
+
+
+def search_notes(query: str, limit: int = 20) -> List[dict]:
+    """Ranked full-text search over titles and bodies"""
+    query = (query or '').strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="Search query cannot be empty")
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+
+    hits = ensure_search_index().search(query, limit)
+    if not hits:
+        return []
+
+    fetched = {result['id']: result for result in batch_get_notes([note_id for note_id, _ in hits])}
+    # A page with holes would look like a complete (and wrong) ranking
+    if any(result['status'] == 503 for result in fetched.values()):
+        raise StorageThrottled(THROTTLE_RETRY_AFTER)
+    for result in fetched.values():
+        if result['status'] not in (200, 404):
+            raise HTTPException(status_code=500, detail=result['error'])
+    results = []
+    for note_id, score in hits:
+        result = fetched[note_id]
+        if result['status'] == 200:
+            results.append({'score': round(score, 4), 'note': result['note']})
+        elif result['status'] == 404:
+            # Deleted by another process since the index was built
+            search_index.remove(note_id)
+    return results
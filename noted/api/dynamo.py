@@ -0,0 +1,204 @@
+#api/dynamo.py
+"""One lazily created DynamoDB resource shared by every entry point.
+
+boto3 costs a few hundred milliseconds to import and build a resource, so
+nothing here touches it until the first storage call. After that the same
+resource (and its connection pool) is reused for the life of the process,
+which on Lambda means across warm invocations.
+
+Every table/resource call goes through a thin proxy that records call
+counts, outcomes, latency and consumed capacity in `api.metrics`. The proxy
+also enforces the optional client-side capacity limits and turns throttling
+(ours or DynamoDB's, once botocore has stopped retrying) into a 503 with
+Retry-After instead of an opaque 500.
+"""
+import math
+import os
+import threading
+import time
+
+from starlette.exceptions import HTTPException
+
+from .logs import get_logger
+from .metrics import dynamodb_consumed_capacity, dynamodb_request_duration, dynamodb_requests, dynamodb_throttled
+from .ratelimit import TokenBucket
+
+TABLE_NAME = os.environ.get('NOTES_TABLE_NAME', 'Notes_Table')
+DEFAULT_REGION = 'ap-southeast-2'
+
+# botocore client tuning. The default pool of 10 connections is smaller than
+# the storage thread pool, so busy workers would queue for a socket.
+MAX_POOL_CONNECTIONS = int(os.environ.get('NOTES_DYNAMODB_MAX_POOL', '50'))
+CONNECT_TIMEOUT = float(os.environ.get('NOTES_DYNAMODB_CONNECT_TIMEOUT', '3'))
+READ_TIMEOUT = float(os.environ.get('NOTES_DYNAMODB_READ_TIMEOUT', '10'))
+RETRY_MODE = os.environ.get('NOTES_DYNAMODB_RETRY_MODE', 'adaptive')
+MAX_ATTEMPTS = int(os.environ.get('NOTES_DYNAMODB_MAX_ATTEMPTS', '3'))
+
+# Client-side limits in capacity units per second (0 = unlimited). Size them
+# to the table's provisioned capacity divided by the number of processes.
+READ_CAPACITY = float(os.environ.get('NOTES_DYNAMODB_READ_CAPACITY', '0'))
+WRITE_CAPACITY = float(os.environ.get('NOTES_DYNAMODB_WRITE_CAPACITY', '0'))
+# How long a call may wait for capacity before it is shed with a 503
+LIMIT_MAX_WAIT = int(os.environ.get('NOTES_DYNAMODB_LIMIT_MAX_WAIT_MS', '100')) / 1000.0
+# Retry-After (seconds) sent when DynamoDB itself throttled the request
+THROTTLE_RETRY_AFTER = int(os.environ.get('NOTES_THROTTLE_RETRY_AFTER', '1'))
+
+THROTTLE_CODES = frozenset({
+    'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded',
+})
+READ_OPERATIONS = frozenset({'get_item', 'scan', 'query', 'batch_get_item'})
+
+read_limiter = TokenBucket(READ_CAPACITY) if READ_CAPACITY > 0 else None
+write_limiter = TokenBucket(WRITE_CAPACITY) if WRITE_CAPACITY > 0 else None
+
+_resource = None
+_table = None
+_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+# Operations that are counted/timed and asked for their consumed capacity
+INSTRUMENTED_OPERATIONS = frozenset({
+    'put_item', 'get_item', 'update_item', 'delete_item', 'scan', 'query',
+    'batch_write_item', 'batch_get_item',
+})
+
+
+class StorageThrottled(HTTPException):
+    """A storage call shed by the local limiter or throttled by DynamoDB"""
+
+    def __init__(self, retry_after: float, detail: str = "Storage capacity exceeded, retry later"):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(status_code=503, detail=detail, headers={'Retry-After': str(self.retry_after)})
+
+
+def client_config():
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        retries={'mode': RETRY_MODE, 'total_max_attempts': MAX_ATTEMPTS},
+    )
+
+
+def _create_resource():
+    import boto3  # Deferred off the import path on purpose
+
+    if not os.environ.get('AWS_ACCESS_KEY_ID') and not os.environ.get('AWS_PROFILE'):
+        logger.warning("AWS_ACCESS_KEY_ID not set; relying on the default credential chain")
+    return boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION') or DEFAULT_REGION,
+                          config=client_config())
+
+
+def get_resource():
+    global _resource
+    if _resource is None:
+        with _lock:
+            if _resource is None:
+                _resource = _Instrumented(_create_resource())
+    return _resource
+
+
+def get_table():
+    global _table
+    if _table is None:
+        resource = get_resource()
+        with _lock:
+            if _table is None:
+                _table = resource.Table(TABLE_NAME)  # Already instrumented via the resource proxy
+    return _table
+
+
+def set_resource(resource):
+    """Use `resource` (e.g. a local DynamoDB stand-in) instead of creating one"""
+    global _resource, _table
+    with _lock:
+        _resource, _table = _Instrumented(resource), None
+
+
+def _consumed_units(response) -> float:
+    consumed = response.get('ConsumedCapacity') if isinstance(response, dict) else None
+    if consumed is None:
+        return 0.0
+    # Batch operations return one entry per table
+    entries = consumed if isinstance(consumed, list) else [consumed]
+    return float(sum(entry.get('CapacityUnits', 0) for entry in entries))
+
+
+def _estimated_units(name: str, kwargs: dict) -> float:
+    """Up-front guess at a call's cost; settled against ConsumedCapacity afterwards"""
+    if name == 'batch_get_item':
+        return float(sum(len(request.get('Keys', [])) for request in kwargs['RequestItems'].values()))
+    if name == 'batch_write_item':
+        return float(sum(len(requests) for requests in kwargs['RequestItems'].values()))
+    return 1.0
+
+
+class _Instrumented:
+    """Proxy for a boto3 table or resource that records metrics per call.
+
+    Non-operation attributes (e.g. `name`, `meta`) pass straight through.
+    """
+
+    def __init__(self, target):
+        self._target = target
+
+    def Table(self, name):
+        return _Instrumented(self._target.Table(name))
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in INSTRUMENTED_OPERATIONS:
+            return attr
+
+        def call(**kwargs):
+            kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
+            limiter = read_limiter if name in READ_OPERATIONS else write_limiter
+            estimate = _estimated_units(name, kwargs)
+            if limiter is not None:
+                wait = limiter.acquire(estimate, LIMIT_MAX_WAIT)
+                if wait:
+                    dynamodb_throttled.inc(name, 'limiter')
+                    raise StorageThrottled(wait)
+
+            outcome = 'ok'
+            start = time.perf_counter()
+            try:
+                response = attr(**kwargs)
+            except Exception as e:
+                # botocore ClientError carries the service error code
+                outcome = getattr(e, 'response', {}).get('Error', {}).get('Code') or type(e).__name__
+                if outcome in THROTTLE_CODES:
+                    # botocore has already retried; don't make the client wait on us too
+                    dynamodb_throttled.inc(name, 'dynamodb')
+                    raise StorageThrottled(THROTTLE_RETRY_AFTER) from e
+                raise
+            finally:
+                dynamodb_request_duration.observe(time.perf_counter() - start, name)
+                dynamodb_requests.inc(name, outcome)
+            units = _consumed_units(response)
+            if units:
+                dynamodb_consumed_capacity.inc(name, amount=units)
+                if limiter is not None:
+                    limiter.settle(units - estimate)
+            return response
+
+        return call
+
+
+class _Lazy:
+    """Module-level handle that resolves the shared object on first attribute access"""
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+# Drop-in names for modules that used to build their own boto3 objects at import
+dynamodb = _Lazy(get_resource)
+table = _Lazy(get_table)
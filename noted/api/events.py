@@ -0,0 +1,159 @@
+#api/events.py
+"""In-process fan-out of note changes to Server-Sent Events subscribers.
+
+crud publishes one event per successful create, update and delete. Each
+event is encoded as an SSE frame once and appended to a ring buffer of the
+last NOTES_EVENTS_BUFFER events. Subscribers share that buffer and each one
+keeps only a cursor into it. Publishing is O(1) whatever the number of
+clients, and a slow client can fall behind by at most the buffer size.
+A client that falls further behind gets a `reset` event and continues from
+the newest event.
+
+Event ids are `<boot>-<sequence>`. A browser's Last-Event-ID from before a
+restart (or from another instance) is recognised as unknown and answered
+with `reset` instead of silently skipping changes.
+
+Events are per process: with several API instances, each client only sees
+writes made through the instance it is connected to.
+
+Streams never end on their own, and a server waits for open responses
+before it shuts down. close() ends every stream so shutdown can go ahead.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from typing import List, Optional, Tuple
+
+from .metrics import registry
+
+# Events kept for resuming and for slow subscribers
+EVENTS_BUFFER = int(os.environ.get('NOTES_EVENTS_BUFFER', '1024'))
+# Seconds between keep-alive comments on an idle stream
+EVENTS_HEARTBEAT = float(os.environ.get('NOTES_EVENTS_HEARTBEAT', '15'))
+
+events_published = registry.counter(
+    'notes_events_published_total', 'Note change events published', ('type',))
+events_resets = registry.counter(
+    'notes_events_resets_total', 'Streams told to reload (lagged behind the buffer or unknown Last-Event-ID)',
+    ('reason',))
+events_subscribers = registry.gauge('notes_events_subscribers', 'Open event streams')
+
+
+def frame(event_id: Optional[str], event_type: str, data: dict) -> bytes:
+    """One SSE frame; JSON never contains a raw newline, so `data` is one line"""
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'{head}event: {event_type}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+class EventBus:
+    def __init__(self, size: int = EVENTS_BUFFER):
+        # Base 36 milliseconds since the epoch: short, and unique per process start
+        boot, millis = '', int(time.time() * 1000)
+        while millis:
+            millis, digit = divmod(millis, 36)
+            boot = '0123456789abcdefghijklmnopqrstuvwxyz'[digit] + boot
+        self.boot = boot
+        # Ring buffer: event n lives at _frames[n % size]
+        self._size = size
+        self._frames = [b''] * size
+        self._sequence = 0
+        self._lock = threading.Lock()
+        # One asyncio.Event per loop, shared by every subscriber on that loop
+        self._waiters = weakref.WeakKeyDictionary()
+        self._closed = False
+
+    def close(self):
+        """End every open stream after the frames it has already been sent"""
+        with self._lock:
+            self._closed = True
+            waiters, self._waiters = self._waiters, weakref.WeakKeyDictionary()
+        self._wake(waiters)
+
+    def publish(self, event_type: str, data: dict):
+        with self._lock:
+            self._sequence += 1
+            event_id = f'{self.boot}-{self._sequence}'
+            self._frames[self._sequence % self._size] = frame(event_id, event_type, data)
+            waiters, self._waiters = self._waiters, weakref.WeakKeyDictionary()
+        events_published.inc(event_type)
+        self._wake(waiters)
+
+    @staticmethod
+    def _wake(waiters):
+        for loop, waiter in list(waiters.items()):
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # Loop already closed
+                pass
+
+    def cursor(self, last_event_id: Optional[str] = None) -> Tuple[int, Optional[str]]:
+        """(cursor, reset reason) to start a stream from.
+
+        No Last-Event-ID starts at the newest event. A known id resumes right
+        after it, and anything else starts at the newest event with a reason
+        for the reset.
+        """
+        with self._lock:
+            if last_event_id is None:
+                return self._sequence, None
+            boot, _, sequence = last_event_id.strip().rpartition('-')
+            if boot != self.boot or not sequence.isdigit() or int(sequence) > self._sequence:
+                return self._sequence, 'unknown_id'
+            if int(sequence) < self._sequence - self._size:
+                return self._sequence, 'lagged'
+            return int(sequence), None
+
+    def read(self, cursor: int) -> Tuple[List[bytes], int, bool]:
+        """(frames after cursor, new cursor, lagged); lagged frames are skipped"""
+        with self._lock:
+            if cursor >= self._sequence:
+                return [], cursor, False
+            if cursor < self._sequence - self._size:
+                return [], self._sequence, True
+            frames = [self._frames[sequence % self._size] for sequence in range(cursor + 1, self._sequence + 1)]
+            return frames, self._sequence, False
+
+    async def wait(self, cursor: int, timeout: float) -> bool:
+        """Wait until there is an event after cursor; False on timeout"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._sequence > cursor or self._closed:
+                return True
+            waiter = self._waiters.get(loop)
+            if waiter is None:
+                waiter = self._waiters[loop] = asyncio.Event()
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stream(self, last_event_id: Optional[str] = None, heartbeat: float = EVENTS_HEARTBEAT):
+        """SSE frames for one subscriber, starting with `ready` (or `reset`)"""
+        cursor, reason = self.cursor(last_event_id)
+        events_subscribers.inc()
+        try:
+            if reason:
+                events_resets.inc(reason)
+                yield frame(f'{self.boot}-{cursor}', 'reset', {'reason': reason})
+            else:
+                yield frame(f'{self.boot}-{cursor}', 'ready', {})
+            while not self._closed:
+                frames, cursor, lagged = self.read(cursor)
+                if lagged:
+                    events_resets.inc('lagged')
+                    yield frame(f'{self.boot}-{cursor}', 'reset', {'reason': 'lagged'})
+                elif frames:
+                    yield b''.join(frames)
+                elif not await self.wait(cursor, heartbeat):
+                    yield b': keep-alive\n\n'
+        finally:
+            events_subscribers.inc(amount=-1)
+
+
+bus = EventBus()
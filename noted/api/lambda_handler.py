@@ -0,0 +1,86 @@
+#api/lambda_handler.py
+"""Raw AWS Lambda entry point.
+
+Every API Gateway route goes through router.dispatch, the same routes the
+FastAPI app serves. There is no FastAPI, uvicorn or ASGI adapter in the
+import path. Routes are compiled once per container, and the DynamoDB
+client is created on the first storage call and reused on warm invocations.
+
+Accepts REST API (payload 1.0) and HTTP API (payload 2.0) events. Only
+HTTP API responses are compressed: a REST API passes base64 bodies through
+as text unless the stage has binaryMediaTypes configured.
+
+Lambda rejects responses over 6 MB. Large note bodies are redirected by the
+router, and any other body over MAX_RESPONSE_BODY becomes a 413 here, read
+no further than the limit.
+"""
+import base64
+from typing import Optional
+
+from .logs import get_logger
+from .router import MAX_RESPONSE_BODY, Request, Response, dispatch, encode_response, json_response
+
+logger = get_logger(__name__)
+
+
+def _request(event) -> Request:
+    http = event.get('requestContext', {}).get('http')
+    if http:
+        method, path = http['method'], event.get('rawPath') or http.get('path', '/')
+        # Named stages appear in rawPath; $default doesn't
+        stage = event['requestContext'].get('stage')
+        if stage and stage != '$default' and path.startswith(f'/{stage}/'):
+            path = path[len(stage) + 1:]
+    else:
+        method, path = event.get('httpMethod', 'GET'), event.get('path') or '/'
+
+    body = event.get('body') or b''
+    if body and event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    elif isinstance(body, str):
+        body = body.encode('utf-8')
+    return Request(method, path, event.get('queryStringParameters'), event.get('headers'), body)
+
+
+def _read_body(response: Response) -> Optional[bytes]:
+    """The whole body, or None once it passes MAX_RESPONSE_BODY"""
+    if isinstance(response.body, bytes):
+        return response.body if len(response.body) <= MAX_RESPONSE_BODY else None
+    chunks, size = [], 0
+    try:
+        for chunk in response.body:
+            size += len(chunk)
+            if size > MAX_RESPONSE_BODY:
+                return None
+            chunks.append(chunk)
+    finally:
+        close = getattr(response.body, 'close', None)
+        if close is not None:
+            close()
+    return b''.join(chunks)
+
+
+def handler(event, context):
+    """Handle AWS Lambda events"""
+    request = _request(event)
+    logger.debug("received event", extra={'method': request.method, 'path': request.path})
+
+    response = encode_response(dispatch(request), request.header('accept-encoding'),
+                               compress=event.get('version') == '2.0', if_none_match=request.header('if-none-match'))
+    body = _read_body(response)
+    if body is None:
+        logger.warning("response too large for Lambda", extra={'method': request.method, 'path': request.path})
+        response = encode_response(json_response({'error': f"Response exceeds {MAX_RESPONSE_BODY} bytes"}, 413), None)
+        body = response.body
+    if 'Content-Encoding' not in response.headers:
+        try:
+            return {'statusCode': response.status, 'headers': response.headers, 'body': body.decode('utf-8')}
+        except UnicodeDecodeError:
+            # A byte range can end inside a multi-byte character
+            pass
+    return {
+        'statusCode': response.status,
+        'headers': response.headers,
+        'body': base64.b64encode(body).decode('ascii'),
+        'isBase64Encoded': True,
+    }
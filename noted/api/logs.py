@@ -0,0 +1,67 @@
+#api/logs.py
+"""Leveled, sampled, structured (JSON lines) logging for the API.
+
+Per-request detail goes out at DEBUG and only a NOTES_LOG_SAMPLE_RATE
+fraction of those records is kept, so hot paths cost almost nothing when
+verbose logging is off. Warnings and errors are never sampled. Extra
+fields passed with `extra={...}` appear as JSON keys.
+"""
+import json
+import logging
+import os
+import random
+import sys
+
+LOG_LEVEL = os.environ.get('NOTES_LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATE = float(os.environ.get('NOTES_LOG_SAMPLE_RATE', '0.01'))
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every record at or above `always_level`, and a `rate` fraction of the rest"""
+
+    def __init__(self, rate: float, always_level: int = logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.always_level = always_level
+
+    def filter(self, record):
+        return record.levelno >= self.always_level or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_configured = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the `api` namespace, configured on first use"""
+    global _configured
+    if not _configured:
+        _configured = True
+        root = logging.getLogger('api')
+        if not root.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(JsonFormatter())
+            handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+            root.addHandler(handler)
+            # Don't also emit through the root logger (e.g. Lambda's handler)
+            root.propagate = False
+        root.setLevel(LOG_LEVEL)
+    return logging.getLogger(name if name.startswith('api') else f'api.{name}')
@@ -1,12 +1,59 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import signal
+import threading
 from . import crud  
-import json
+from . import async_crud
+from .compression import CompressionMiddleware, strip_encoding
+from .events import bus as note_events
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry
+# Conditional-request helpers are shared with the Lambda and Vercel router
+from .router import byte_range as _byte_range, etag_headers as _etag_headers, etag_matches as _etag_matches
+from .router import if_match_versions as _if_match_versions
+from .serialize import JSON_MEDIA_TYPE, dumps
 
 
-app = FastAPI()
+def _close_streams_on_exit():
+    """End event streams as soon as the server is told to stop.
+
+    The server only runs the lifespan shutdown once every response has
+    finished, and an event stream never does on its own. The server's own
+    SIGINT/SIGTERM handler still runs after ours.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signum)
+        if not callable(previous):
+            # No server handler to hand over to; leave the default alone
+            continue
+
+        def on_exit(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(note_events.close)
+            previous(signum, frame)
+
+        signal.signal(signum, on_exit)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _close_streams_on_exit()
+    yield
+    note_events.close()
+    # Parked write-behind updates go out first, then in-flight storage calls finish
+    crud.close_write_behind()
+    async_crud.shutdown()
+    crud.save_search_index()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -15,8 +62,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["ETag"],  # Lets browser clients send it back in If-Match
 )
 
+# gzip/brotli per Accept-Encoding; ETags get an encoding suffix that the
+# conditional-request helpers below strip again
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency histogram, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
 
 class NoteRequest(BaseModel):
   
@@ -29,21 +84,61 @@ class NoteResponse(NoteRequest):
    id: str
    created_at: str
 
+
+class BatchCreateRequest(BaseModel):
+
+    notes: List[NoteRequest]
+
+
+class BatchIdsRequest(BaseModel):
+
+    ids: List[str]
+
+def json_response(content, headers: Optional[dict] = None) -> Response:
+    """Encode trusted storage rows straight to bytes, bypassing response-model validation"""
+    return Response(content=dumps(content), media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def _conditional_json(content, etag: str, if_none_match: Optional[str]) -> Response:
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+    return json_response(content, headers=_etag_headers(etag))
+
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Root endpoint
 @app.get("/")
-def read_root():
+async def read_root():
     try:
-        notes = crud.get_all_notes()
-        return {"message": "Notes API", "notes": notes}
+        notes = await async_crud.get_all_note_rows()
+        return json_response({"message": "Notes API", "notes": notes})
     except HTTPException as e:
         raise e
 
 # List notes
+# Without limit/cursor the full list is returned as before; with either one a
+# single page is returned along with an opaque next_cursor token.
+# fields=summary returns id, title, snippet and timestamps without bodies.
+# order=recent returns the newest notes first from the recent index.
 @app.get("/notes/")
-def read_notes():
+async def read_notes(
+    limit: Optional[int] = Query(None, ge=1, le=crud.MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: str = Query('full', pattern='^(full|summary)$'),
+    order: Optional[str] = Query(None, pattern='^recent$'),
+    if_none_match: Optional[str] = Header(None)
+):
     try:
-        notes = crud.get_all_notes()
-        return notes
+        if limit is None and cursor is None:
+            notes = await async_crud.get_all_note_rows(fields=fields, order=order)
+            return _conditional_json(notes, crud.collection_etag(notes, fields, order), if_none_match)
+        page = await async_crud.list_notes_page(limit or crud.DEFAULT_PAGE_LIMIT, cursor, fields, order)
+        return _conditional_json(page, crud.collection_etag(page['notes'], fields, order), if_none_match)
     except HTTPException as e:
         raise e
 
@@ -52,85 +147,141 @@ def read_notes():
 async def create_note(note: NoteRequest):
     try:
         # Let the backend handle the created_at generation
-        note_data = crud.create_note(note)
-        return note_data
+        note_data = await async_crud.create_note(note)
+        # Offloaded bodies come back as body_url/body_size, which the model lacks
+        return json_response(note_data)
+    except HTTPException as e:
+        raise e
+
+
+# Batch endpoints: one DynamoDB batch call per 25 writes / 100 reads, with
+# per-item results so one bad note doesn't fail the whole request
+@app.post("/notes/batch")
+async def batch_create_notes(request: BatchCreateRequest):
+    try:
+        results = await async_crud.batch_create_notes(request.notes)
+        return {"results": results}
+    except HTTPException as e:
+        raise e
+
+
+@app.post("/notes/batch-get")
+async def batch_get_notes(request: BatchIdsRequest):
+    try:
+        results = await async_crud.batch_get_notes(request.ids)
+        return {"results": results}
+    except HTTPException as e:
+        raise e
+
+
+@app.post("/notes/batch-delete")
+async def batch_delete_notes(request: BatchIdsRequest):
+    try:
+        results = await async_crud.batch_delete_notes(request.ids)
+        return {"results": results}
+    except HTTPException as e:
+        raise e
+
+
+# Delta sync: notes changed (and tombstones for notes deleted) after a watermark
+@app.get("/notes/changes")
+async def read_changes(
+    since: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_LIMIT, ge=1, le=crud.MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None
+):
+    try:
+        return json_response(await async_crud.get_changes(since, limit, cursor))
+    except HTTPException as e:
+        raise e
+
+
+# Change stream (Server-Sent Events): created/updated/deleted as they happen,
+# so clients keep a local copy instead of re-listing. EventSource resumes with
+# Last-Event-ID; last_event_id does the same for clients that can't set headers.
+@app.get("/notes/events")
+async def read_note_events(
+    last_event_id: Optional[str] = Header(None),
+    resume_from: Optional[str] = Query(None, alias='last_event_id')
+):
+    return StreamingResponse(note_events.stream(last_event_id or resume_from), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# Full-text search over titles and bodies; declared before /notes/{note_id}
+@app.get("/notes/search")
+async def search_notes(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=crud.MAX_SEARCH_LIMIT)
+):
+    try:
+        results = await async_crud.search_notes(q, limit)
+        return {"query": q, "results": results}
     except HTTPException as e:
         raise e
 
 
 # GET /api/notes/{note_id} - Fetch a specific note by ID
 @app.get("/notes/{note_id}", response_model=NoteResponse)
-async def get_note(note_id: str):
+async def get_note(note_id: str, if_none_match: Optional[str] = Header(None)):
     try:
         # Fetch the note from the database using the ID
-        note = crud.get_note(note_id)
+        note = await async_crud.get_note_row(note_id)
         if not note:
             raise HTTPException(status_code=404, detail="Note not found")
-        return note
+        return _conditional_json(note, crud.note_etag(note), if_none_match)
     except HTTPException as e:
         raise e
 
 
+# Stream a note's body, inline or offloaded, with single-range support
+@app.get("/notes/{note_id}/body")
+async def read_note_body(
+    note_id: str,
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    try:
+        item = await async_crud.get_note_item(note_id)
+        etag = crud.note_etag(item)
+        headers = {'Accept-Ranges': 'bytes', **_etag_headers(etag)}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        size = crud.note_body_size(item)
+        # If-Range: only honour the range if the client's copy is still current
+        byte_range = _byte_range(range, size) if not if_range or strip_encoding(if_range.strip()) == etag else None
+        start, end = byte_range or (0, size - 1)
+        chunks = await async_crud.open_note_body(item, start, end)
+        headers['Content-Length'] = str(end - start + 1)
+        if byte_range:
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        return StreamingResponse(chunks, status_code=206 if byte_range else 200,
+                                 media_type='text/plain; charset=utf-8', headers=headers)
+    except HTTPException as e:
+        raise e
+
 # Update a note
 @app.put("/notes/{note_id}", response_model=NoteResponse)
-async def update_note(note_id: str, note: NoteRequest):
+async def update_note(note_id: str, note: NoteRequest, if_match: Optional[str] = Header(None)):
     try:
         note_data = note.dict()
-        response = crud.update_note(note_id, note_data)
-        return response['Attributes']  
+        response = await async_crud.update_note(note_id, note_data, _if_match_versions(if_match))
+        updated = crud.to_public(response['Attributes'])
+        return json_response(updated, headers=_etag_headers(crud.note_etag(updated)))
     except HTTPException as e:
         raise e
 
 # Delete a note
 @app.delete("/notes/{note_id}")
-async def delete_note(note_id: str):
+async def delete_note(note_id: str, if_match: Optional[str] = Header(None)):
     try:
-        response = crud.delete_note(note_id)
+        response = await async_crud.delete_note(note_id, _if_match_versions(if_match))
         return {"message": "Note deleted successfully", "deleted_note": response.get('deleted_note')}
     except HTTPException as e:
         raise e
 
-# Serverless handler
-def handler(event, context):
-    """Handle AWS Lambda events"""
-    print(f"Received event: {json.dumps(event)}")
-    
-    # Extract HTTP method and path
-    http_method = event.get('httpMethod', '')
-    path = event.get('path', '')
-    
-    # Handle different HTTP methods
-    if http_method == 'DELETE' and path.startswith('/notes/'):
-        note_id = path.split('/')[-1]
-        try:
-            response = crud.delete_note(note_id)
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'message': 'Note deleted successfully',
-                    'deleted_note': response.get('deleted_note')
-                })
-            }
-        except HTTPException as e:
-            return {
-                'statusCode': e.status_code,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': str(e.detail)})
-            }
-    
-    # Add handlers for other methods as needed
-    return {
-        'statusCode': 404,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({'error': 'Not found'})
-    }
+# Serverless handler (kept importable as main.handler; the implementation
+# lives in lambda_handler.py so cold starts don't pay for FastAPI)
+from .lambda_handler import handler
@@ -0,0 +1,211 @@
+#api/metrics.py
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Counters and histograms are keyed by label values and guarded by one lock
+each; callback metrics read live values (e.g. cache stats) at scrape time.
+Everything here is stdlib-only so the Lambda/Vercel handlers can record
+metrics without extra imports.
+"""
+import bisect
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labelnames, labels), value) for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        samples = []
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((f'{self.name}_bucket', _labels(self.labelnames, labels, [('le', _number(bound))]),
+                                cumulative))
+            samples.append((f'{self.name}_bucket', _labels(self.labelnames, labels, [('le', '+Inf')]), count))
+            samples.append((f'{self.name}_sum', _labels(self.labelnames, labels), total))
+            samples.append((f'{self.name}_count', _labels(self.labelnames, labels), count))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class CallbackMetric:
+    """Metric whose samples are read from `callback()` at scrape time.
+
+    The callback returns a list of (label values tuple, value) pairs.
+    """
+
+    def __init__(self, name, documentation, metric_type, callback, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        return [(self.name, _labels(self.labelnames, labels), value) for labels, value in self.callback()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # Re-registering a name (e.g. on module reload) returns the original
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, metric_type, callback, labelnames=()):
+        return self.register(CallbackMetric(name, documentation, metric_type, callback, labelnames))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    'notes_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route', 'status'))
+dynamodb_requests = registry.counter(
+    'notes_dynamodb_requests_total', 'DynamoDB requests by operation and outcome', ('operation', 'outcome'))
+dynamodb_request_duration = registry.histogram(
+    'notes_dynamodb_request_duration_seconds', 'DynamoDB request latency by operation', ('operation',))
+dynamodb_consumed_capacity = registry.counter(
+    'notes_dynamodb_consumed_capacity_units_total', 'Capacity units consumed by operation', ('operation',))
+dynamodb_throttled = registry.counter(
+    'notes_dynamodb_throttled_total', 'Storage calls rejected for capacity, by who rejected them',
+    ('operation', 'source'))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; use its template
+            # (e.g. /notes/{note_id}) so label cardinality stays bounded
+            route = scope.get('route')
+            template = getattr(route, 'path', None) or 'unmatched'
+            http_request_duration.observe(time.perf_counter() - start, scope['method'], template, str(status))
@@ -0,0 +1,57 @@
+#api/ratelimit.py
+"""Token bucket used to keep storage calls under the table's capacity.
+
+Tokens are capacity units. A caller takes its estimated cost up front and
+may settle the difference once the real cost is known, so the balance can
+dip below zero after an expensive scan page; later callers then wait (or
+are shed) until it has been paid back.
+
+A call costing more than the burst only waits for a full bucket and then
+takes the rest on credit. Otherwise it could never run, however idle the
+table was.
+"""
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, cost: float = 1.0, max_wait: float = 0.0) -> float:
+        """Take `cost` tokens, sleeping up to max_wait seconds for them.
+
+        Returns 0.0 once taken; otherwise takes nothing and returns how many
+        seconds the caller would have had to wait.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            # The bucket never holds more than burst, so that is all a call waits for
+            wait = max(0.0, (min(cost, self.burst) - self._tokens) / self.rate)
+            if wait > max_wait:
+                return wait
+            # Reserve now so concurrent callers queue up behind this one
+            self._tokens -= cost
+        if wait:
+            time.sleep(wait)
+        return 0.0
+
+    def settle(self, extra: float):
+        """Charge (or refund, if negative) the gap between estimate and actual cost"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.burst, self._tokens - extra)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
@@ -0,0 +1,393 @@
+#api/router.py
+"""Framework-free routing of note requests to crud.
+
+Shared by the Lambda handler (lambda_handler.py) and the Vercel
+BaseHTTPRequestHandler modules (vercel.py), so every entry point serves the
+same routes as the FastAPI app in main.py. Routes are compiled once at
+import. Static paths are a dict lookup, and /notes/{note_id} routes are a
+short list of precompiled patterns. An adapter only builds a Request and
+writes out a Response, with no per-event ASGI translation.
+
+Errors are {"error": detail} with the FastAPI app's status codes, except
+that invalid query or body values are 400 here where FastAPI says 422.
+"""
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from starlette.exceptions import HTTPException
+
+from . import crud
+from .compression import (RESPONSE_COMPRESS_MIN, compress_response, encoded_etag, negotiate, not_modified_etag,
+                          strip_encoding)
+from .logs import get_logger
+from .metrics import http_request_duration
+from .serialize import JSON_MEDIA_TYPE, dumps
+
+logger = get_logger(__name__)
+
+# Largest body a response may carry. Lambda caps the whole response at 6 MB
+# after base64 and Vercel at 4.5 MB, so bigger note bodies are redirected to
+# the blob store or refused.
+MAX_RESPONSE_BODY = int(os.environ.get('NOTES_MAX_RESPONSE_BODY', str(4 * 1024 * 1024)))
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Expose-Headers': 'ETag',  # Lets browser clients send it back in If-Match
+}
+
+
+# -- Conditional request helpers (main.py uses these too) ------------------
+
+def etag_headers(etag: str) -> dict:
+    # no-cache: clients may store the response but must revalidate it with the ETag
+    return {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as RFC 9110 requires for If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = {strip_encoding(tag.strip().removeprefix('W/')) for tag in if_none_match.split(',')}
+    return etag.removeprefix('W/') in candidates
+
+
+def if_match_versions(if_match: Optional[str]) -> Optional[List[str]]:
+    """Versions an If-Match header allows, or None when any version will do"""
+    if not if_match or if_match.strip() == '*':
+        return None
+    versions = []
+    for tag in if_match.split(','):
+        # Strong comparison: weak or foreign tags can never match
+        version = None if tag.strip().startswith('W/') else crud.etag_version(strip_encoding(tag.strip()))
+        if version is not None:
+            versions.append(version)
+    if not versions:
+        raise HTTPException(status_code=412, detail="If-Match does not match the current note")
+    return versions
+
+
+_BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def byte_range(range_header: Optional[str], size: int):
+    """(start, end) for a single `bytes=` range, or None to send the whole body.
+
+    Malformed and multi-range headers are ignored (RFC 9110 allows that);
+    a range that can't be satisfied is a 416.
+    """
+    match = _BYTE_RANGE.match(range_header.strip()) if range_header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), size - 1 if not last else min(int(last), size - 1)
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            start = size
+    if start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={'Content-Range': f'bytes */{size}'})
+    return start, end
+
+
+# -- Request / Response -----------------------------------------------------
+
+class Request:
+    """What a route needs from an HTTP request, whatever transport it came in on"""
+
+    __slots__ = ('method', 'path', 'query', 'headers', 'body', 'params')
+
+    def __init__(self, method: str, path: str, query: Optional[Dict[str, str]] = None,
+                 headers: Optional[Dict[str, str]] = None, body: bytes = b''):
+        self.method = method.upper()
+        self.path = path
+        self.query = query or {}
+        self.headers = {name.lower(): value for name, value in (headers or {}).items()}
+        self.body = body or b''
+        self.params = {}
+
+    def header(self, name: str) -> Optional[str]:
+        return self.headers.get(name)
+
+    def json(self) -> dict:
+        try:
+            data = json.loads(self.body or b'null')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+        return data
+
+
+class Response:
+    """Status, headers and a body of bytes (or an iterable of byte chunks for streams)"""
+
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status: int = 200, body: Union[bytes, Iterable[bytes]] = b'',
+                 headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+def json_response(content, status: int = 200, headers: Optional[dict] = None) -> Response:
+    return Response(status, dumps(content), {'Content-Type': JSON_MEDIA_TYPE, **(headers or {})})
+
+
+def _conditional_json(content, etag: str, if_none_match: Optional[str]) -> Response:
+    if etag_matches(if_none_match, etag):
+        return Response(304, headers=etag_headers(etag))
+    return json_response(content, headers=etag_headers(etag))
+
+
+def _query_int(request: Request, name: str, default: Optional[int], low: int, high: int) -> Optional[int]:
+    value = request.query.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an integer")
+    if not low <= number <= high:
+        raise HTTPException(status_code=400, detail=f"{name} must be between {low} and {high}")
+    return number
+
+
+def _note(data) -> crud.Note:
+    if not isinstance(data, dict) or not isinstance(data.get('title'), str) or not isinstance(data.get('body'), str):
+        raise HTTPException(status_code=400, detail="A note needs a string title and body")
+    return crud.Note(title=data['title'], body=data['body'])
+
+
+def _ids(request: Request) -> List[str]:
+    ids = request.json().get('ids')
+    if not isinstance(ids, list):
+        raise HTTPException(status_code=400, detail="ids must be a list of note IDs")
+    return ids
+
+
+# -- Routes -----------------------------------------------------------------
+
+_static: Dict[Tuple[str, str], Tuple[str, Callable]] = {}
+_dynamic: List[Tuple[str, str, re.Pattern, Callable]] = []
+
+
+def route(method: str, path: str):
+    """Register a route; `{name}` segments become request.params[name]"""
+    def register(func):
+        if '{' in path:
+            pattern = re.compile('^' + re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', path) + '$')
+            _dynamic.append((method, path, pattern, func))
+        else:
+            _static[(method, path)] = (path, func)
+        return func
+    return register
+
+
+def _match(method: str, path: str):
+    """(route template, handler, path params), static routes first"""
+    found = _static.get((method, path))
+    if found is not None:
+        return found[0], found[1], {}
+    for route_method, template, pattern, func in _dynamic:
+        if route_method == method:
+            match = pattern.match(path)
+            if match:
+                return template, func, match.groupdict()
+    return None, None, None
+
+
+def _allowed_methods(path: str) -> List[str]:
+    methods = {method for method, static_path in _static if static_path == path}
+    methods.update(method for method, _, pattern, _ in _dynamic if pattern.match(path))
+    return sorted(methods)
+
+
+@route('GET', '/')
+def read_root(request: Request) -> Response:
+    return json_response({"message": "Notes API", "notes": crud.get_all_note_rows()})
+
+
+@route('GET', '/notes')
+def read_notes(request: Request) -> Response:
+    # Same contract as the FastAPI listing: the full list without limit/cursor
+    limit = _query_int(request, 'limit', None, 1, crud.MAX_PAGE_LIMIT)
+    cursor = request.query.get('cursor')
+    fields = request.query.get('fields', 'full')
+    order = request.query.get('order')
+    if_none_match = request.header('if-none-match')
+    if limit is None and cursor is None:
+        notes = crud.get_all_note_rows(fields=fields, order=order)
+        return _conditional_json(notes, crud.collection_etag(notes, fields, order), if_none_match)
+    page = crud.list_notes_page(limit or crud.DEFAULT_PAGE_LIMIT, cursor, fields, order)
+    return _conditional_json(page, crud.collection_etag(page['notes'], fields, order), if_none_match)
+
+
+@route('POST', '/notes')
+def create_note(request: Request) -> Response:
+    return json_response(crud.create_note(_note(request.json())))
+
+
+@route('POST', '/notes/batch')
+def batch_create_notes(request: Request) -> Response:
+    notes = request.json().get('notes')
+    if not isinstance(notes, list):
+        raise HTTPException(status_code=400, detail="notes must be a list of notes")
+    return json_response({"results": crud.batch_create_notes([_note(note) for note in notes])})
+
+
+@route('POST', '/notes/batch-get')
+def batch_get_notes(request: Request) -> Response:
+    return json_response({"results": crud.batch_get_notes(_ids(request))})
+
+
+@route('POST', '/notes/batch-delete')
+def batch_delete_notes(request: Request) -> Response:
+    return json_response({"results": crud.batch_delete_notes(_ids(request))})
+
+
+@route('GET', '/notes/changes')
+def read_changes(request: Request) -> Response:
+    limit = _query_int(request, 'limit', crud.DEFAULT_PAGE_LIMIT, 1, crud.MAX_PAGE_LIMIT)
+    return json_response(crud.get_changes(request.query.get('since'), limit, request.query.get('cursor')))
+
+
+@route('GET', '/notes/search')
+def search_notes(request: Request) -> Response:
+    query = request.query.get('q')
+    if not query:
+        raise HTTPException(status_code=400, detail="q is required")
+    limit = _query_int(request, 'limit', 20, 1, crud.MAX_SEARCH_LIMIT)
+    return json_response({"query": query, "results": crud.search_notes(query, limit)})
+
+
+@route('GET', '/notes/{note_id}')
+def read_note(request: Request) -> Response:
+    note = crud.get_note_row(request.params['note_id'])
+    return _conditional_json(note, crud.note_etag(note), request.header('if-none-match'))
+
+
+@route('GET', '/notes/{note_id}/body')
+def read_note_body(request: Request) -> Response:
+    item = crud.get_note_item(request.params['note_id'])
+    etag = crud.note_etag(item)
+    headers = {'Accept-Ranges': 'bytes', **etag_headers(etag)}
+    if etag_matches(request.header('if-none-match'), etag):
+        return Response(304, headers=headers)
+
+    size = crud.note_body_size(item)
+    # If-Range: only honour the range if the client's copy is still current
+    if_range = request.header('if-range')
+    requested = byte_range(request.header('range'), size) if not if_range or strip_encoding(if_range.strip()) == etag else None
+    start, end = requested or (0, size - 1)
+    if end - start + 1 > MAX_RESPONSE_BODY:
+        # Too big to return from a function: send the client to the blob itself.
+        # Browsers resend Range on the redirected GET, which S3 serves as usual.
+        url = crud.note_body_url(item)
+        if url is None:
+            raise HTTPException(status_code=413, detail=f"Body exceeds {MAX_RESPONSE_BODY} bytes; request a Range")
+        return Response(302, headers={'Location': url, 'Cache-Control': 'no-store'})
+    headers['Content-Type'] = 'text/plain; charset=utf-8'
+    headers['Content-Length'] = str(end - start + 1)
+    if requested:
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return Response(206 if requested else 200, crud.open_note_body(item, start, end), headers)
+
+
+@route('PUT', '/notes/{note_id}')
+def update_note(request: Request) -> Response:
+    note = _note(request.json())
+    response = crud.update_note(request.params['note_id'], {'title': note.title, 'body': note.body},
+                                if_match_versions(request.header('if-match')))
+    updated = crud.to_public(response['Attributes'])
+    return json_response(updated, headers=etag_headers(crud.note_etag(updated)))
+
+
+@route('DELETE', '/notes/{note_id}')
+def delete_note(request: Request) -> Response:
+    response = crud.delete_note(request.params['note_id'], if_match_versions(request.header('if-match')))
+    return json_response({"message": "Note deleted successfully", "deleted_note": response.get('deleted_note')})
+
+
+def _preflight(path: str) -> Response:
+    allowed = _allowed_methods(path)
+    if not allowed:
+        raise HTTPException(status_code=404, detail="Not found")
+    return Response(204, headers={
+        'Access-Control-Allow-Methods': ', '.join(allowed + ['OPTIONS']),
+        'Access-Control-Allow-Headers': 'Content-Type, If-Match, If-None-Match, If-Range, Range',
+        'Access-Control-Max-Age': '600',
+    })
+
+
+def dispatch(request: Request) -> Response:
+    """Run the matching route; storage and validation errors become JSON errors"""
+    path = request.path.rstrip('/') or '/'
+    template = 'unmatched'
+    start = time.perf_counter()
+    response = None
+    try:
+        if request.method == 'OPTIONS':
+            response = _preflight(path)
+            return response
+        template, func, params = _match(request.method, path)
+        if func is None:
+            template = 'unmatched'
+            allowed = _allowed_methods(path)
+            if allowed:
+                raise HTTPException(status_code=405, detail="Method not allowed", headers={'Allow': ', '.join(allowed)})
+            raise HTTPException(status_code=404, detail="Not found")
+        request.params = params
+        response = func(request)
+        return response
+    except HTTPException as e:
+        response = json_response({'error': e.detail}, e.status_code, e.headers)
+        return response
+    except Exception:
+        logger.exception("unhandled error", extra={'method': request.method, 'route': template})
+        response = json_response({'error': 'Internal server error'}, 500)
+        return response
+    finally:
+        http_request_duration.observe(time.perf_counter() - start, request.method, template,
+                                      str(response.status if response is not None else 500))
+
+
+def encode_response(response: Response, accept_encoding: Optional[str], compress: bool = True,
+                    if_none_match: Optional[str] = None) -> Response:
+    """Add CORS headers and gzip/brotli the body if the client accepts it.
+
+    Mirrors CompressionMiddleware: the ETag gets the encoding suffix so
+    conditional requests keep working, and a 304 repeats whichever ETag the
+    client sent in If-None-Match; streams and partial content are sent as
+    they are.
+    """
+    headers = {**CORS_HEADERS, **response.headers}
+    encoding = negotiate(accept_encoding) if compress else None
+    if encoding is None:
+        return Response(response.status, response.body, headers)
+    if response.status == 304:
+        if 'ETag' in headers:
+            headers['ETag'] = not_modified_etag(headers['ETag'], encoding, if_none_match)
+        headers['Vary'] = 'Accept-Encoding'
+        return Response(304, b'', headers)
+    if (response.status in (204, 206) or not isinstance(response.body, bytes) or 'Content-Encoding' in headers
+            or len(response.body) < RESPONSE_COMPRESS_MIN):
+        return Response(response.status, response.body, headers)
+
+    body, encoding = compress_response(response.body, accept_encoding)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        headers['Vary'] = 'Accept-Encoding'
+        if 'ETag' in headers:
+            headers['ETag'] = encoded_etag(headers['ETag'], encoding)
+    return Response(response.status, body, headers)
@@ -0,0 +1,182 @@
+#api/search.py
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+_WORD = re.compile(r'\w+')
+
+# Title matches count this many times a body match
+TITLE_WEIGHT = 3
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Writes remembered before the index is first loaded; past this, a saved
+# index can no longer be brought up to date and a full rebuild is used instead
+JOURNAL_LIMIT = 10000
+FORMAT_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    return [sys.intern(token) for token in _WORD.findall(text.lower())]
+
+
+def analyze(title: str, body: str) -> dict:
+    """Weighted term frequencies for one note"""
+    terms = Counter(tokenize(body or ''))
+    for term in tokenize(title or ''):
+        terms[term] += TITLE_WEIGHT
+    return dict(terms)
+
+
+class SearchIndex:
+    """In-memory inverted index over note titles and bodies, ranked with BM25.
+
+    Postings map term -> {note_id: weighted tf}; note ids and terms are
+    interned so each is stored once however many postings refer to it.
+
+    Until the index is loaded or rebuilt, writes are journaled and replayed
+    on top of whatever was loaded, so a saved index plus the journal gives
+    the same result as a fresh scan.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._docs = {}
+        self._total_length = 0
+        self._journal = []
+        self._journal_overflow = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    # -- incremental updates ----------------------------------------------
+
+    def add(self, note_id: str, title: str, body: str):
+        self._apply(('add', sys.intern(note_id), analyze(title, body)))
+
+    def remove(self, note_id: str):
+        self._apply(('remove', note_id, None))
+
+    def _apply(self, op):
+        with self._lock:
+            if self._journal is not None:
+                if len(self._journal) >= JOURNAL_LIMIT:
+                    self._journal_overflow = True
+                else:
+                    self._journal.append(op)
+            if self.ready:
+                note_id = op[1]
+                old = self._docs.get(note_id)
+                self._replay(self._postings, self._docs, [op])
+                new = self._docs.get(note_id)
+                self._total_length += (new[0] if new else 0) - (old[0] if old else 0)
+
+    @classmethod
+    def _replay(cls, postings, docs, ops):
+        for action, note_id, terms in ops:
+            if action == 'add':
+                cls._index(postings, docs, note_id, terms)
+            else:
+                cls._unindex(postings, docs, note_id)
+
+    @staticmethod
+    def _index(postings, docs, note_id, terms):
+        SearchIndex._unindex(postings, docs, note_id)
+        for term, frequency in terms.items():
+            postings.setdefault(term, {})[note_id] = frequency
+        docs[note_id] = (sum(terms.values()), tuple(terms))
+
+    @staticmethod
+    def _unindex(postings, docs, note_id) -> int:
+        entry = docs.pop(note_id, None)
+        if entry is None:
+            return 0
+        for term in entry[1]:
+            notes = postings.get(term)
+            if notes is not None:
+                notes.pop(note_id, None)
+                if not notes:
+                    del postings[term]
+        return entry[0]
+
+    # -- bulk load --------------------------------------------------------
+
+    def rebuild(self, items: Iterable[dict]):
+        """Rebuild from storage rows (e.g. a table scan); writes made during
+        the scan are replayed on top before the new index goes live."""
+        with self._lock:
+            self._journal = []
+            self._journal_overflow = False
+
+        postings, docs = {}, {}
+        for item in items:
+            self._index(postings, docs, sys.intern(item['id']), analyze(item.get('title'), item.get('body')))
+        self._swap(postings, docs)
+
+    def load(self, path: str) -> bool:
+        """Load a saved index; returns False if it cannot be brought up to date"""
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            data = json.load(handle)
+        if data.get('version') != FORMAT_VERSION:
+            return False
+
+        postings, docs = {}, {}
+        for note_id, terms in data['docs'].items():
+            self._index(postings, docs, sys.intern(note_id), {sys.intern(t): f for t, f in terms.items()})
+        return self._swap(postings, docs)
+
+    def _swap(self, postings, docs) -> bool:
+        with self._lock:
+            if self._journal_overflow:
+                # Too many writes during the build to replay; caller must rebuild
+                return False
+            self._replay(postings, docs, self._journal)
+            self._postings, self._docs = postings, docs
+            self._total_length = sum(length for length, _ in docs.values())
+            self._journal = None
+            self.ready = True
+            return True
+
+    def save(self, path: str):
+        """Write the index atomically as gzipped JSON of per-note term frequencies"""
+        with self._lock:
+            docs = {note_id: {term: self._postings[term][note_id] for term in terms}
+                    for note_id, (_, terms) in self._docs.items()}
+
+        temporary = f"{path}.tmp"
+        with gzip.open(temporary, 'wt', encoding='utf-8') as handle:
+            json.dump({'version': FORMAT_VERSION, 'docs': docs}, handle, separators=(',', ':'))
+        os.replace(temporary, path)
+
+    # -- queries ----------------------------------------------------------
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """Return up to `limit` (note_id, score) pairs, best first"""
+        terms = set(tokenize(query))
+        with self._lock:
+            total = len(self._docs)
+            if not total or not terms:
+                return []
+            average_length = self._total_length / total or 1.0
+
+            scores = {}
+            for term in terms:
+                notes = self._postings.get(term)
+                if not notes:
+                    continue
+                idf = math.log(1 + (total - len(notes) + 0.5) / (len(notes) + 0.5))
+                for note_id, frequency in notes.items():
+                    length = self._docs[note_id][0]
+                    weight = frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * length / average_length))
+                    scores[note_id] = scores.get(note_id, 0.0) + idf * weight
+
+        return heapq.nlargest(limit, scores.items(), key=lambda pair: pair[1])
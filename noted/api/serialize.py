@@ -0,0 +1,44 @@
+#api/serialize.py
+"""JSON encoding straight to bytes for storage rows.
+
+boto3 returns numbers as Decimal and binary attributes as Binary/bytes,
+which the stdlib encoder rejects. `dumps` handles those natively and skips
+the generic FastAPI encoder, so trusted rows go from DynamoDB to the wire
+without building or validating models. orjson is used when it is installed.
+"""
+import base64
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up
+    orjson = None
+
+JSON_MEDIA_TYPE = 'application/json'
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value) if all(isinstance(v, str) for v in value) else list(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    # boto3.dynamodb.types.Binary, without importing boto3 here
+    if type(value).__name__ == 'Binary' and hasattr(value, 'value'):
+        return base64.b64encode(value.value).decode('ascii')
+    # pydantic models
+    if hasattr(value, 'model_dump'):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps(value) -> bytes:
+    """Encode `value` as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return _encoder.encode(value).encode('utf-8')
@@ -0,0 +1,88 @@
+#api/singleflight.py
+"""Collapse concurrent identical reads into one storage call.
+
+When a herd of clients asks for the same note or listing at once, the first
+caller (the leader) runs the read and everyone who arrives while it is in
+flight waits for it and gets the same result, or the same exception.
+
+Results are shared objects, so callers must not mutate them. A flight is
+only joined if `generation()` hasn't changed since it started; crud passes
+the note cache's invalidation counter, so a read issued after a write never
+receives a result that was fetched before it.
+"""
+import threading
+from typing import Callable, Hashable, Optional
+
+from .metrics import registry
+
+singleflight_calls = registry.counter(
+    'notes_singleflight_calls_total', 'Reads that ran (leader) or shared an in-flight read (shared)',
+    ('group', 'role'))
+
+_groups = []
+
+
+def _dedupe_ratios():
+    samples = []
+    for name in _groups:
+        shared = singleflight_calls.value(name, 'shared')
+        total = shared + singleflight_calls.value(name, 'leader')
+        samples.append(((name,), shared / total if total else 0.0))
+    return samples
+
+
+registry.callback('notes_singleflight_dedupe_ratio', 'Fraction of reads served by another in-flight read',
+                  'gauge', _dedupe_ratios, ('group',))
+
+
+class _Call:
+    __slots__ = ('generation', 'done', 'result', 'error')
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str, generation: Optional[Callable[[], Hashable]] = None, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._generation = generation or (lambda: None)
+        self._calls = {}
+        self._lock = threading.Lock()
+        if name not in _groups:
+            _groups.append(name)
+
+    def do(self, key: Hashable, fn: Callable):
+        """fn(), or the result of an identical call already in flight"""
+        if not self.enabled:
+            return fn()
+        with self._lock:
+            generation = self._generation()
+            call = self._calls.get(key)
+            leader = call is None or call.generation != generation
+            if leader:
+                # A stale flight keeps running for its existing waiters only
+                call = self._calls[key] = _Call(generation)
+
+        if not leader:
+            singleflight_calls.inc(self.name, 'shared')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        singleflight_calls.inc(self.name, 'leader')
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
@@ -0,0 +1,45 @@
+#api/vercel.py
+"""BaseHTTPRequestHandler adapter for the Vercel Python runtime.
+
+api/notes.py and api/notes/[id].py both export this class as `handler`;
+every request goes through router.dispatch, so the Vercel functions serve
+the same routes as the FastAPI app and the Lambda handler.
+"""
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from .router import Request, dispatch, encode_response
+
+# Vercel passes the path as the browser sent it
+PATH_PREFIX = '/api'
+
+
+class handler(BaseHTTPRequestHandler):
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        if path == PATH_PREFIX or path.startswith(PATH_PREFIX + '/'):
+            path = path[len(PATH_PREFIX):] or '/'
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        request = Request(self.command, path, dict(parse_qsl(url.query)), dict(self.headers.items()), body)
+        response = encode_response(dispatch(request), self.headers.get('Accept-Encoding'),
+                                   if_none_match=self.headers.get('If-None-Match'))
+
+        self.send_response(response.status)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        if isinstance(response.body, bytes):
+            if response.status not in (204, 304):
+                self.send_header('Content-Length', str(len(response.body)))
+            self.end_headers()
+            self.wfile.write(response.body)
+        else:
+            # Streamed note bodies: the route already set Content-Length
+            self.end_headers()
+            for chunk in response.body:
+                self.wfile.write(chunk)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_OPTIONS = _dispatch
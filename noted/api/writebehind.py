@@ -0,0 +1,222 @@
+#api/writebehind.py
+"""Write-behind buffer that coalesces bursts of updates to the same note.
+
+Autosave clients send a PUT every few keystrokes. With write-behind on, an
+update is parked for up to `window` seconds and any later update to the same
+note replaces it, so only the last one is written. Each parked value keeps
+the updated_at it was accepted with, so the ETag handed to the client is the
+version that eventually lands.
+
+Bounded: at most `max_pending` notes are parked; beyond that the caller is
+told to write synchronously. Writes for one note never overlap or reorder,
+and close() flushes everything (called on shutdown and at exit).
+
+The client already has a 200 for a parked update, so a throttled (503)
+write is retried until storage takes it. An update that is dropped for good
+is passed to `on_drop`, so whoever showed it to readers can take it back.
+"""
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from .logs import get_logger
+from .metrics import registry
+
+logger = get_logger(__name__)
+
+writebehind_updates = registry.counter(
+    'notes_writebehind_updates_total', 'Updates accepted into the write-behind buffer')
+writebehind_writes = registry.counter(
+    'notes_writebehind_writes_total', 'Coalesced writes sent to storage', ('outcome',))
+writebehind_bypassed = registry.counter(
+    'notes_writebehind_bypassed_total', 'Updates written synchronously', ('reason',))
+
+
+class WriteBehind:
+    def __init__(self, write: Callable[[str, dict], None], window: float, max_pending: int = 1000,
+                 workers: int = 4, max_attempts: int = 3, close_timeout: float = 30.0,
+                 on_drop: Optional[Callable[[str, dict], None]] = None):
+        self._write = write
+        self._on_drop = on_drop
+        self.window = window
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.close_timeout = close_timeout
+        self._pending: Dict[str, dict] = {}   # note_id -> {'data', 'due', 'attempts'}
+        self._inflight: Dict[str, dict] = {}  # note_id -> data being written right now
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='writebehind')
+        self._thread = None
+        self._closed = False
+
+        registry.callback('notes_writebehind_pending', 'Notes with a parked update', 'gauge',
+                          lambda: [((), len(self._pending))])
+        registry.callback('notes_writebehind_coalescing_ratio', 'Accepted updates per storage write', 'gauge',
+                          lambda: [((), self.coalescing_ratio())])
+
+    def coalescing_ratio(self) -> float:
+        writes = writebehind_writes.value('ok')
+        return writebehind_updates.value() / writes if writes else 0.0
+
+    def submit(self, note_id: str, data: dict) -> bool:
+        """Park `data` as the next write for note_id; False means write it yourself"""
+        with self._cond:
+            if self._closed:
+                writebehind_bypassed.inc('closed')
+                return False
+            entry = self._pending.get(note_id)
+            if entry is None:
+                if len(self._pending) >= self.max_pending:
+                    writebehind_bypassed.inc('full')
+                    return False
+                # The deadline is set by the first update, so a steady stream
+                # of edits is still written at least once per window
+                self._pending[note_id] = {'data': data, 'due': time.monotonic() + self.window, 'attempts': 0}
+            else:
+                entry['data'] = data
+            writebehind_updates.inc()
+            self._ensure_thread()
+            self._cond.notify()
+        return True
+
+    def pending(self, note_id: str) -> Optional[dict]:
+        """The newest not-yet-stored value for a note, if any"""
+        with self._cond:
+            entry = self._pending.get(note_id)
+            if entry is not None:
+                return entry['data']
+            return self._inflight.get(note_id)
+
+    def oldest(self, key: str) -> Optional[str]:
+        """Smallest data[key] among parked and in-flight writes (None when idle)"""
+        with self._cond:
+            values = [entry['data'][key] for entry in self._pending.values()]
+            values.extend(data[key] for data in self._inflight.values())
+        return min(values) if values else None
+
+    def discard(self, note_id: str):
+        """Drop a parked update (the note is being deleted)"""
+        with self._cond:
+            self._pending.pop(note_id, None)
+
+    def flush_note(self, note_id: str):
+        """Write a note's parked update now and wait for it, or for the write in flight.
+
+        Called before a write that must land after it. If storage is throttled,
+        the update is parked again and the 503 is raised to the caller.
+        """
+        with self._cond:
+            while note_id in self._inflight:
+                self._cond.wait()
+            entry = self._pending.pop(note_id, None)
+            if entry is None:
+                return
+            self._inflight[note_id] = entry['data']
+        error = self._run(note_id, entry, requeue=False)
+        if error is not None:
+            with self._cond:
+                if note_id not in self._pending:
+                    entry['due'] = time.monotonic() + self.window
+                    self._pending[note_id] = entry
+                    self._ensure_thread()
+                    self._cond.notify()
+            raise error
+
+    def flush(self):
+        """Write everything that is parked now and wait for it to land"""
+        with self._cond:
+            for entry in self._pending.values():
+                entry['due'] = 0
+            self._cond.notify_all()
+            while (self._pending or self._inflight) and self._thread is not None and not self._closed:
+                self._cond.wait()
+
+    def close(self):
+        """Flush everything that is parked and stop accepting updates"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+        with self._cond:
+            remaining, self._pending = self._pending, {}
+        deadline = time.monotonic() + self.close_timeout
+        for note_id, entry in remaining.items():
+            delay = 0.05
+            while True:
+                with self._cond:
+                    self._inflight[note_id] = entry['data']
+                error = self._run(note_id, entry, requeue=False)
+                if error is None:
+                    break
+                if time.monotonic() + delay > deadline:
+                    writebehind_writes.inc('dropped')
+                    logger.error("write-behind update lost at shutdown",
+                                 extra={'note_id': note_id, 'error': str(error)})
+                    self._dropped(note_id, entry)
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='writebehind-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _loop(self):
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                due = [note_id for note_id, entry in self._pending.items()
+                       if entry['due'] <= now and note_id not in self._inflight]
+                for note_id in due:
+                    entry = self._pending.pop(note_id)
+                    self._inflight[note_id] = entry['data']
+                    self._executor.submit(self._run, note_id, entry)
+                waits = [entry['due'] - now for note_id, entry in self._pending.items()
+                         if note_id not in self._inflight]
+                self._cond.wait(timeout=max(min(waits), 0.001) if waits else None)
+
+    def _run(self, note_id: str, entry: dict, requeue: bool = True) -> Optional[Exception]:
+        """Write one entry; returns the error if it should be retried and requeue is off"""
+        outcome, error = 'ok', None
+        try:
+            self._write(note_id, entry['data'])
+        except Exception as e:
+            status = getattr(e, 'status_code', None)
+            entry['attempts'] += 1
+            # Throttled writes don't count against max_attempts
+            if status == 503 or (status not in (404, 412) and entry['attempts'] < self.max_attempts):
+                outcome, error = 'retry', e
+            else:
+                # Deleted or replaced underneath us, or out of retries: give up on it
+                outcome = 'dropped'
+                logger.warning("write-behind update dropped",
+                               extra={'note_id': note_id, 'status': status, 'error': str(e)})
+        finally:
+            writebehind_writes.inc(outcome)
+            with self._cond:
+                self._inflight.pop(note_id, None)
+                # A newer parked update for the note supersedes this one
+                if outcome == 'retry' and requeue and note_id not in self._pending:
+                    entry['due'] = time.monotonic() + self.window
+                    self._pending[note_id] = entry
+                superseded = note_id in self._pending
+                self._cond.notify_all()
+        if outcome == 'dropped' and not superseded:
+            self._dropped(note_id, entry)
+        return None if requeue else error
+
+    def _dropped(self, note_id: str, entry: dict):
+        if self._on_drop is None:
+            return
+        try:
+            self._on_drop(note_id, entry['data'])
+        except Exception:
+            logger.exception("write-behind drop handler failed", extra={'note_id': note_id})
@@ -0,0 +1,50 @@
+import { NextResponse } from 'next/server';
+import { NextRequest } from 'next/server';
+
+// GET /api/notes/[id]/body - Stream a note's body (offloaded notes only carry body_url)
+export async function GET(
+  request: NextRequest,
+  props: { params: Promise<{ id: string }> }
+) {
+  console.log(`[${request.method}] ${request.url}`);
+  try {
+    const { id } = await props.params;
+    // Pass validators and ranges through so partial and cached reads keep working
+    const forwarded: Record<string, string> = {};
+    for (const name of ['range', 'if-range', 'if-none-match']) {
+      const value = request.headers.get(name);
+      if (value) {
+        forwarded[name] = value;
+      }
+    }
+
+    const response = await fetch(`${process.env.PYTHON_API_URL}/notes/${id}/body`, {
+      method: 'GET',
+      headers: forwarded,
+      cache: 'no-store',
+    });
+
+    if (!response.ok && response.status !== 304) {
+      console.error('Python API body fetch failed:', response.status);
+      return NextResponse.json(
+        { error: 'Failed to fetch note body' },
+        { status: response.status }
+      );
+    }
+
+    const headers: Record<string, string> = {};
+    for (const name of ['content-type', 'content-range', 'accept-ranges', 'etag', 'cache-control']) {
+      const value = response.headers.get(name);
+      if (value) {
+        headers[name] = value;
+      }
+    }
+    return new Response(response.status === 304 ? null : response.body, { status: response.status, headers });
+  } catch (error) {
+    console.error('Error fetching note body:', error);
+    return NextResponse.json(
+      { error: 'Failed to fetch note body' },
+      { status: 500 }
+    );
+  }
+}
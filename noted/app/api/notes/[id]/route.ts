@@ -10,13 +10,24 @@ export async function GET(
   console.log(`[${request.method}] ${request.url}`);
   try {
     const { id } = await props.params;
+    const ifNoneMatch = request.headers.get('if-none-match');
     
     const response = await fetch(`${process.env.PYTHON_API_URL}/notes/${id}`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
+        ...(ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {}),
       },
+      cache: 'no-store',
     });
+    const etag = response.headers.get('etag');
+    const validatorHeaders: Record<string, string> = etag
+      ? { ETag: etag, 'Cache-Control': 'no-cache' }
+      : {};
+
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: validatorHeaders });
+    }
 
     if (!response.ok) {
       console.error('Python API fetch failed:', response.status);
@@ -27,7 +38,7 @@ export async function GET(
     }
 
     const note = await response.json();
-    return NextResponse.json(note);
+    return NextResponse.json(note, { headers: validatorHeaders });
   } catch (error: unknown) {
     console.error('Error fetching note:', error);
     const errorMessage = error instanceof Error ? error.message : 'Unknown error occurred';
@@ -0,0 +1,44 @@
+import { NextResponse } from 'next/server';
+
+// Long-lived stream: never cache or pre-render this route
+export const dynamic = 'force-dynamic';
+
+// GET /api/notes/events - Proxy the Python API's change stream (Server-Sent Events)
+export async function GET(request: Request) {
+  console.log(`[${request.method}] ${request.url}`);
+  try {
+    // EventSource sends Last-Event-ID when it reconnects; pass it on so the stream resumes
+    const lastEventId = request.headers.get('last-event-id');
+    const response = await fetch(`${process.env.PYTHON_API_URL}/notes/events`, {
+      method: 'GET',
+      headers: {
+        Accept: 'text/event-stream',
+        ...(lastEventId ? { 'Last-Event-ID': lastEventId } : {}),
+      },
+      cache: 'no-store',
+      signal: request.signal, // Close the upstream stream when the browser goes away
+    });
+
+    if (!response.ok || !response.body) {
+      console.error('Python API event stream failed:', response.status);
+      return NextResponse.json(
+        { error: 'Failed to open event stream' },
+        { status: response.status || 502 }
+      );
+    }
+
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream; charset=utf-8',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+      },
+    });
+  } catch (error) {
+    console.error('Error opening event stream:', error);
+    return NextResponse.json(
+      { error: 'Failed to open event stream' },
+      { status: 500 }
+    );
+  }
+}
@@ -5,12 +5,24 @@ import { NextRequest } from 'next/server';
 export async function GET(request: Request) {
   console.log(`[${request.method}] ${request.url}`);
   try {
+    // Forward the browser's validator so an unchanged list costs a 304, not a full download
+    const ifNoneMatch = request.headers.get('if-none-match');
     const response = await fetch(`${process.env.PYTHON_API_URL}/notes`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
+        ...(ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {}),
       },
+      cache: 'no-store',
     });
+    const etag = response.headers.get('etag');
+    const validatorHeaders: Record<string, string> = etag
+      ? { ETag: etag, 'Cache-Control': 'no-cache' }
+      : {};
+
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: validatorHeaders });
+    }
 
     if (!response.ok) {
       console.error('Python API fetch failed:', response.status);
@@ -28,7 +40,7 @@ export async function GET(request: Request) {
       return NextResponse.json({ notes: [] });
     }
 
-    return NextResponse.json(notes);
+    return NextResponse.json(notes, { headers: validatorHeaders });
   } catch (error) {
     console.error('Error fetching notes:', error);
     return NextResponse.json(
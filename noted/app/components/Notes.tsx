@@ -82,7 +82,8 @@ export default function Notes() {
                 </div>
               </div>
               <div className="window-body">
-                <p>{note.body}</p>
+                {/* Offloaded bodies are only loaded for editing; the list shows their snippet */}
+                <p>{note.body ?? (note.snippet ? `${note.snippet}…` : '(large note, open to read)')}</p>
                 <div className="field-row mt-4">
                   <button onClick={() => handleEdit(note)}>Edit</button> 
                  <button  onClick={() => handleDelete(note.id)}>Delete</button>
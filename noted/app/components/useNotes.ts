@@ -1,10 +1,49 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 
 interface Note {
   id: string;
   title: string;
-  body: string;
+  // Large bodies are kept out of JSON responses; body_url points at the raw text
+  // and snippet stands in for it in the list
+  body?: string;
+  body_url?: string;
+  body_size?: number;
+  snippet?: string;
   created_at?: string;
+  updated_at?: string;
+}
+
+// Insert or replace a note, ignoring copies older than the one we already have
+function upsertNote(notes: Note[], note: Note): Note[] {
+  const index = notes.findIndex(existing => existing.id === note.id);
+  if (index === -1) {
+    return [...notes, note];
+  }
+  const current = notes[index];
+  if (current.updated_at && note.updated_at && note.updated_at < current.updated_at) {
+    return notes;
+  }
+  return notes.map((existing, i) => (i === index ? note : existing));
+}
+
+type NotesChange = (notes: Note[]) => Note[];
+
+// Fill in the body of an offloaded note from its body endpoint. Only done
+// when a note is opened for editing: the list shows the snippet instead
+async function withBody(note: Note): Promise<Note> {
+  if (note.body !== undefined || !note.body_url) {
+    return note;
+  }
+  try {
+    const response = await fetch(`/api/notes/${note.id}/body`);
+    if (response.ok) {
+      return { ...note, body: await response.text() };
+    }
+    console.error('Failed to fetch note body:', note.id, response.status);
+  } catch (error) {
+    console.error('Error fetching note body:', error);
+  }
+  return note;
 }
 
 export function useNotes() {
@@ -13,6 +52,29 @@ export function useNotes() {
   const [body, setBody] = useState('');
   const [isEditing, setIsEditing] = useState(false);
   const [currentNote, setCurrentNote] = useState<Note | null>(null);
+  // Stream events that arrive while the list is loading, replayed on top of it
+  const latestLoad = useRef(0);
+  const loading = useRef(false);
+  const queued = useRef<NotesChange[]>([]);
+
+  const applyChange = useCallback((change: NotesChange) => {
+    if (loading.current) {
+      queued.current.push(change);
+    } else {
+      setNotes(change);
+    }
+  }, []);
+
+  // Only the newest load is applied, followed by every event since it started
+  const finishLoad = useCallback((load: number, loaded: Note[]) => {
+    if (load !== latestLoad.current) {
+      return;
+    }
+    const changes = queued.current;
+    queued.current = [];
+    loading.current = false;
+    setNotes(changes.reduce((notes, change) => change(notes), loaded));
+  }, []);
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -28,7 +90,8 @@ export function useNotes() {
         
   
         if (response.ok) {
-          await fetchNotes(); //  Refresh list
+          const updated: Note = await response.json();
+          applyChange(prevNotes => upsertNote(prevNotes, updated)); // No list refetch needed
           setIsEditing(false);
           setCurrentNote(null);
           setTitle('');
@@ -45,7 +108,8 @@ export function useNotes() {
         });
   
         if (response.ok) {
-          await fetchNotes(); //  Refresh list
+          const created: Note = await response.json();
+          applyChange(prevNotes => upsertNote(prevNotes, created)); // No list refetch needed
           setTitle('');
           setBody('');
         } else {
@@ -74,7 +138,7 @@ export function useNotes() {
   
       if (response.ok) {
         console.log('Delete successful:', data);
-        setNotes(prevNotes => prevNotes.filter(note => note.id !== id)); // Update the UI
+        applyChange(prevNotes => prevNotes.filter(note => note.id !== id)); // Update the UI
       } else {
         console.error('Delete failed:', data.message || 'Unknown error');
       }
@@ -85,14 +149,22 @@ export function useNotes() {
   };
   
 
-  const handleEdit = (note: Note) => {
+  const handleEdit = async (note: Note) => {
+    const loaded = await withBody(note);
+    if (loaded.body === undefined) {
+      // Saving an empty body over an offloaded one would lose it
+      console.error('Cannot edit note: body not loaded', note.id);
+      return;
+    }
     setIsEditing(true);
-    setCurrentNote(note);
-    setTitle(note.title);
-    setBody(note.body);
+    setCurrentNote(loaded);
+    setTitle(loaded.title);
+    setBody(loaded.body);
   };
 
-  const fetchNotes = async () => {
+  const fetchNotes = useCallback(async () => {
+    const load = ++latestLoad.current;
+    loading.current = true;
     try {
       console.log('Fetching notes...');
       const response = await fetch('/api/notes');
@@ -114,24 +186,64 @@ export function useNotes() {
           });
           
           console.log('Notes after filtering:', validNotes);
-          setNotes(validNotes);
+          finishLoad(load, validNotes);
         } else {
           console.error('Received non-array data:', data);
-          setNotes([]);
+          finishLoad(load, []);
         }
       } else {
         console.error('Failed to fetch notes:', response.status);
-        setNotes([]);
+        finishLoad(load, []);
       }
     } catch (error) {
       console.error('Error fetching notes:', error);
-      setNotes([]);
+      finishLoad(load, []);
     }
-  };
+  }, [finishLoad]);
 
+  // Keep the list current from the server's change stream instead of polling.
+  // The stream is opened before the list is loaded, on `ready`, so a write
+  // made in between arrives as an event. EventSource reconnects on its own
+  // and resumes from the last event id; a `reset` means events were missed,
+  // so the list is loaded again. A stream that fails before `ready` (the
+  // Lambda and Vercel handlers don't serve one) still gets the list once.
   useEffect(() => {
-    fetchNotes();
-  }, []);
+    if (typeof EventSource === 'undefined') {
+      fetchNotes();
+      return;
+    }
+    const source = new EventSource('/api/notes/events');
+    let listed = false;
+    const applyNote = (event: MessageEvent) => {
+      const note: Note = JSON.parse(event.data);
+      applyChange(prevNotes => upsertNote(prevNotes, note));
+    };
+    source.addEventListener('created', applyNote);
+    source.addEventListener('updated', applyNote);
+    // An accepted update failed to land: the server's copy wins even though it is older
+    source.addEventListener('reverted', (event: MessageEvent) => {
+      const note: Note = JSON.parse(event.data);
+      applyChange(prevNotes => prevNotes.map(existing => (existing.id === note.id ? note : existing)));
+    });
+    source.addEventListener('deleted', (event: MessageEvent) => {
+      const { id } = JSON.parse(event.data);
+      applyChange(prevNotes => prevNotes.filter(note => note.id !== id));
+    });
+    source.addEventListener('ready', () => {
+      listed = true;
+      fetchNotes();
+    });
+    source.addEventListener('error', () => {
+      if (!listed) {
+        listed = true;
+        fetchNotes();
+      }
+    });
+    source.addEventListener('reset', () => {
+      fetchNotes();
+    });
+    return () => source.close();
+  }, [fetchNotes, applyChange]);
 
   return {
     notes,
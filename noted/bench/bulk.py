@@ -0,0 +1,71 @@
+#bench/bulk.py
+"""Throughput of tools.bulk export/import vs. scan segments and write workers.
+
+Exports --items notes from the fake table to a temp NDJSON file with each
+segment count, then imports that file into an empty table with each worker
+count. Compare with one create_note (put_item) per note, the only option
+before the tool existed.
+
+Run from the `noted/` directory:
+
+    python -m bench.bulk
+    python -m bench.bulk --items 100000 --segments 1,8,32 --workers 1,8,32
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench.fake_dynamodb import FakeTable, install, make_notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--segments', default='1,4,16')
+    parser.add_argument('--workers', default='1,4,16')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated DynamoDB latency per call')
+    parser.add_argument('--body-size', type=int, default=500)
+    args = parser.parse_args()
+
+    from api import crud
+    from tools import bulk
+
+    notes = make_notes(args.items, body_size=args.body_size)
+    workdir = tempfile.mkdtemp(prefix='noted-bulk-')
+    path = os.path.join(workdir, 'notes.ndjson')
+
+    print(f"{args.items} notes, {args.latency_ms} ms per storage call")
+    print(f"{'operation':<10} {'parallel':>8} {'calls':>7} {'seconds':>8} {'notes/s':>9}")
+
+    def report(operation, parallel, table, elapsed):
+        calls = sum(table.calls.values())
+        print(f"{operation:<10} {parallel:>8} {calls:>7} {elapsed:>8.2f} {args.items / elapsed:>9.0f}")
+
+    for segments in (int(value) for value in args.segments.split(',')):
+        table = install(FakeTable(latency_ms=args.latency_ms))
+        table.load(notes)
+        start = time.perf_counter()
+        bulk.export_notes(path, segments, bulk.Checkpoint(path + '.checkpoint'), True, 3600)
+        report('export', segments, table, time.perf_counter() - start)
+
+    for workers in (int(value) for value in args.workers.split(',')):
+        table = install(FakeTable(latency_ms=args.latency_ms))
+        start = time.perf_counter()
+        bulk.import_notes(path, workers, bulk.Checkpoint(path + '.checkpoint'), True, 3600,
+                          path + '.rejects.ndjson')
+        report('import', workers, table, time.perf_counter() - start)
+        assert len(table._items) == args.items
+
+    # Baseline: one put_item per note, sequentially (a sample, extrapolated)
+    table = install(FakeTable(latency_ms=args.latency_ms))
+    sample = min(args.items, 500)
+    start = time.perf_counter()
+    for note in notes[:sample]:
+        crud.create_note(crud.Note(title=note['title'], body=note['body']))
+    elapsed = (time.perf_counter() - start) * args.items / sample
+    print(f"{'put_item':<10} {1:>8} {args.items:>7} {elapsed:>8.2f} {args.items / elapsed:>9.0f}  (extrapolated)")
+
+
+if __name__ == '__main__':
+    main()
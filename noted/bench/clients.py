@@ -0,0 +1,113 @@
+#bench/clients.py
+"""Dependency-free drivers for the two server flavours in api/.
+
+`asgi_request` calls the FastAPI app in-process through the raw ASGI
+interface (no sockets, no httpx). `HandlerServer` serves one of the
+BaseHTTPRequestHandler classes on a loopback port.
+"""
+import asyncio
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+async def asgi_request(app, method, path, body=None, headers=None):
+    """Send one request to an ASGI app and return (status, headers, body bytes)"""
+    if body is not None and not isinstance(body, (bytes, bytearray)):
+        body = json.dumps(body).encode('utf-8')
+    url = urlsplit(path)
+    request_headers = [(b'host', b'bench')]
+    if body is not None:
+        request_headers += [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    for name, value in (headers or {}).items():
+        request_headers.append((name.lower().encode('latin-1'), value.encode('latin-1')))
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': url.path,
+        'raw_path': url.path.encode('utf-8'),
+        'query_string': url.query.encode('utf-8'),
+        'root_path': '',
+        'headers': request_headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('bench', 80),
+    }
+
+    finished = asyncio.Event()
+    request_sent = False
+    response = {'status': None, 'headers': {}, 'body': bytearray()}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': bytes(body or b''), 'more_body': False}
+        # Only report a disconnect once the response is complete, like a real client
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {k.decode('latin-1'): v.decode('latin-1') for k, v in message.get('headers', [])}
+        elif message['type'] == 'http.response.body':
+            response['body'] += message.get('body', b'')
+            if not message.get('more_body', False):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    return response['status'], response['headers'], bytes(response['body'])
+
+
+class HandlerServer:
+    """Run a BaseHTTPRequestHandler class on 127.0.0.1 for the duration of a `with` block"""
+
+    def __init__(self, handler_class):
+        self.handler_class = handler_class
+        self.server = None
+
+    def __enter__(self):
+        handler_class = self.handler_class
+
+        class QuietHandler(handler_class):
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # The default backlog of 5 drops connections under load and the
+            # client's SYN retry adds a full second to those requests
+            request_queue_size = 128
+
+        self.server = Server(('127.0.0.1', 0), QuietHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def request(self, method, path, body=None, headers=None):
+        """Send one request and return (status, headers, body bytes)"""
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        try:
+            request_headers = dict(headers or {})
+            if body is not None and not isinstance(body, (bytes, bytearray)):
+                body = json.dumps(body).encode('utf-8')
+                request_headers.setdefault('Content-Type', 'application/json')
+            connection.request(method, path, body=body, headers=request_headers)
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
@@ -0,0 +1,148 @@
+#bench/cold_start.py
+"""Cold-start cost of each API entry point: import time and first-request latency.
+
+Every sample runs in a fresh interpreter. DynamoDB is a tiny local HTTP
+server speaking the DynamoDB JSON protocol (via AWS_ENDPOINT_URL_DYNAMODB),
+so the first request pays the real cost of importing boto3, building the
+client and signing/sending a request, without touching AWS.
+
+Run from the `noted/` directory:
+
+    python -m bench.cold_start --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NOTED_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NOTE_ID = '00000000-0000-4000-8000-000000000000'
+NOTE = {
+    'id': {'S': NOTE_ID},
+    'title': {'S': 'Cold start'},
+    'body': {'S': 'Measuring the first request'},
+    'created_at': {'S': '2025-01-01T00:00:00+00:00'},
+    'updated_at': {'S': '2025-01-01T00:00:00+00:00'},
+}
+
+# name -> (setup, timed import, untimed preparation, timed request)
+ENTRY_POINTS = {
+    'crud': (
+        '',
+        'from api import crud',
+        '',
+        'crud.get_note(NOTE_ID); crud.note_cache.clear()',
+    ),
+    'lambda_handler': (
+        '',
+        'from api.lambda_handler import handler',
+        'event = {"httpMethod": "DELETE", "path": "/notes/" + NOTE_ID}',
+        'assert handler(event, None)["statusCode"] == 200',
+    ),
+    'main (FastAPI)': (
+        'import asyncio; from bench.clients import asgi_request',
+        'from api.main import app',
+        '',
+        'assert asyncio.run(asgi_request(app, "GET", "/notes/" + NOTE_ID))[0] == 200; '
+        'from api import crud; crud.note_cache.clear()',
+    ),
+    'notes.py': (
+        'from bench.clients import HandlerServer',
+        'from api.notes import handler',
+        'server = HandlerServer(handler).__enter__()',
+        'assert server.request("GET", "/api/notes/" + NOTE_ID)[0] == 200',
+    ),
+}
+
+CHILD = '''
+import json, sys, time
+NOTE_ID = {note_id!r}
+{setup}
+start = time.perf_counter()
+{import_}
+imported = time.perf_counter()
+{prepare}
+{request}
+first = time.perf_counter()
+{request}
+second = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (first - imported) * 1000,
+    "warm_request_ms": (second - first) * 1000,
+}}))
+'''
+
+
+class StubDynamoDB(BaseHTTPRequestHandler):
+    """Answers GetItem/DeleteItem/PutItem/UpdateItem/Scan with a canned note"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        operation = self.headers.get('X-Amz-Target', '').split('.')[-1]
+        body = {
+            'GetItem': {'Item': NOTE},
+            'DeleteItem': {'Attributes': NOTE},
+            'UpdateItem': {'Attributes': NOTE},
+            'Scan': {'Items': [NOTE], 'Count': 1},
+        }.get(operation, {})
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-amz-json-1.0')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_sample(entry_point, port):
+    setup, import_, prepare, request = ENTRY_POINTS[entry_point]
+    code = CHILD.format(note_id=NOTE_ID, setup=setup, import_=import_, prepare=prepare, request=request)
+    env = dict(
+        os.environ,
+        AWS_ENDPOINT_URL_DYNAMODB=f'http://127.0.0.1:{port}',
+        AWS_ACCESS_KEY_ID='bench',
+        AWS_SECRET_ACCESS_KEY='bench',
+        AWS_REGION='ap-southeast-2',
+        NOTES_SEARCH_INDEX_PATH='',
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=NOTED_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', help='also write the medians to this file')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubDynamoDB)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {}
+    print(f"{'entry point':<16} {'import ms':>10} {'first req ms':>13} {'cold total ms':>14} {'warm req ms':>12}")
+    try:
+        for entry_point in ENTRY_POINTS:
+            samples = [run_sample(entry_point, server.server_address[1]) for _ in range(args.runs)]
+            medians = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+            results[entry_point] = medians
+            print(f"{entry_point:<16} {medians['import_ms']:>10.1f} {medians['first_request_ms']:>13.1f} "
+                  f"{medians['import_ms'] + medians['first_request_ms']:>14.1f} {medians['warm_request_ms']:>12.2f}")
+    finally:
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'runs': args.runs, 'results': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#bench/compression.py
+"""What body compression at rest and response compression save.
+
+At rest: stored item size and DynamoDB capacity units per write/read of one
+note, with NOTES_BODY_CODEC=none vs. zlib, across body sizes.
+
+On the wire: response bytes and time for the full list and a single note
+from the FastAPI app and the handler module, per Accept-Encoding.
+
+Bodies are random prose from a fixed vocabulary (not a repeated phrase,
+which would compress unrealistically well).
+
+Run from the `noted/` directory:
+
+    python -m bench.compression
+    python -m bench.compression --body-sizes 1000,4000,16000 --items 1000
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+
+from bench.clients import HandlerServer, asgi_request
+from bench.fake_dynamodb import FakeTable, install, item_size, load_handler_modules
+
+WORDS = ('the a of to and in that is for it with as was on be at by this had not are but from or have an they '
+         'which one you were all we her she there would their will when who him been has more if no out so said '
+         'what up its about than into them can only other time new some could these two may first then do any '
+         'like my now over such our man me even most made after also did many before must through back years '
+         'where much your way well down should because each just those people how too little state good very '
+         'note meeting project draft review budget schedule client release deadline update follow idea list '
+         'groceries call email plan design sprint retro notes todo remember check send fix').split()
+
+
+def prose(size, rng):
+    words, length = [], 0
+    while length < size:
+        # Roughly Zipfian: common words far more often than rare ones
+        word = WORDS[min(int(rng.paretovariate(1.2)) - 1, len(WORDS) - 1)]
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size]
+
+
+def make_items(count, body_size, seed=1):
+    from api import crud
+    rng = random.Random(seed)
+    items = []
+    for index in range(count):
+        note = crud.Note(title=f'Note {index}', body=prose(body_size, rng))
+        items.append(crud.pack_body(crud.new_note_item(note)))
+    return items
+
+
+def at_rest(body_sizes):
+    from api import compression
+
+    print("At rest (one note)")
+    print(f"{'body':>7} {'codec':>6} {'item bytes':>11} {'WCU':>5} {'RCU':>5} {'encode us':>10} {'decode us':>10}")
+    for body_size in body_sizes:
+        for codec in ('none', 'zlib'):
+            compression.BODY_CODEC = codec
+            items = make_items(50, body_size)
+            size = sum(item_size(item) for item in items) / len(items)
+
+            from api import crud
+            start = time.perf_counter()
+            for item in items:
+                crud.body_text(item)
+            decode = (time.perf_counter() - start) / len(items)
+            text = crud.body_text(items[0])
+            start = time.perf_counter()
+            for _ in range(50):
+                compression.compress_body(text)
+            encode = (time.perf_counter() - start) / 50
+
+            # Writes are billed per 1 KB, strongly consistent reads per 4 KB
+            print(f"{body_size:>7} {codec:>6} {size:>11.0f} {math.ceil(size / 1024):>5} "
+                  f"{math.ceil(size / 4096):>5} {encode * 1e6:>10.1f} {decode * 1e6:>10.1f}")
+    compression.BODY_CODEC = 'none'
+
+
+def on_the_wire(items_count, body_size, repeat):
+    from api import compression, main as api_main
+
+    encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+    table = install(FakeTable())
+    items = make_items(items_count, body_size)
+    table.load(items)
+    note_path = f"/notes/{items[0]['id']}"
+
+    print(f"\nOn the wire ({items_count} notes, {body_size}-byte bodies)"
+          + ('' if compression.brotli else '; install `brotli` to include br'))
+    print(f"{'target':<10} {'request':<12} {'encoding':<9} {'bytes':>10} {'ratio':>6} {'ms':>8}")
+
+    def report(target, label, encoding, sizes, elapsed, baseline):
+        ratio = sizes / baseline if baseline else 1.0
+        print(f"{target:<10} {label:<12} {encoding:<9} {sizes:>10} {ratio:>6.2f} {elapsed * 1000:>8.2f}")
+
+    for label, path in (('list', '/notes/'), ('get', note_path)):
+        baseline = None
+        for encoding in encodings:
+            headers = {'Accept-Encoding': encoding}
+            start = time.perf_counter()
+            for _ in range(repeat):
+                status, _, body = asyncio.run(asgi_request(api_main.app, 'GET', path, headers=headers))
+                assert status == 200, status
+            elapsed = (time.perf_counter() - start) / repeat
+            baseline = baseline or len(body)
+            report('fastapi', label, encoding, len(body), elapsed, baseline)
+
+    handler = load_handler_modules()['notes'].handler
+    with HandlerServer(handler) as server:
+        for label, path in (('list', '/api/notes'), ('get', '/api' + note_path)):
+            baseline = None
+            for encoding in encodings:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    status, _, body = server.request('GET', path, headers={'Accept-Encoding': encoding})
+                    assert status == 200, status
+                elapsed = (time.perf_counter() - start) / repeat
+                baseline = baseline or len(body)
+                report('handler', label, encoding, len(body), elapsed, baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--body-sizes', default='500,2000,8000,30000')
+    parser.add_argument('--items', type=int, default=500, help='notes in the listed table')
+    parser.add_argument('--list-body-size', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    at_rest([int(value) for value in args.body_sizes.split(',')])
+    on_the_wire(args.items, args.list_body_size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#bench/concurrency.py
+"""Requests per second through the FastAPI app vs. requests in flight.
+
+Each fake DynamoDB call sleeps for --latency-ms. With the async storage
+layer throughput should grow with concurrency until NOTES_STORAGE_CONCURRENCY
+is reached; with --blocking the crud calls run on the event loop (the old
+behaviour) and throughput stays flat.
+
+Run from the `noted/` directory:
+
+    python -m bench.concurrency --inflight 1,4,16,64
+    python -m bench.concurrency --inflight 1,4,16,64 --blocking
+"""
+import argparse
+import asyncio
+import time
+
+from bench.clients import asgi_request
+from bench.fake_dynamodb import FakeTable, install, make_notes
+
+
+async def drive(app, paths, inflight, total):
+    issued = 0
+
+    async def worker():
+        nonlocal issued
+        while issued < total:
+            path = paths[issued % len(paths)]
+            issued += 1
+            status, _, _ = await asgi_request(app, 'GET', path)
+            assert status == 200, status
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(inflight)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--inflight', default='1,2,4,8,16,32,64')
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--latency-ms', type=float, default=10.0)
+    parser.add_argument('--blocking', action='store_true', help='call crud directly on the event loop')
+    args = parser.parse_args()
+
+    from api import async_crud, crud, main as api_main
+
+    table = install(FakeTable(latency_ms=args.latency_ms))
+    notes = make_notes(1000)
+    table.load(notes)
+    # Measure storage access, not the read cache
+    crud.note_cache.maxsize = 0
+
+    if args.blocking:
+        async def run_inline(func, *func_args, **func_kwargs):
+            return func(*func_args, **func_kwargs)
+        async_crud.run = run_inline
+
+    paths = [f"/notes/{note['id']}" for note in notes]
+    print(f"mode: {'blocking' if args.blocking else 'async'}, pool size {async_crud.STORAGE_CONCURRENCY}")
+    print(f"{'inflight':>8} {'seconds':>8} {'req/s':>8}")
+    for inflight in (int(value) for value in args.inflight.split(',')):
+        elapsed = asyncio.run(drive(api_main.app, paths, inflight, args.requests))
+        print(f"{inflight:>8} {elapsed:>8.2f} {args.requests / elapsed:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#bench/events.py
+"""Fan-out of note changes to many /notes/events subscribers vs. polling.
+
+--subscribers streams are consumed on one event loop while a writer thread
+updates notes through crud. Reports the publish cost, the delivery latency
+from publish to every subscriber, and the storage calls made. For
+comparison, each client re-listing the notes after every change (what
+useNotes did before) costs that many full scans.
+
+Run from the `noted/` directory:
+
+    python -m bench.events
+    python -m bench.events --subscribers 5000 --changes 500 --items 5000
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from bench.fake_dynamodb import FakeTable, install, make_notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--subscribers', type=int, default=1000)
+    parser.add_argument('--changes', type=int, default=200, help='note updates to publish')
+    parser.add_argument('--interval-ms', type=float, default=2.0, help='pause between updates')
+    args = parser.parse_args()
+
+    from api import crud
+    from api.events import EventBus
+
+    table = install(FakeTable())
+    notes = make_notes(args.items)
+    table.load(notes)
+    bus = crud.note_events = EventBus(size=max(args.changes, 16))
+    # One writer thread, so event n was the n-th publish
+    published, publish_costs = [], []
+    publish = bus.publish
+
+    def timed_publish(event_type, data):
+        start = time.perf_counter()
+        published.append(start)
+        publish(event_type, data)
+        publish_costs.append(time.perf_counter() - start)
+
+    bus.publish = timed_publish
+    latencies = []
+
+    async def subscriber(ready):
+        received = 0
+        stream = bus.stream(heartbeat=60)
+        await stream.__anext__()
+        ready.release()
+        async for chunk in stream:
+            now = time.perf_counter()
+            for line in chunk.split(b'\n'):
+                if line.startswith(b'id: '):
+                    sequence = int(line.rsplit(b'-', 1)[1])
+                    latencies.append(now - published[sequence - 1])
+                    received += 1
+            if received >= args.changes:
+                await stream.aclose()
+                return received
+
+    def writer():
+        for index in range(args.changes):
+            note = notes[index % len(notes)]
+            crud.update_note(note['id'], {'title': note['title'], 'body': f'Edit {index}'})
+            time.sleep(args.interval_ms / 1000)
+
+    async def run():
+        ready = asyncio.Semaphore(0)
+        tasks = [asyncio.create_task(subscriber(ready)) for _ in range(args.subscribers)]
+        for _ in range(args.subscribers):
+            await ready.acquire()
+        table.reset_calls()
+        thread = threading.Thread(target=writer)
+        start = time.perf_counter()
+        thread.start()
+        received = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        thread.join()
+        return sum(received), elapsed
+
+    received, elapsed = asyncio.run(run())
+    latencies.sort()
+    publish_us = [cost * 1e6 for cost in publish_costs]
+    stream_calls = sum(table.calls.values())
+
+    # Polling baseline: every client lists the whole table after each change
+    table.reset_calls()
+    crud.note_cache.clear()
+    crud.list_reads.enabled = False
+    crud.get_all_note_rows()
+    scan_calls = sum(table.calls.values())
+
+    print(f"{args.subscribers} subscribers, {args.changes} updates, {args.items} notes")
+    print(f"delivered          {received} events in {elapsed:.2f}s ({received / elapsed:.0f}/s)")
+    print(f"publish            median {statistics.median(publish_us):.1f} us, max {max(publish_us):.1f} us")
+    print(f"delivery latency   p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms")
+    print(f"storage calls      stream {stream_calls} (the updates themselves), "
+          f"polling +{scan_calls * args.subscribers * args.changes} scan pages")
+
+
+if __name__ == '__main__':
+    main()
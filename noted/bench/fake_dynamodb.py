@@ -0,0 +1,483 @@
+#bench/fake_dynamodb.py
+"""In-memory stand-in for the boto3 DynamoDB Table resource used by api.crud.
+
+Only the calls and expression forms the API actually issues are supported.
+Every request sleeps for a configurable latency so that concurrency effects
+(parallel scans, thread pools, batching) show up in wall-clock numbers the
+same way they would against a real table.
+"""
+import bisect
+import copy
+import importlib
+import importlib.util
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from botocore.exceptions import ClientError
+
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-2')
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api')
+
+
+def _client_error(code, message, operation, item=None):
+    error = {'Error': {'Code': code, 'Message': message}}
+    if item is not None:
+        error['Item'] = item
+    return ClientError(error, operation)
+
+
+_TOKEN = re.compile(r'\s*(\(|\)|,|=|<>|<=|>=|<|>|[:#]?[A-Za-z_][A-Za-z0-9_]*)')
+
+
+class _Condition:
+    """Evaluates the subset of condition/filter expressions the API uses:
+    attribute_exists, attribute_not_exists, comparisons, AND, OR, NOT and
+    parentheses."""
+
+    def __init__(self, expression, names=None, values=None):
+        self.tokens = []
+        position = 0
+        while position < len(expression):
+            match = _TOKEN.match(expression, position)
+            if not match:
+                if expression[position:].strip():
+                    raise ValueError(f"Unsupported expression: {expression!r}")
+                break
+            self.tokens.append(match.group(1))
+            position = match.end()
+        self.names = names or {}
+        self.values = values or {}
+
+    def evaluate(self, item):
+        self.position = 0
+        self.item = item or {}
+        result = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Trailing tokens in expression: {self.tokens[self.position:]}")
+        return result
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _take(self, expected=None):
+        token = self._peek()
+        if expected is not None and (token or '').lower() != expected:
+            raise ValueError(f"Expected {expected!r}, got {token!r}")
+        self.position += 1
+        return token
+
+    def _or(self):
+        result = self._and()
+        while (self._peek() or '').lower() == 'or':
+            self._take()
+            right = self._and()
+            result = result or right
+        return result
+
+    def _and(self):
+        result = self._not()
+        while (self._peek() or '').lower() == 'and':
+            self._take()
+            right = self._not()
+            result = result and right
+        return result
+
+    def _not(self):
+        if (self._peek() or '').lower() == 'not':
+            self._take()
+            return not self._not()
+        return self._primary()
+
+    def _primary(self):
+        token = self._peek()
+        if token == '(':
+            self._take()
+            result = self._or()
+            self._take(')')
+            return result
+        if token in ('attribute_exists', 'attribute_not_exists'):
+            self._take()
+            self._take('(')
+            name = self._name(self._take())
+            self._take(')')
+            return (name in self.item) == (token == 'attribute_exists')
+
+        left = self._operand(self._take())
+        operator = self._take()
+        right = self._operand(self._take())
+        if left is None or right is None:
+            return operator == '<>' and left != right
+        return {
+            '=': left == right, '<>': left != right,
+            '<': left < right, '<=': left <= right,
+            '>': left > right, '>=': left >= right
+        }[operator]
+
+    def _name(self, token):
+        return self.names.get(token, token)
+
+    def _operand(self, token):
+        if token.startswith(':'):
+            return self.values[token]
+        return self.item.get(self._name(token))
+
+
+def _check(expression, item, names, values, operation, return_old=False):
+    if expression and not _Condition(expression, names, values).evaluate(item):
+        raise _client_error(
+            'ConditionalCheckFailedException', 'The conditional request failed', operation,
+            item=copy.deepcopy(item) if return_old and item is not None else None
+        )
+
+
+# Global secondary indexes of Notes_Table: name -> (partition key, sort key)
+INDEXES = {
+    'changes-by-updated_at': ('sync_bucket', 'updated_at'),
+    'recent-by-created_at': ('list_bucket', 'created_at'),
+}
+
+
+def _project(item, projection, names):
+    """Apply a ProjectionExpression of top-level attribute names"""
+    if not projection:
+        return copy.deepcopy(item)
+    names = names or {}
+    wanted = (names.get(part.strip(), part.strip()) for part in projection.split(','))
+    return {name: copy.deepcopy(item[name]) for name in wanted if name in item}
+
+
+def item_size(item):
+    """Approximate DynamoDB item size: attribute names plus values, the way
+    capacity units are billed (strings as UTF-8, binary as raw bytes)"""
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode('utf-8'))
+        value = getattr(value, 'value', value)
+        if isinstance(value, str):
+            size += len(value.encode('utf-8'))
+        elif isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, (int, float)):
+            size += len(str(value)) // 2 + 2
+        else:
+            size += len(json.dumps(value, default=str))
+    return size
+
+
+READ_OPERATIONS = frozenset({'GetItem', 'Scan', 'Query', 'BatchGetItem'})
+
+
+class FakeTable:
+    """`read_capacity`/`write_capacity` (units per second) emulate a provisioned
+    table: calls beyond them fail with ProvisionedThroughputExceededException."""
+
+    def __init__(self, name='Notes_Table', latency_ms=0.0, per_item_us=0.0, page_items=1000, indexes=None,
+                 read_capacity=None, write_capacity=None):
+        from api.ratelimit import TokenBucket
+
+        self.name = name
+        self.read_capacity = TokenBucket(read_capacity) if read_capacity else None
+        self.write_capacity = TokenBucket(write_capacity) if write_capacity else None
+        self.indexes = dict(INDEXES if indexes is None else indexes)
+        self.latency = latency_ms / 1000.0
+        self.per_item = per_item_us / 1_000_000.0
+        # Emulates the 1 MB page cap of a real scan
+        self.page_items = page_items
+        self.calls = {}
+        # Approximate item bytes handed back by reads (after projection)
+        self.bytes_returned = 0
+        self._items = {}
+        self._sorted_keys = None
+        self._lock = threading.Lock()
+
+    # -- helpers -----------------------------------------------------------
+
+    def load(self, items):
+        """Bulk-load items without charging any latency or call counts"""
+        with self._lock:
+            for item in items:
+                self._items[item['id']] = copy.deepcopy(item)
+            self._sorted_keys = None
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = {}
+            self.bytes_returned = 0
+
+    def _charge(self, operation, items=0):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        delay = self.latency + self.per_item * items
+        if delay:
+            time.sleep(delay)
+        bucket = self.read_capacity if operation in READ_OPERATIONS else self.write_capacity
+        if bucket is not None:
+            # Scans and queries read ~10 small items per 4 KB unit
+            units = math.ceil(items / 10) if operation in ('Scan', 'Query') else items
+            if bucket.acquire(max(1, units)):
+                with self._lock:
+                    self.calls['Throttled'] = self.calls.get('Throttled', 0) + 1
+                raise _client_error('ProvisionedThroughputExceededException',
+                                    'The level of configured provisioned throughput for the table was exceeded',
+                                    operation)
+
+    def _returned(self, items):
+        size = sum(item_size(item) for item in items)
+        with self._lock:
+            self.bytes_returned += size
+
+    def _keys(self):
+        with self._lock:
+            if self._sorted_keys is None:
+                self._sorted_keys = sorted(self._items)
+            return self._sorted_keys
+
+    # -- Table API ---------------------------------------------------------
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, **kwargs):
+        self._charge('PutItem', 1)
+        with self._lock:
+            _check(ConditionExpression, self._items.get(Item['id']), ExpressionAttributeNames,
+                   ExpressionAttributeValues, 'PutItem')
+            self._items[Item['id']] = copy.deepcopy(Item)
+            self._sorted_keys = None
+        return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        self._charge('GetItem', 1)
+        item = self._items.get(Key['id'])
+        response = {'ResponseMetadata': {'HTTPStatusCode': 200}}
+        if item is not None:
+            response['Item'] = _project(item, ProjectionExpression, ExpressionAttributeNames)
+            self._returned([response['Item']])
+        return response
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues=None, ReturnValues='NONE',
+                    ConditionExpression=None, ExpressionAttributeNames=None,
+                    ReturnValuesOnConditionCheckFailure='NONE', **kwargs):
+        self._charge('UpdateItem', 1)
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        with self._lock:
+            current = self._items.get(Key['id'])
+            _check(ConditionExpression, current, names, values, 'UpdateItem',
+                   return_old=ReturnValuesOnConditionCheckFailure == 'ALL_OLD')
+            item = copy.deepcopy(current) if current is not None else dict(Key)
+            for clause, body in re.findall(r'(set|remove)\s+(.*?)(?=\s+(?:set|remove)\s+|$)',
+                                           UpdateExpression.strip(), re.IGNORECASE):
+                for part in body.split(','):
+                    if clause.lower() == 'remove':
+                        item.pop(names.get(part.strip(), part.strip()), None)
+                        continue
+                    name, value = (side.strip() for side in part.split('=', 1))
+                    item[names.get(name, name)] = values[value]
+            self._items[Key['id']] = item
+            self._sorted_keys = None
+        response = {'ResponseMetadata': {'HTTPStatusCode': 200}}
+        if ReturnValues == 'ALL_NEW':
+            response['Attributes'] = copy.deepcopy(item)
+        elif ReturnValues == 'ALL_OLD' and current is not None:
+            response['Attributes'] = copy.deepcopy(current)
+        return response
+
+    def delete_item(self, Key, ReturnValues='NONE', ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValuesOnConditionCheckFailure='NONE', **kwargs):
+        self._charge('DeleteItem', 1)
+        with self._lock:
+            old = self._items.get(Key['id'])
+            _check(ConditionExpression, old, ExpressionAttributeNames, ExpressionAttributeValues, 'DeleteItem',
+                   return_old=ReturnValuesOnConditionCheckFailure == 'ALL_OLD')
+            self._items.pop(Key['id'], None)
+            self._sorted_keys = None
+        response = {'ResponseMetadata': {'HTTPStatusCode': 200}}
+        if ReturnValues == 'ALL_OLD' and old is not None:
+            response['Attributes'] = old
+        return response
+
+    def scan(self, Limit=None, ExclusiveStartKey=None, Segment=None, TotalSegments=None, FilterExpression=None,
+             ExpressionAttributeNames=None, ExpressionAttributeValues=None, ProjectionExpression=None, **kwargs):
+        if (Segment is None) != (TotalSegments is None):
+            raise _client_error('ValidationException', 'Segment and TotalSegments go together', 'Scan')
+        condition = FilterExpression and _Condition(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+
+        keys = self._keys()
+        start = 0
+        if ExclusiveStartKey:
+            start = bisect.bisect_right(keys, ExclusiveStartKey['id'])
+
+        # Like DynamoDB, Limit counts items evaluated before the filter is applied
+        page_size = min(Limit or self.page_items, self.page_items)
+        page, evaluated, position, last_key = [], 0, start, None
+        while position < len(keys) and evaluated < page_size:
+            key = keys[position]
+            position += 1
+            if TotalSegments and zlib.crc32(key.encode('utf-8')) % TotalSegments != Segment:
+                continue
+            item = self._items.get(key)
+            if item is None:
+                continue
+            evaluated += 1
+            last_key = key
+            if not condition or condition.evaluate(item):
+                page.append(_project(item, ProjectionExpression, ExpressionAttributeNames))
+
+        self._charge('Scan', evaluated)
+        self._returned(page)
+        response = {'Items': page, 'Count': len(page), 'ScannedCount': evaluated,
+                    'ResponseMetadata': {'HTTPStatusCode': 200}}
+        if position < len(keys) and last_key is not None:
+            response['LastEvaluatedKey'] = {'id': last_key}
+        return response
+
+    def query(self, IndexName, KeyConditionExpression, ExpressionAttributeValues, ExpressionAttributeNames=None,
+              ScanIndexForward=True, Limit=None, ExclusiveStartKey=None, FilterExpression=None,
+              ProjectionExpression=None, **kwargs):
+        if IndexName not in self.indexes:
+            raise _client_error('ValidationException', f'No index named {IndexName}', 'Query')
+        partition_key, sort_key = self.indexes[IndexName]
+        key_condition = _Condition(KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        condition = FilterExpression and _Condition(FilterExpression, ExpressionAttributeNames,
+                                                    ExpressionAttributeValues)
+
+        with self._lock:
+            # Sparse index: only items carrying both key attributes are in it
+            matches = [item for item in self._items.values()
+                       if partition_key in item and sort_key in item and key_condition.evaluate(item)]
+        order = lambda item: (item[sort_key], item['id'])
+        matches.sort(key=order, reverse=not ScanIndexForward)
+        if ExclusiveStartKey:
+            boundary = (ExclusiveStartKey[sort_key], ExclusiveStartKey['id'])
+            matches = [item for item in matches
+                       if (order(item) > boundary if ScanIndexForward else order(item) < boundary)]
+
+        page_size = min(Limit or self.page_items, self.page_items)
+        evaluated = matches[:page_size]
+        page = [_project(item, ProjectionExpression, ExpressionAttributeNames)
+                for item in evaluated if not condition or condition.evaluate(item)]
+        self._charge('Query', len(evaluated))
+        self._returned(page)
+        response = {'Items': page, 'Count': len(page), 'ScannedCount': len(evaluated),
+                    'ResponseMetadata': {'HTTPStatusCode': 200}}
+        if len(matches) > page_size:
+            last = evaluated[-1]
+            response['LastEvaluatedKey'] = {'id': last['id'], partition_key: last[partition_key], sort_key: last[sort_key]}
+        return response
+
+
+class FakeDynamoDB:
+    """Stand-in for the boto3 DynamoDB service resource (Table + batch calls).
+
+    `unprocessed_rate` is the chance that any single request in a batch is
+    handed back as unprocessed, to exercise the retry path.
+    """
+
+    def __init__(self, table, unprocessed_rate=0.0, seed=None):
+        self.table = table
+        self.unprocessed_rate = unprocessed_rate
+        self._random = random.Random(seed)
+
+    def Table(self, name):
+        return self.table
+
+    def _unprocessed(self):
+        return self.unprocessed_rate and self._random.random() < self.unprocessed_rate
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        table = self.table
+        requests = RequestItems[table.name]
+        keys = [(r.get('PutRequest', {}).get('Item') or r['DeleteRequest']['Key'])['id'] for r in requests]
+        if len(requests) > 25 or len(set(keys)) != len(keys):
+            raise _client_error('ValidationException', 'Too many or duplicate items in batch', 'BatchWriteItem')
+
+        table._charge('BatchWriteItem', len(requests))
+        unprocessed = []
+        with table._lock:
+            for request in requests:
+                if self._unprocessed():
+                    unprocessed.append(request)
+                elif 'PutRequest' in request:
+                    item = request['PutRequest']['Item']
+                    table._items[item['id']] = copy.deepcopy(item)
+                else:
+                    table._items.pop(request['DeleteRequest']['Key']['id'], None)
+            table._sorted_keys = None
+        return {
+            'UnprocessedItems': {table.name: unprocessed} if unprocessed else {},
+            'ResponseMetadata': {'HTTPStatusCode': 200}
+        }
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        table = self.table
+        request = RequestItems[table.name]
+        keys = request['Keys']
+        ids = [key['id'] for key in keys]
+        if len(keys) > 100 or len(set(ids)) != len(ids):
+            raise _client_error('ValidationException', 'Too many or duplicate keys in batch', 'BatchGetItem')
+
+        table._charge('BatchGetItem', len(keys))
+        found, unprocessed = [], []
+        for key in keys:
+            if self._unprocessed():
+                unprocessed.append(key)
+            elif key['id'] in table._items:
+                found.append(_project(table._items[key['id']], request.get('ProjectionExpression'),
+                                      request.get('ExpressionAttributeNames')))
+        table._returned(found)
+        return {
+            'Responses': {table.name: found},
+            'UnprocessedKeys': {table.name: {'Keys': unprocessed}} if unprocessed else {},
+            'ResponseMetadata': {'HTTPStatusCode': 200}
+        }
+
+
+def make_notes(count, body_size=200, start=0):
+    """Build `count` realistic note items with ids numbered from `start`"""
+    body = ('lorem ipsum dolor sit amet ' * (body_size // 27 + 1))[:body_size]
+    epoch = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    notes = []
+    for index in range(start, start + count):
+        # One second apart, so recency order follows the index
+        created_at = (epoch + timedelta(seconds=index)).isoformat()
+        notes.append({
+            'id': f'{index:08x}-0000-4000-8000-000000000000',
+            'title': f'Note {index}',
+            'body': body,
+            'snippet': ' '.join(body.split())[:160],
+            'created_at': created_at,
+            'updated_at': created_at,
+            'sync_bucket': 'notes',
+            'list_bucket': 'notes'
+        })
+    return notes
+
+
+def load_handler_modules():
+    """Import the BaseHTTPRequestHandler modules (api/notes.py, api/notes/[id].py)"""
+    modules = {'notes': importlib.import_module('api.notes')}
+    name = 'api.notes_id'
+    module = importlib.sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(API_DIR, 'notes', '[id].py'))
+        module = importlib.util.module_from_spec(spec)
+        importlib.sys.modules[name] = module
+        spec.loader.exec_module(module)
+    modules['notes_id'] = module
+    return modules
+
+
+def install(table, unprocessed_rate=0.0):
+    """Point the shared DynamoDB resource in api.dynamo at the given fake table"""
+    from api import crud, dynamo
+    dynamo.set_resource(FakeDynamoDB(table, unprocessed_rate=unprocessed_rate))
+    crud.note_cache.clear()
+    return table
@@ -0,0 +1,66 @@
+#bench/herd.py
+"""Thundering herd: many clients loading the same data at the same moment.
+
+Each wave fires --clients identical requests at once (the note list, or one
+note with the read cache cold) and counts the DynamoDB calls they cause,
+with single-flight off and on.
+
+Run from the `noted/` directory:
+
+    python -m bench.herd
+    python -m bench.herd --clients 200 --waves 10 --items 5000
+"""
+import argparse
+import asyncio
+import time
+
+from bench.clients import asgi_request
+from bench.fake_dynamodb import FakeTable, install, make_notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=100, help='identical requests per wave')
+    parser.add_argument('--waves', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='simulated DynamoDB latency per call')
+    args = parser.parse_args()
+
+    from api import async_crud, crud, main as api_main
+    from api.singleflight import singleflight_calls
+
+    table = install(FakeTable(latency_ms=args.latency_ms))
+    notes = make_notes(args.items)
+    table.load(notes)
+    requests = (('list', '/notes/?limit=50'), ('list all', '/notes/'), ('get', f"/notes/{notes[0]['id']}"))
+
+    async def wave(path):
+        results = await asyncio.gather(*(asgi_request(api_main.app, 'GET', path) for _ in range(args.clients)))
+        assert all(status == 200 for status, _, _ in results)
+
+    print(f"{args.clients} identical requests per wave, {args.waves} waves")
+    print(f"{'request':<9} {'single-flight':<14} {'storage calls':>14} {'per wave':>9} {'wave ms':>9}")
+    for label, path in requests:
+        for enabled in (False, True):
+            crud.note_reads.enabled = crud.list_reads.enabled = enabled
+            table.reset_calls()
+            elapsed = 0.0
+            for _ in range(args.waves):
+                # Every wave starts cold, as after a deploy or cache expiry
+                crud.note_cache.clear()
+                start = time.perf_counter()
+                asyncio.run(wave(path))
+                elapsed += time.perf_counter() - start
+            calls = sum(table.calls.values())
+            print(f"{label:<9} {'on' if enabled else 'off':<14} {calls:>14} {calls / args.waves:>9.1f} "
+                  f"{elapsed / args.waves * 1000:>9.1f}")
+
+    for group in ('note', 'list'):
+        shared = singleflight_calls.value(group, 'shared')
+        total = shared + singleflight_calls.value(group, 'leader')
+        print(f"dedupe rate ({group}): {shared / total if total else 0:.2f}")
+    async_crud.shutdown()
+
+
+if __name__ == '__main__':
+    main()
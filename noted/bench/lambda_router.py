@@ -0,0 +1,127 @@
+#bench/lambda_router.py
+"""Per-invocation cost of the Lambda entry point vs. FastAPI behind an adapter.
+
+Replays the same API Gateway (REST, payload 1.0) events against
+lambda_handler.handler and against the FastAPI app wrapped in a minimal
+Mangum-style adapter (event -> ASGI scope -> app -> Lambda response, on a
+loop kept across invocations). Both run warm and in-process on the in-memory
+DynamoDB fake with no simulated latency, so the difference is routing and
+translation overhead, not storage. bench.cold_start covers import time.
+
+Run from the `noted/` directory:
+
+    python -m bench.lambda_router
+    python -m bench.lambda_router --invocations 5000 --items 2000
+"""
+import argparse
+import asyncio
+import base64
+import json
+import statistics
+import time
+from urllib.parse import urlencode
+
+from bench.fake_dynamodb import FakeTable, install, make_notes
+
+
+def asgi_adapter(app):
+    """A Lambda handler that runs an ASGI app per event, as Mangum does"""
+    loop = asyncio.new_event_loop()
+
+    def handler(event, context):
+        body = (event.get('body') or '').encode('utf-8')
+        query = urlencode(event.get('queryStringParameters') or {}).encode('ascii')
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                   for name, value in (event.get('headers') or {}).items()]
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': event['httpMethod'], 'scheme': 'https', 'path': event['path'],
+            'raw_path': event['path'].encode('utf-8'), 'query_string': query, 'root_path': '',
+            'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('lambda', 443),
+        }
+        response = {'headers': {}, 'body': bytearray()}
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = {k.decode('latin-1'): v.decode('latin-1') for k, v in message['headers']}
+            elif message['type'] == 'http.response.body':
+                response['body'] += message.get('body', b'')
+
+        loop.run_until_complete(app(scope, receive, send))
+        try:
+            return {'statusCode': response['status'], 'headers': response['headers'],
+                    'body': response['body'].decode('utf-8')}
+        except UnicodeDecodeError:
+            return {'statusCode': response['status'], 'headers': response['headers'],
+                    'body': base64.b64encode(response['body']).decode('ascii'), 'isBase64Encoded': True}
+
+    return handler
+
+
+def event(method, path, query=None, body=None):
+    return {
+        'httpMethod': method, 'path': path, 'queryStringParameters': query,
+        'headers': {'Host': 'api.example.com', 'Content-Type': 'application/json'},
+        'body': json.dumps(body) if body is not None else None, 'isBase64Encoded': False,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--invocations', type=int, default=2000, help='per operation and entry point')
+    args = parser.parse_args()
+
+    from api import async_crud, crud, main as api_main
+    from api.lambda_handler import handler
+
+    note = {'title': 'Lambda note', 'body': 'Routed without ASGI ' * 10}
+    entry_points = (('lambda_handler', handler), ('fastapi+adapter', asgi_adapter(api_main.app)))
+
+    print(f"{args.invocations} warm invocations per operation, {args.items} notes, no storage latency")
+    print(f"{'operation':<10} {'entry point':<16} {'p50 us':>8} {'p99 us':>8} {'per s':>8}")
+    for operation in ('get', 'list', 'create', 'update', 'delete'):
+        for label, invoke in entry_points:
+            table = install(FakeTable())
+            notes = make_notes(args.items)
+            table.load(notes)
+            ids = [n['id'] for n in notes]
+            if operation == 'delete':
+                ids = ids * (args.invocations // len(ids) + 1)
+            samples = []
+            for i in range(args.invocations):
+                note_id = ids[i % len(ids)]
+                if operation == 'get':
+                    request = event('GET', f'/notes/{note_id}')
+                elif operation == 'list':
+                    request = event('GET', '/notes/', {'limit': '20', 'fields': 'summary'})
+                elif operation == 'create':
+                    request = event('POST', '/notes/', body=note)
+                elif operation == 'update':
+                    request = event('PUT', f'/notes/{note_id}', body=note)
+                else:
+                    # Missing notes after the first pass still exercise the full route
+                    request = event('DELETE', f'/notes/{note_id}')
+                start = time.perf_counter()
+                response = invoke(request, None)
+                samples.append(time.perf_counter() - start)
+                assert response['statusCode'] in (200, 404), (label, operation, response)
+            samples.sort()
+            p50 = statistics.median(samples) * 1e6
+            p99 = samples[int(len(samples) * 0.99) - 1] * 1e6
+            print(f"{operation:<10} {label:<16} {p50:>8.0f} {p99:>8.0f} {len(samples) / sum(samples):>8.0f}")
+            crud.note_cache.clear()
+    async_crud.shutdown()
+
+
+if __name__ == '__main__':
+    main()
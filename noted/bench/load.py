@@ -0,0 +1,305 @@
+#bench/load.py
+"""Mixed create/get/list/update/delete load against every API entry point.
+
+Drives the FastAPI app in-process (ASGI) and each BaseHTTPRequestHandler
+module over loopback, all backed by the in-memory DynamoDB fake, and reports
+throughput plus p50/p95/p99 latency per operation. Results are written as
+JSON so two commits can be compared with --compare.
+
+Run from the `noted/` directory:
+
+    python -m bench.load
+    python -m bench.load --targets fastapi --items 1000,10000 --concurrency 1,16,64
+    python -m bench.load --output before.json
+    python -m bench.load --compare before.json
+
+"list" is GET /notes/?limit=50 on FastAPI and GET /api/notes?limit=50 on
+the handlers.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.clients import HandlerServer, asgi_request
+from bench.fake_dynamodb import FakeTable, install, load_handler_modules, make_notes
+
+TARGETS = ('fastapi', 'notes', 'notes_id')
+OPERATIONS = ('create', 'get', 'list', 'update', 'delete')
+DEFAULT_MIX = 'create=10,get=55,list=10,update=15,delete=10'
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Workload:
+    """Picks operations by weight and tracks which note ids are live.
+
+    Shared by every worker of one run; the lock only guards the id pool.
+    """
+
+    def __init__(self, ids, mix, seed):
+        self.ids = list(ids)
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.operations = [name for name in mix if mix[name] > 0]
+        self.weights = [mix[name] for name in self.operations]
+        self.counter = 0
+
+    def next(self):
+        with self.lock:
+            operation = self.random.choices(self.operations, self.weights)[0]
+            self.counter += 1
+            if operation in ('get', 'update') and self.ids:
+                return operation, self.random.choice(self.ids), self.counter
+            if operation == 'delete' and self.ids:
+                # Take it out of the pool so later gets don't count as misses
+                index = self.random.randrange(len(self.ids))
+                self.ids[index], self.ids[-1] = self.ids[-1], self.ids[index]
+                return operation, self.ids.pop(), self.counter
+            if operation in ('get', 'update', 'delete'):
+                operation = 'create'
+            return operation, None, self.counter
+
+    def created(self, note_id):
+        with self.lock:
+            self.ids.append(note_id)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {name: [] for name in OPERATIONS}
+        self.statuses = {name: {} for name in OPERATIONS}
+        self.lock = threading.Lock()
+
+    def record(self, operation, status, seconds):
+        with self.lock:
+            self.latencies[operation].append(seconds)
+            statuses = self.statuses[operation]
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for operation in OPERATIONS:
+            values = sorted(self.latencies[operation])
+            if not values:
+                continue
+            endpoints[operation] = {
+                'count': len(values),
+                'statuses': self.statuses[operation],
+                'throughput': round(len(values) / elapsed, 1),
+                'mean_ms': round(sum(values) / len(values) * 1000, 3),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+                'max_ms': round(values[-1] * 1000, 3),
+            }
+        return endpoints
+
+
+def request_for(target, operation, note_id, sequence):
+    """(method, path, body) for one operation against one target"""
+    prefix = '/notes' if target == 'fastapi' else '/api/notes'
+    note = {'title': f'Load note {sequence}', 'body': f'Body of load note {sequence} ' * 8}
+    if operation == 'create':
+        return 'POST', f'{prefix}/' if target == 'fastapi' else prefix, note
+    if operation == 'get':
+        return 'GET', f'{prefix}/{note_id}', None
+    if operation == 'list':
+        return 'GET', f'{prefix}/?limit=50' if target == 'fastapi' else f'{prefix}?limit=50', None
+    if operation == 'update':
+        return 'PUT', f'{prefix}/{note_id}', note
+    return 'DELETE', f'{prefix}/{note_id}', None
+
+
+def handle_response(workload, operation, status, body):
+    if operation == 'create' and status == 200:
+        workload.created(json.loads(body)['id'])
+
+
+async def drive_asgi(app, workload, recorder, concurrency, total):
+    issued = 0
+
+    async def worker():
+        nonlocal issued
+        while issued < total:
+            issued += 1
+            operation, note_id, sequence = workload.next()
+            method, path, body = request_for('fastapi', operation, note_id, sequence)
+            start = time.perf_counter()
+            status, _, response_body = await asgi_request(app, method, path, body)
+            recorder.record(operation, status, time.perf_counter() - start)
+            handle_response(workload, operation, status, response_body)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def drive_handler(server, target, workload, recorder, concurrency, total):
+    issued = 0
+    issued_lock = threading.Lock()
+
+    def worker():
+        nonlocal issued
+        while True:
+            with issued_lock:
+                if issued >= total:
+                    return
+                issued += 1
+            operation, note_id, sequence = workload.next()
+            method, path, body = request_for(target, operation, note_id, sequence)
+            start = time.perf_counter()
+            status, _, response_body = server.request(method, path, body)
+            recorder.record(operation, status, time.perf_counter() - start)
+            handle_response(workload, operation, status, response_body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return time.perf_counter() - start
+
+
+def run_once(target, items, concurrency, args, mix, handlers, app):
+    from api import crud
+
+    table = install(FakeTable(latency_ms=args.latency_ms))
+    notes = make_notes(items, body_size=args.body_size)
+    table.load(notes)
+    if args.no_cache:
+        crud.note_cache.maxsize = 0
+
+    workload = Workload((note['id'] for note in notes), mix, args.seed)
+    recorder = Recorder()
+    table.reset_calls()
+    if target == 'fastapi':
+        elapsed = asyncio.run(drive_asgi(app, workload, recorder, concurrency, args.requests))
+    else:
+        with HandlerServer(handlers[target].handler) as server:
+            elapsed = drive_handler(server, target, workload, recorder, concurrency, args.requests)
+
+    return {
+        'target': target,
+        'items': items,
+        'concurrency': concurrency,
+        'requests': args.requests,
+        'seconds': round(elapsed, 3),
+        'throughput': round(args.requests / elapsed, 1),
+        'storage_calls': sum(table.calls.values()),
+        'endpoints': recorder.summary(elapsed),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_key(run):
+    return run['target'], run['items'], run['concurrency']
+
+
+def print_run(run, baseline=None):
+    print(f"\n{run['target']}  items={run['items']}  concurrency={run['concurrency']}  "
+          f"{run['throughput']:.0f} req/s  storage calls={run['storage_calls']}")
+    print(f"  {'op':<8} {'count':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for operation, stats in run['endpoints'].items():
+        line = (f"  {operation:<8} {stats['count']:>6} {stats['throughput']:>8.0f} {stats['p50_ms']:>8.2f} "
+                f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}  {stats['statuses']}")
+        before = (baseline or {}).get('endpoints', {}).get(operation)
+        if before:
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+            line += f"  p95 {change:+.0f}% vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', default=','.join(TARGETS))
+    parser.add_argument('--items', default='1000', help='comma-separated table sizes')
+    parser.add_argument('--concurrency', default='1,16', help='comma-separated requests in flight')
+    parser.add_argument('--requests', type=int, default=500, help='requests per run')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated DynamoDB latency per call')
+    parser.add_argument('--body-size', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-cache', action='store_true', help='disable the note read cache')
+    parser.add_argument('--output', help='JSON report path (default bench/results/load-<commit>.json)')
+    parser.add_argument('--compare', help='earlier JSON report to compare p95 latency against')
+    args = parser.parse_args()
+
+    targets = [target for target in args.targets.split(',') if target]
+    for target in targets:
+        if target not in TARGETS:
+            parser.error(f"unknown target {target!r}; expected one of {', '.join(TARGETS)}")
+
+    from api import async_crud, main as api_main
+
+    handlers = load_handler_modules()
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {run_key(run): run for run in json.load(f)['runs']}
+
+    runs = []
+    for target in targets:
+        for items in (int(value) for value in args.items.split(',')):
+            for concurrency in (int(value) for value in args.concurrency.split(',')):
+                run = run_once(target, items, concurrency, args, args.mix, handlers, api_main.app)
+                print_run(run, baseline.get(run_key(run)))
+                runs.append(run)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'requests': args.requests,
+            'mix': args.mix,
+            'latency_ms': args.latency_ms,
+            'body_size': args.body_size,
+            'seed': args.seed,
+            'cache': not args.no_cache,
+            'storage_concurrency': async_crud.STORAGE_CONCURRENCY,
+        },
+        'runs': runs,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f'load-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {output}")
+    async_crud.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#bench/parallel_scan.py
+"""Wall-clock time of a full-table read vs. number of scan segments.
+
+Run from the `noted/` directory:
+
+    python -m bench.parallel_scan --items 20000 --segments 1,2,4,8,16
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-2')
+
+from api import crud
+from bench.fake_dynamodb import FakeTable, install, make_notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--segments', default='1,2,4,8,16')
+    parser.add_argument('--latency-ms', type=float, default=15.0, help='fixed cost per Scan request')
+    parser.add_argument('--per-item-us', type=float, default=20.0, help='extra cost per item returned')
+    parser.add_argument('--page-items', type=int, default=1000, help='items per page (stands in for the 1 MB cap)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    table = install(FakeTable(latency_ms=args.latency_ms, per_item_us=args.per_item_us, page_items=args.page_items))
+    table.load(make_notes(args.items))
+
+    print(f"{'segments':>8} {'best (s)':>10} {'items':>8} {'scan calls':>10} {'speedup':>8}")
+    baseline = None
+    for total_segments in (int(value) for value in args.segments.split(',')):
+        timings = []
+        for _ in range(args.repeat):
+            table.reset_calls()
+            start = time.perf_counter()
+            count = sum(1 for _ in crud.parallel_scan(total_segments))
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        baseline = baseline or best
+        print(f"{total_segments:>8} {best:>10.3f} {count:>8} {table.calls.get('Scan', 0):>10} {baseline / best:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#bench/recent_list.py
+"""Cost of the newest N notes: scan-and-sort vs. ?order=recent.
+
+Before the recent index, the only way to get the newest notes was to read
+every item and sort in memory. This reports storage calls, items read and
+latency for both as the table grows. Calls and KB read (what DynamoDB
+bills) should stay flat for the query. Its latency still grows here only
+because the fake evaluates a query by sorting every item in Python.
+
+Run from the `noted/` directory:
+
+    python -m bench.recent_list
+    python -m bench.recent_list --items 1000,10000,100000 --limit 20
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from bench.clients import asgi_request
+from bench.fake_dynamodb import FakeTable, install, make_notes
+
+
+def measure(app, table, path, repeat):
+    table.reset_calls()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        status, _, body = asyncio.run(asgi_request(app, 'GET', path))
+        assert status == 200, status
+    elapsed = (time.perf_counter() - start) / repeat
+    calls = sum(table.calls.values()) / repeat
+    return elapsed, calls, table.bytes_returned / repeat, json.loads(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', default='1000,10000,50000')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated DynamoDB latency per call')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    from api import async_crud, main as api_main
+
+    print(f"{'items':>7} {'method':<12} {'calls':>6} {'KB read':>9} {'ms':>9}")
+    for items in (int(value) for value in args.items.split(',')):
+        table = install(FakeTable(latency_ms=args.latency_ms))
+        table.load(make_notes(items))
+
+        elapsed, calls, read, notes = measure(api_main.app, table, '/notes/?fields=summary', args.repeat)
+        newest = sorted(notes, key=lambda note: note['created_at'], reverse=True)[:args.limit]
+        print(f"{items:>7} {'scan+sort':<12} {calls:>6.0f} {read / 1024:>9.1f} {elapsed * 1000:>9.2f}")
+
+        path = f'/notes/?fields=summary&order=recent&limit={args.limit}'
+        elapsed, calls, read, page = measure(api_main.app, table, path, args.repeat)
+        assert [note['id'] for note in page['notes']] == [note['id'] for note in newest]
+        print(f"{items:>7} {'order=recent':<12} {calls:>6.0f} {read / 1024:>9.1f} {elapsed * 1000:>9.2f}")
+    async_crud.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#bench/serialization.py
+"""Per-item cost of encoding a large list response.
+
+Compares the old list path (build a pydantic Note per row, then FastAPI's
+jsonable_encoder + json.dumps) with api.serialize.dumps on trusted rows.
+Rows carry a Decimal like real boto3 output, which plain json.dumps rejects.
+
+Run from the `noted/` directory:
+
+    python -m bench.serialization --items 10000
+"""
+import argparse
+import json
+import time
+from decimal import Decimal
+from typing import Optional
+
+from bench.fake_dynamodb import make_notes
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--body-size', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import BaseModel
+
+    from api import crud, serialize
+
+    rows = make_notes(args.items, body_size=args.body_size)
+    for row in rows:
+        row['revision'] = Decimal(3)
+
+    class Note(BaseModel):
+        # The pydantic model crud used to build per row
+        id: Optional[str] = None
+        title: str
+        body: str
+        created_at: Optional[str] = None
+
+    def pydantic_path():
+        notes = [Note(**row) for row in rows]
+        return json.dumps(jsonable_encoder(notes)).encode('utf-8')
+
+    def fast_path():
+        return serialize.dumps([crud.to_public(row) for row in rows])
+
+    try:
+        json.dumps(rows)
+        plain = 'ok'
+    except TypeError as e:
+        plain = f'fails ({e})'
+    print(f"json.dumps on raw rows: {plain}")
+    print(f"encoder: {'orjson' if serialize.orjson else 'stdlib json'}, {args.items} items\n")
+
+    print(f"{'path':<32} {'total ms':>10} {'us/item':>9} {'bytes':>10}")
+    baseline = None
+    for label, func in (('Note models + jsonable_encoder', pydantic_path), ('serialize.dumps (fast path)', fast_path)):
+        elapsed, payload = best_of(args.repeat, func)
+        baseline = baseline or elapsed
+        print(f"{label:<32} {elapsed * 1000:>10.1f} {elapsed / args.items * 1e6:>9.2f} {len(payload):>10}"
+              f"  {baseline / elapsed:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#bench/storage_calls.py
+"""DynamoDB requests issued per endpoint, for both server flavours.
+
+Each endpoint has an expected status and expected calls by operation. Any
+mismatch is flagged and the run exits with status 1, so this can gate CI.
+
+Run from the `noted/` directory:
+
+    python -m bench.storage_calls
+"""
+import asyncio
+import json
+import sys
+
+from bench.clients import HandlerServer, asgi_request
+from bench.fake_dynamodb import FakeTable, install, load_handler_modules, make_notes
+
+MISSING_ID = 'ffffffff-0000-4000-8000-000000000000'
+
+
+def main():
+    from api import crud, main as api_main
+
+    table = install(FakeTable())
+    notes = make_notes(4)
+    table.load(notes)
+    payload = {'title': 'Benchmark', 'body': 'Counting storage calls'}
+
+    failures = []
+
+    def measure(label, send, expected_status, expected_calls):
+        table.reset_calls()
+        status = send()
+        calls = {operation: count for operation, count in table.calls.items() if count}
+        total = sum(calls.values())
+        flag = ''
+        if status != expected_status or calls != expected_calls:
+            flag = f'  (expected {expected_status} {json.dumps(expected_calls, sort_keys=True)})'
+            failures.append(label)
+        print(f"{label:<44} {status:>6} {total:>6}  {json.dumps(calls, sort_keys=True)}{flag}")
+
+    def fastapi(method, path, body=None):
+        return lambda: asyncio.run(asgi_request(api_main.app, method, path, body))[0]
+
+    print(f"{'endpoint':<44} {'status':>6} {'calls':>6}  by operation")
+    measure('FastAPI POST /notes/', fastapi('POST', '/notes/', payload), 200, {'PutItem': 1})
+    measure('FastAPI GET /notes/{id}', fastapi('GET', f"/notes/{notes[0]['id']}"), 200, {'GetItem': 1})
+    measure('FastAPI GET /notes/{id} (cached)', fastapi('GET', f"/notes/{notes[0]['id']}"), 200, {})
+    measure('FastAPI PUT /notes/{id}', fastapi('PUT', f"/notes/{notes[0]['id']}", payload), 200, {'UpdateItem': 1})
+    measure('FastAPI PUT /notes/{id} (missing)', fastapi('PUT', f'/notes/{MISSING_ID}', payload), 404, {'UpdateItem': 1})
+    measure('FastAPI DELETE /notes/{id}', fastapi('DELETE', f"/notes/{notes[1]['id']}"), 200, {'UpdateItem': 1})
+    measure('FastAPI DELETE /notes/{id} (missing)', fastapi('DELETE', f'/notes/{MISSING_ID}'), 404, {'UpdateItem': 1})
+    measure('FastAPI GET /notes/changes?since=...',
+            fastapi('GET', '/notes/changes?since=2025-06-01T00:00:00%2B00:00'), 200, {'Query': 1})
+
+    bulk = make_notes(100, start=1000)
+    measure('FastAPI POST /notes/batch (100 notes)',
+            fastapi('POST', '/notes/batch', {'notes': [payload] * 100}), 200, {'BatchWriteItem': 4})
+    table.load(bulk)
+    bulk_ids = [note['id'] for note in bulk]
+    crud.note_cache.clear()
+    measure('FastAPI POST /notes/batch-get (100 ids)', fastapi('POST', '/notes/batch-get', {'ids': bulk_ids}), 200,
+            {'BatchGetItem': 1})
+    measure('FastAPI POST /notes/batch-delete (100 ids)',
+            fastapi('POST', '/notes/batch-delete', {'ids': bulk_ids}), 200,
+            {'BatchGetItem': 1, 'BatchWriteItem': 4})
+
+    for name, module in load_handler_modules().items():
+        with HandlerServer(module.handler) as server:
+            note_id = notes[2]['id'] if name == 'notes' else notes[3]['id']
+            measure(f'{name} GET /api/notes/{{id}}', lambda: server.request('GET', f'/api/notes/{note_id}')[0], 200,
+                    {'GetItem': 1})
+            measure(f'{name} DELETE /api/notes/{{id}}', lambda: server.request('DELETE', f'/api/notes/{note_id}')[0], 200,
+                    {'UpdateItem': 1})
+            measure(f'{name} DELETE /api/notes/{{id}} (missing)',
+                    lambda: server.request('DELETE', f'/api/notes/{MISSING_ID}')[0], 404,
+                    {'UpdateItem': 1})
+
+    if failures:
+        print(f"{len(failures)} endpoint(s) did not match: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
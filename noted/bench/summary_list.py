@@ -0,0 +1,49 @@
+#bench/summary_list.py
+"""Full vs. summary listing: bytes read from storage, response size and time.
+
+The summary listing scans with a ProjectionExpression for the stored snippet
+instead of the body, so what storage returns and what goes over the wire no
+longer grows with body size.
+
+Run from the `noted/` directory:
+
+    python -m bench.summary_list --items 2000 --body-sizes 200,2000,20000
+"""
+import argparse
+import asyncio
+import time
+
+from bench.clients import asgi_request
+from bench.fake_dynamodb import FakeTable, install, make_notes
+
+
+def measure(app, table, path, repeat):
+    table.reset_calls()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        status, _, body = asyncio.run(asgi_request(app, 'GET', path))
+        assert status == 200, status
+    elapsed = (time.perf_counter() - start) / repeat
+    return table.bytes_returned // repeat, len(body), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--body-sizes', default='200,2000,20000')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    from api import main as api_main
+
+    print(f"{'body':>7} {'mode':>8} {'storage KB':>11} {'response KB':>12} {'ms':>8}")
+    for body_size in (int(value) for value in args.body_sizes.split(',')):
+        table = install(FakeTable())
+        table.load(make_notes(args.items, body_size=body_size))
+        for mode, path in (('full', '/notes/'), ('summary', '/notes/?fields=summary')):
+            read, sent, elapsed = measure(api_main.app, table, path, args.repeat)
+            print(f"{body_size:>7} {mode:>8} {read / 1024:>11.0f} {sent / 1024:>12.0f} {elapsed * 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
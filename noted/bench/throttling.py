@@ -0,0 +1,95 @@
+#bench/throttling.py
+"""Overload against a provisioned table, with and without the client-side limiter.
+
+The fake table is given --read-capacity/--write-capacity units per second and
+rejects anything beyond that the way DynamoDB does. The FastAPI app is then
+driven well past that capacity, once with the limiter off (every request
+reaches the table and excess ones come back throttled) and once with
+NOTES_DYNAMODB_READ/WRITE_CAPACITY set to the same numbers (excess requests
+are shed before the round trip).
+
+Run from the `noted/` directory:
+
+    python -m bench.throttling
+    python -m bench.throttling --concurrency 64 --seconds 5 --read-capacity 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from bench.clients import asgi_request
+from bench.fake_dynamodb import FakeTable, install, make_notes
+from bench.load import percentile
+
+
+def run(app, args, limited):
+    from api import crud, dynamo
+    from api.ratelimit import TokenBucket
+
+    table = install(FakeTable(latency_ms=args.latency_ms, read_capacity=args.read_capacity,
+                              write_capacity=args.write_capacity))
+    notes = make_notes(args.items)
+    table.load(notes)
+    crud.note_cache.maxsize = 0
+    dynamo.read_limiter = TokenBucket(args.read_capacity) if limited else None
+    dynamo.write_limiter = TokenBucket(args.write_capacity) if limited else None
+    table.reset_calls()
+
+    rng = random.Random(1)
+    latencies = {}
+    missing_retry_after = 0
+
+    async def worker(deadline):
+        nonlocal missing_retry_after
+        while time.perf_counter() < deadline:
+            note_id = rng.choice(notes)['id']
+            if rng.random() < args.write_share:
+                method, body = 'PUT', {'title': 'Busy note', 'body': 'Updated under load'}
+            else:
+                method, body = 'GET', None
+            start = time.perf_counter()
+            status, headers, _ = await asgi_request(app, method, f'/notes/{note_id}', body)
+            latencies.setdefault(status, []).append(time.perf_counter() - start)
+            if status == 503 and 'retry-after' not in headers:
+                missing_retry_after += 1
+
+    async def drive():
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(*(worker(deadline) for _ in range(args.concurrency)))
+
+    asyncio.run(drive())
+    dynamo.read_limiter = dynamo.write_limiter = None
+
+    calls = dict(table.calls)
+    throttled = calls.pop('Throttled', 0)
+    label = 'limiter' if limited else 'no limiter'
+    for status, values in sorted(latencies.items()):
+        values.sort()
+        print(f"{label:<11} {status:>6} {len(values):>8} {len(values) / args.seconds:>8.0f} "
+              f"{percentile(values, 0.50) * 1000:>8.2f} {percentile(values, 0.99) * 1000:>8.2f}")
+    print(f"{label:<11} storage calls={sum(calls.values())} throttled by table={throttled}"
+          + (f" 503s without Retry-After={missing_retry_after}" if missing_retry_after else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated DynamoDB latency per call')
+    parser.add_argument('--read-capacity', type=float, default=500.0)
+    parser.add_argument('--write-capacity', type=float, default=100.0)
+    parser.add_argument('--write-share', type=float, default=0.2, help='fraction of requests that are PUTs')
+    args = parser.parse_args()
+
+    from api import async_crud, main as api_main
+
+    print(f"{'':<11} {'status':>6} {'count':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    run(api_main.app, args, limited=False)
+    run(api_main.app, args, limited=True)
+    async_crud.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#bench/write_behind.py
+"""Storage writes for autosave-style bursts of PUTs, with and without write-behind.
+
+Each simulated editor sends --updates PUTs to its own note, --interval-ms
+apart. Write-behind is toggled with NOTES_WRITE_BEHIND_MS, so this script
+runs itself once per window in a fresh interpreter. The GetItem column is
+the existence check made when a note's first update of a window is parked.
+
+Run from the `noted/` directory:
+
+    python -m bench.write_behind --windows 0,250,1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def run_one(args):
+    from bench.clients import asgi_request
+    from bench.fake_dynamodb import FakeTable, install, make_notes
+    from api import crud, main as api_main
+
+    table = install(FakeTable(latency_ms=args.latency_ms))
+    notes = make_notes(args.editors)
+    table.load(notes)
+    table.reset_calls()
+
+    async def editor(note_id):
+        for index in range(args.updates):
+            body = f"draft {index} " * 20
+            status, _, _ = await asgi_request(api_main.app, 'PUT', f'/notes/{note_id}',
+                                              {'title': 'Autosaved', 'body': body})
+            assert status == 200, status
+            await asyncio.sleep(args.interval_ms / 1000.0)
+
+    async def drive():
+        await asyncio.gather(*(editor(note['id']) for note in notes))
+
+    start = time.perf_counter()
+    asyncio.run(drive())
+    elapsed = time.perf_counter() - start
+    crud.close_write_behind()
+
+    # Every note must end up with its last update stored
+    last = f"draft {args.updates - 1} " * 20
+    assert all(table._items[note['id']]['body'] == last for note in notes)
+    print(json.dumps({'calls': table.calls, 'seconds': elapsed}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--windows', default='0,250,1000', help='NOTES_WRITE_BEHIND_MS values')
+    parser.add_argument('--editors', type=int, default=20)
+    parser.add_argument('--updates', type=int, default=30)
+    parser.add_argument('--interval-ms', type=float, default=50.0)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args)
+        return
+
+    total = args.editors * args.updates
+    print(f"{args.editors} editors x {args.updates} PUTs, {args.interval_ms:.0f} ms apart ({total} PUTs)")
+    print(f"{'window ms':>9} {'UpdateItem':>10} {'GetItem':>8} {'PUTs/write':>11} {'seconds':>8}")
+    for window in args.windows.split(','):
+        env = dict(os.environ, NOTES_WRITE_BEHIND_MS=window)
+        output = subprocess.run(
+            [sys.executable, '-m', 'bench.write_behind', '--child', '--editors', str(args.editors),
+             '--updates', str(args.updates), '--interval-ms', str(args.interval_ms),
+             '--latency-ms', str(args.latency_ms)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        writes = result['calls'].get('UpdateItem', 0)
+        print(f"{window:>9} {writes:>10} {result['calls'].get('GetItem', 0):>8} "
+              f"{total / writes if writes else 0:>11.1f} {result['seconds']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
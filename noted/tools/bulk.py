@@ -0,0 +1,410 @@
+#tools/bulk.py
+"""Bulk export and import of the notes table as NDJSON (one note per line).
+
+Export runs a parallel segmented scan and writes every live note as
+{"id", "title", "body", "created_at", "updated_at"}, with offloaded and
+compressed bodies read back to plain text. Import streams a file into
+parallel batch_write_item calls, keeping each note's id and timestamps, so
+an export can be restored into an empty or existing table (notes with the
+same id are overwritten). Backfill adds sync_bucket/list_bucket to notes
+written before the changes and recent indexes existed, so they show up in
+/notes/changes and ?order=recent without being edited.
+
+Memory stays flat for any table or file size. Progress and throughput are
+reported on stderr. An interrupted run leaves `<file>.checkpoint` behind,
+and re-running the same command resumes from it (--restart starts over).
+
+Run from the `noted/` directory:
+
+    python -m tools.bulk export notes.ndjson --segments 16
+    python -m tools.bulk import notes.ndjson --workers 8 --write-capacity 1000
+    python -m tools.bulk backfill --segments 8 --write-capacity 500
+
+--read-capacity/--write-capacity cap the units per second this process
+uses (the same token bucket as NOTES_DYNAMODB_READ/WRITE_CAPACITY). Here,
+calls wait for capacity instead of being shed.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.exceptions import HTTPException
+
+from api import crud, dynamo
+from api.dynamo import StorageThrottled
+from api.logs import get_logger
+from api.ratelimit import TokenBucket
+
+logger = get_logger(__name__)
+
+EXPORT_FIELDS = ('id', 'title', 'body', 'created_at', 'updated_at')
+# Checkpoints are rewritten at most this often (and once at the end)
+CHECKPOINT_INTERVAL = 1.0
+# Seconds a batch may wait on the client-side limiter before it is throttled
+LIMIT_MAX_WAIT = 60.0
+# Backfill writes retry a throttle this many times, backing off up to 5s
+BACKFILL_ATTEMPTS = 8
+
+
+class Interrupted(Exception):
+    pass
+
+
+class Progress:
+    """Thread-safe counters, printed to stderr every `interval` seconds"""
+
+    def __init__(self, verb: str, interval: float, done: int = 0):
+        self.verb = verb
+        self.interval = interval
+        self.count = done
+        self.failed = 0
+        self.bytes = 0
+        self._start_count = done
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._report_loop, name='bulk-progress', daemon=True)
+
+    def add(self, count: int, size: int = 0, failed: int = 0):
+        with self._lock:
+            self.count += count
+            self.bytes += size
+            self.failed += failed
+
+    def line(self) -> str:
+        with self._lock:
+            elapsed = max(time.monotonic() - self._start, 1e-9)
+            rate = (self.count - self._start_count) / elapsed
+            text = f"{self.verb} {self.count} notes ({rate:.0f}/s, {self.bytes / 1e6:.1f} MB, {elapsed:.0f}s)"
+            if self.failed:
+                text += f", {self.failed} failed"
+            return text
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        print(self.line(), file=sys.stderr)
+
+    def _report_loop(self):
+        while not self._stop.wait(self.interval):
+            print(self.line(), file=sys.stderr)
+
+
+class Checkpoint:
+    """JSON state saved atomically next to the data file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, state: dict):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def export_line(item: dict) -> bytes:
+    row = {field: item[field] for field in EXPORT_FIELDS if field in item}
+    row['body'] = crud.read_body(item)
+    return json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def export_notes(path: str, segments: int, checkpoint: Checkpoint, restart: bool, progress_interval: float):
+    state = None if restart else checkpoint.load()
+    if state is not None and (state.get('mode') != 'export' or state.get('segments') != segments):
+        raise SystemExit(f"{checkpoint.path} is from a different run; pass --restart to start over")
+    if state is None:
+        state = {'mode': 'export', 'segments': segments, 'offset': 0, 'count': 0,
+                 'keys': {str(segment): None for segment in range(segments)}, 'done': []}
+        out = open(path, 'wb')
+    else:
+        # Lines written after the last checkpoint are cut off and scanned again
+        out = open(path, 'r+b')
+        out.truncate(state['offset'])
+        out.seek(state['offset'])
+        print(f"resuming export at {state['count']} notes", file=sys.stderr)
+
+    lock = threading.Lock()
+    stop = threading.Event()
+    last_saved = time.monotonic()
+
+    def scan_segment(segment: int):
+        nonlocal last_saved
+        start_key = state['keys'][str(segment)]
+        for items, last_key in crud.iter_segment_pages(segment, segments, start_key):
+            if stop.is_set():
+                raise Interrupted()
+            data = b''.join(export_line(item) for item in items)
+            with lock:
+                out.write(data)
+                state['offset'] += len(data)
+                state['count'] += len(items)
+                state['keys'][str(segment)] = last_key
+                if last_key is None:
+                    state['done'].append(segment)
+                progress.add(len(items), len(data))
+                if time.monotonic() - last_saved >= CHECKPOINT_INTERVAL:
+                    # The checkpoint never points past data that isn't in the file yet
+                    out.flush()
+                    checkpoint.save(state)
+                    last_saved = time.monotonic()
+
+    pending = [segment for segment in range(segments) if segment not in state['done']]
+    with out, Progress('exported', progress_interval, state['count']) as progress:
+        with ThreadPoolExecutor(max_workers=max(len(pending), 1), thread_name_prefix='bulk-export') as executor:
+            futures = [executor.submit(scan_segment, segment) for segment in pending]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                stop.set()
+                for future in futures:
+                    future.exception()
+                with lock:
+                    out.flush()
+                    checkpoint.save(state)
+                raise
+    checkpoint.remove()
+    return state['count']
+
+
+def backfill_item(item: dict) -> bool:
+    delay = 0.1
+    for attempt in range(BACKFILL_ATTEMPTS):
+        try:
+            return crud.backfill_buckets(item)
+        except StorageThrottled:
+            if attempt == BACKFILL_ATTEMPTS - 1:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+def backfill_notes(segments: int, checkpoint: Checkpoint, restart: bool, progress_interval: float):
+    state = None if restart else checkpoint.load()
+    if state is not None and (state.get('mode') != 'backfill' or state.get('segments') != segments):
+        raise SystemExit(f"{checkpoint.path} is from a different run; pass --restart to start over")
+    if state is None:
+        state = {'mode': 'backfill', 'segments': segments, 'count': 0,
+                 'keys': {str(segment): None for segment in range(segments)}, 'done': []}
+    else:
+        print(f"resuming backfill at {state['count']} notes", file=sys.stderr)
+
+    lock = threading.Lock()
+    stop = threading.Event()
+    last_saved = time.monotonic()
+
+    def scan_segment(segment: int):
+        nonlocal last_saved
+        start_key = state['keys'][str(segment)]
+        for items, last_key in crud.iter_segment_pages(segment, segments, start_key, projection='id, deleted_at',
+                                                       filter_expression=crud.MISSING_BUCKETS):
+            # A page is only checkpointed once all of it is written; the
+            # writes are idempotent, so a resume may redo part of one
+            updated = 0
+            for item in items:
+                if stop.is_set():
+                    raise Interrupted()
+                updated += backfill_item(item)
+            with lock:
+                state['count'] += updated
+                state['keys'][str(segment)] = last_key
+                if last_key is None:
+                    state['done'].append(segment)
+                progress.add(updated)
+                if time.monotonic() - last_saved >= CHECKPOINT_INTERVAL:
+                    checkpoint.save(state)
+                    last_saved = time.monotonic()
+
+    pending = [segment for segment in range(segments) if segment not in state['done']]
+    with Progress('backfilled', progress_interval, state['count']) as progress:
+        with ThreadPoolExecutor(max_workers=max(len(pending), 1), thread_name_prefix='bulk-backfill') as executor:
+            futures = [executor.submit(scan_segment, segment) for segment in pending]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                stop.set()
+                for future in futures:
+                    future.exception()
+                with lock:
+                    checkpoint.save(state)
+                raise
+    checkpoint.remove()
+    return state['count']
+
+
+def import_notes(path: str, workers: int, checkpoint: Checkpoint, restart: bool, progress_interval: float,
+                 rejects_path: str):
+    state = None if restart else checkpoint.load()
+    if state is not None and state.get('mode') != 'import':
+        raise SystemExit(f"{checkpoint.path} is from a different run; pass --restart to start over")
+    state = state or {'mode': 'import', 'offset': 0, 'count': 0, 'failed': 0}
+    if state['offset']:
+        print(f"resuming import at byte {state['offset']} ({state['count']} notes)", file=sys.stderr)
+
+    lock = threading.Lock()
+    # Batches finish out of order; the checkpoint only advances past a batch
+    # once every batch before it has finished, so a resume never skips one
+    finished = {}
+    next_sequence = 0
+    last_saved = time.monotonic()
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    rejects = open(rejects_path, 'ab' if state['offset'] else 'wb')
+
+    def reject(line: bytes, offset: int, error: str):
+        logger.warning("note rejected", extra={'offset': offset, 'error': error})
+        with lock:
+            rejects.write(line if line.endswith(b'\n') else line + b'\n')
+
+    def write_batch(sequence: int, end_offset: int, batch: dict, rejected: int):
+        nonlocal next_sequence, last_saved
+        try:
+            failed = {}
+            if batch:
+                failed = crud.batch_write_items([{'PutRequest': {'Item': item}} for item, _, _ in batch.values()])
+            for note_id, (_, error) in failed.items():
+                item, line, offset = batch[note_id]
+                crud.delete_body_blob(item)
+                reject(line, offset, error)
+            progress.add(len(batch) - len(failed), sum(len(line) for _, line, _ in batch.values()), len(failed))
+            with lock:
+                finished[sequence] = (end_offset, len(batch) - len(failed), len(failed) + rejected)
+                while next_sequence in finished:
+                    state['offset'], imported, failures = finished.pop(next_sequence)
+                    state['count'] += imported
+                    state['failed'] += failures
+                    next_sequence += 1
+                if time.monotonic() - last_saved >= CHECKPOINT_INTERVAL:
+                    rejects.flush()
+                    checkpoint.save(state)
+                    last_saved = time.monotonic()
+        finally:
+            in_flight.release()
+
+    def submit(sequence: int, end_offset: int, batch: dict, rejected: int):
+        in_flight.acquire()
+        futures.append(executor.submit(write_batch, sequence, end_offset, batch, rejected))
+        # Drop finished futures so memory stays flat, re-raising any failure here
+        for future in [future for future in futures if future.done()]:
+            future.result()
+            futures.remove(future)
+
+    futures = []
+    with open(path, 'rb') as source, rejects, Progress('imported', progress_interval, state['count']) as progress:
+        source.seek(state['offset'])
+        offset, sequence, batch, rejected = state['offset'], 0, {}, 0
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-import') as executor:
+                for line in source:
+                    line_offset, offset = offset, offset + len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        item = crud.restore_note_item(json.loads(line))
+                    except (ValueError, AttributeError) as e:
+                        reject(line, line_offset, f"Invalid JSON object: {e}")
+                        progress.add(0, failed=1)
+                        rejected += 1
+                        continue
+                    except HTTPException as e:
+                        reject(line, line_offset, e.detail)
+                        progress.add(0, failed=1)
+                        rejected += 1
+                        continue
+                    if item['id'] in batch:
+                        # One batch can't hold the same key twice; the later line wins
+                        submit(sequence, line_offset, batch, rejected)
+                        sequence, batch, rejected = sequence + 1, {}, 0
+                    batch[item['id']] = (item, line, line_offset)
+                    if len(batch) == crud.BATCH_WRITE_LIMIT:
+                        submit(sequence, offset, batch, rejected)
+                        sequence, batch, rejected = sequence + 1, {}, 0
+                if batch or rejected:
+                    submit(sequence, offset, batch, rejected)
+                for future in futures:
+                    future.result()
+        finally:
+            # After the pool has drained, so every finished batch is counted
+            with lock:
+                rejects.flush()
+                checkpoint.save(state)
+    checkpoint.remove()
+    return state['count'], state['failed']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='write every live note to an NDJSON file')
+    export_parser.add_argument('path')
+    export_parser.add_argument('--segments', type=int, default=8, help='parallel scan segments')
+    export_parser.add_argument('--read-capacity', type=float, help='read units per second to stay under')
+
+    import_parser = commands.add_parser('import', help='write every note in an NDJSON file to the table')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--workers', type=int, default=8, help='batch writes in flight')
+    import_parser.add_argument('--write-capacity', type=float, help='write units per second to stay under')
+    import_parser.add_argument('--rejects', help='where unusable lines go (default <path>.rejects.ndjson)')
+
+    backfill_parser = commands.add_parser('backfill', help='add the index buckets to notes written before them')
+    backfill_parser.add_argument('--segments', type=int, default=8, help='parallel scan segments')
+    backfill_parser.add_argument('--read-capacity', type=float, help='read units per second to stay under')
+    backfill_parser.add_argument('--write-capacity', type=float, help='write units per second to stay under')
+
+    for command in (export_parser, import_parser, backfill_parser):
+        command.add_argument('--checkpoint', help='checkpoint file (default <path>.checkpoint)')
+        command.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+        command.add_argument('--progress-interval', type=float, default=5.0, help='seconds between reports')
+    args = parser.parse_args(argv)
+
+    checkpoint = Checkpoint(args.checkpoint or getattr(args, 'path', 'backfill') + '.checkpoint')
+    dynamo.LIMIT_MAX_WAIT = LIMIT_MAX_WAIT
+    if getattr(args, 'read_capacity', None):
+        dynamo.read_limiter = TokenBucket(args.read_capacity)
+    if getattr(args, 'write_capacity', None):
+        dynamo.write_limiter = TokenBucket(args.write_capacity)
+
+    try:
+        if args.command == 'export':
+            count = export_notes(args.path, args.segments, checkpoint, args.restart, args.progress_interval)
+            print(f"exported {count} notes to {args.path}", file=sys.stderr)
+        elif args.command == 'backfill':
+            count = backfill_notes(args.segments, checkpoint, args.restart, args.progress_interval)
+            print(f"backfilled {count} notes", file=sys.stderr)
+        else:
+            rejects_path = args.rejects or args.path + '.rejects.ndjson'
+            count, failed = import_notes(args.path, args.workers, checkpoint, args.restart, args.progress_interval,
+                                         rejects_path)
+            print(f"imported {count} notes from {args.path}"
+                  + (f"; {failed} rejected, see {rejects_path}" if failed else ''), file=sys.stderr)
+    except KeyboardInterrupt:
+        print(f"interrupted; re-run the same command to resume from {checkpoint.path}", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())